@@ -0,0 +1,18 @@
+# Generated by Django 4.2.24 on 2026-10-16 20:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_engine', '0002_llmresponsecache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aiprocessingjob',
+            name='progress',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.24 on 2026-10-16 22:21
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_engine', '0003_aiprocessingjob_progress'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aiprocessingjob',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='children', to='ai_engine.aiprocessingjob'),
+        ),
+        migrations.AlterField(
+            model_name='aiprocessingjob',
+            name='job_type',
+            field=models.CharField(choices=[('course_processing', 'Traitement complet du cours'), ('text_extraction', 'Extraction de texte'), ('summarization', 'Résumé automatique'), ('quiz_generation', 'Génération de quiz'), ('concept_extraction', 'Extraction de concepts'), ('difficulty_analysis', 'Analyse de difficulté'), ('recommendation', 'Recommandations'), ('translation', 'Traduction'), ('sentiment_analysis', 'Analyse de sentiment')], max_length=30),
+        ),
+    ]
@@ -16,6 +16,7 @@ class AIProcessingJob(models.Model):
     ]
     
     JOB_TYPES = [
+        ('course_processing', 'Traitement complet du cours'),
         ('text_extraction', 'Extraction de texte'),
         ('summarization', 'Résumé automatique'),
         ('quiz_generation', 'Génération de quiz'),
@@ -34,11 +35,14 @@ class AIProcessingJob(models.Model):
     course = models.ForeignKey(Course, on_delete=models.CASCADE, null=True, blank=True, related_name='ai_jobs')
     quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, null=True, blank=True, related_name='ai_jobs')
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='ai_jobs')
+    # Étape d'un traitement en plusieurs tâches (voir core.tasks.process_course_async)
+    parent = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='children')
     
     # Paramètres et résultats
     input_data = models.JSONField(default=dict)  # Données d'entrée
     output_data = models.JSONField(default=dict)  # Résultats du traitement
     error_message = models.TextField(blank=True)
+    progress = models.PositiveSmallIntegerField(default=0)  # Avancement en %
     
     # Métadonnées
     created_at = models.DateTimeField(auto_now_add=True)
@@ -68,9 +72,24 @@ class AIProcessingJob(models.Model):
         self.started_at = timezone.now()
         self.save()
     
+    def update_progress(self, progress):
+        """Enregistre l'avancement (%) sans réécrire le reste de la ligne"""
+        self.progress = max(0, min(100, int(progress)))
+        AIProcessingJob.objects.filter(pk=self.pk).update(progress=self.progress)
+    
+    def sync_progress_with_children(self):
+        """Avancement du job parent: part des étapes enfants terminées (100% à sa propre fin)"""
+        counts = self.children.aggregate(
+            total=models.Count('id'),
+            done=models.Count('id', filter=models.Q(status__in=['completed', 'failed'])),
+        )
+        if counts['total']:
+            self.update_progress(min(99, counts['done'] * 100 // counts['total']))
+    
     def complete_job(self, output_data, cost=0.0):
         """Marque le job comme terminé"""
         self.status = 'completed'
+        self.progress = 100
         self.output_data = output_data
         self.completed_at = timezone.now()
         self.cost = cost
@@ -92,6 +111,30 @@ class AIProcessingJob(models.Model):
         self.save()
 
 
+class LLMResponseCache(models.Model):
+    """Cache persistant des réponses LLM, adressé par le contenu de la requête
+
+    La clé est le SHA-256 des messages (texte tronqué + prompt système),
+    du modèle, de la température et de max_tokens: deux cours identiques
+    partagent la même réponse quel que soit l'utilisateur.
+    """
+    key = models.CharField(max_length=64, primary_key=True)
+    model_name = models.CharField(max_length=100)
+    response = models.TextField()
+
+    # LRU et TTL
+    hit_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_accessed_at = models.DateTimeField(default=timezone.now, db_index=True)
+    expires_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    class Meta:
+        ordering = ['-last_accessed_at']
+
+    def __str__(self):
+        return f"{self.model_name} - {self.key[:12]} ({self.hit_count} hits)"
+
+
 class AIConfiguration(models.Model):
     """Configuration des modèles IA"""
     name = models.CharField(max_length=100, unique=True)
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
+from django.db.models import Count
 from core.models import (
     Course, Quiz, Question, QuizAttempt, UserProfile, 
     Category, Tag, StudySession, Notification
@@ -23,6 +24,9 @@ class CategorySerializer(serializers.ModelSerializer):
         fields = '__all__'
     
     def get_course_count(self, obj):
+        # Compté d'avance pour toute une liste de cours (voir CourseListSerializer)
+        if hasattr(obj, 'num_courses'):
+            return obj.num_courses
         return obj.courses.count()
 
 
@@ -33,8 +37,31 @@ class TagSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+class CourseListListSerializer(serializers.ListSerializer):
+    """Liste de cours: compte en une requête les cours de toutes les catégories affichées"""
+
+    def to_representation(self, data):
+        courses = list(data.all() if hasattr(data, 'all') else data)
+        # Une instance de catégorie par cours (select_related): toutes reçoivent le compte
+        with_category = [course for course in courses if isinstance(course, Course) and course.category_id]
+        if with_category:
+            counts = dict(
+                Course.objects.filter(category_id__in={course.category_id for course in with_category}).order_by()
+                .values('category_id').annotate(n=Count('id')).values_list('category_id', 'n')
+            )
+            for course in with_category:
+                course.category.num_courses = counts.get(course.category_id, 0)
+        return super().to_representation(courses)
+
+
 class CourseListSerializer(serializers.ModelSerializer):
-    """Sérialiseur pour la liste des cours (version courte)"""
+    """
+    Sérialiseur pour la liste des cours (version courte)
+
+    Les compteurs (quiz, tentatives, taux de réussite) viennent des
+    annotations de ``Course.objects.with_stats()`` et la durée estimée du
+    nombre de mots enregistré: aucune requête par cours.
+    """
     category = CategorySerializer(read_only=True)
     tags = TagSerializer(many=True, read_only=True)
     user = UserSerializer(read_only=True)
@@ -42,11 +69,12 @@ class CourseListSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Course
+        list_serializer_class = CourseListListSerializer
         fields = [
             'id', 'title', 'slug', 'short_description', 'category', 'tags',
             'difficulty', 'status', 'thumbnail', 'user', 'rating', 'rating_count',
             'view_count', 'like_count', 'quiz_count', 'total_attempts',
-            'completion_rate', 'estimated_duration', 'created_at', 'updated_at'
+            'completion_rate', 'estimated_duration', 'word_count', 'page_count', 'created_at', 'updated_at'
         ]
 
 
@@ -58,12 +86,13 @@ class CourseDetailSerializer(serializers.ModelSerializer):
     collaborators = UserSerializer(many=True, read_only=True)
     quizzes = serializers.SerializerMethodField()
     related_courses = serializers.SerializerMethodField()
+    extracted_text = serializers.CharField(read_only=True)
     
     class Meta:
         model = Course
         fields = '__all__'
         read_only_fields = [
-            'id', 'slug', 'extracted_text', 'summary', 'key_concepts',
+            'id', 'slug', 'document', 'summary', 'key_concepts',
             'view_count', 'like_count', 'share_count', 'rating', 'rating_count',
             'ai_processed', 'processing_status', 'last_ai_update',
             'created_at', 'updated_at', 'published_at'
@@ -138,6 +167,9 @@ class QuizListSerializer(serializers.ModelSerializer):
         ]
     
     def get_question_count(self, obj):
+        # Annotation num_questions des listes (ou questions préchargées)
+        if hasattr(obj, 'num_questions'):
+            return obj.num_questions
         return obj.questions.count()
 
 
@@ -280,9 +312,18 @@ class UserAnalyticsSerializer(serializers.Serializer):
     weekly_activity = serializers.ListField()
 
 
+class CourseSearchHitSerializer(CourseListSerializer):
+    """Cours trouvé par la recherche plein texte: score et extrait (termes entourés de <mark>)"""
+    rank = serializers.FloatField(source='search_rank', read_only=True)
+    highlight = serializers.CharField(source='search_highlight', read_only=True)
+
+    class Meta(CourseListSerializer.Meta):
+        fields = CourseListSerializer.Meta.fields + ['rank', 'highlight']
+
+
 class SearchResultSerializer(serializers.Serializer):
     """Sérialiseur pour les résultats de recherche"""
-    courses = CourseListSerializer(many=True)
+    courses = CourseSearchHitSerializer(many=True)
     quizzes = QuizListSerializer(many=True)
     total_results = serializers.IntegerField()
     search_time = serializers.FloatField()
@@ -1,3 +1,165 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from pathlib import Path
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.models import Category, Course, CourseSearchDocument, Quiz, QuizAttempt, Tag
+from core.search import rebuild_index
+
+
+class CourseListQueryCountTests(TestCase):
+    """Le nombre de requêtes d'une page de cours ne dépend pas du nombre de cours"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('auteur', password='pw')
+        self.category = Category.objects.create(name='Mathématiques')
+        self.tag = Tag.objects.create(name='probabilités')
+
+    def create_courses(self, count):
+        with self.captureOnCommitCallbacks(execute=True):
+            self._create_courses(count)
+
+    def _create_courses(self, count):
+        for i in range(count):
+            course = Course.objects.create(
+                title=f'Cours {Course.objects.count()}',
+                user=self.user,
+                category=self.category,
+                status='published',
+                is_public=True,
+                word_count=1200,
+                estimated_duration=6,
+            )
+            course.tags.add(self.tag)
+            quiz = Quiz.objects.create(course=course, title='Quiz')
+            QuizAttempt.objects.create(quiz=quiz, score=3, total_questions=4, is_completed=True)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, secure=True)
+        self.assertEqual(response.status_code, 200)
+        return len(context), response
+
+    def test_course_list_constant_query_count(self):
+        url = reverse('course-list')
+        self.create_courses(2)
+        few, _ = self.count_queries(url)
+        self.create_courses(10)
+        many, response = self.count_queries(url)
+
+        self.assertEqual(few, many)
+        course = response.json()['results'][0]
+        self.assertEqual(course['quiz_count'], 1)
+        self.assertEqual(course['total_attempts'], 1)
+        self.assertEqual(course['completion_rate'], 100.0)
+        self.assertEqual(course['estimated_duration'], 6)
+        self.assertEqual(course['category']['course_count'], 12)
+
+    def test_global_search_constant_query_count(self):
+        url = reverse('search-global-search') + '?q=Cours'
+        self.create_courses(2)
+        few, _ = self.count_queries(url)
+        self.create_courses(10)
+        many, response = self.count_queries(url)
+
+        self.assertEqual(few, many)
+        self.assertEqual(response.json()['total_results'], 12)
+
+
+class CourseDurationFilterTests(TestCase):
+    def test_filter_courses_under_duration(self):
+        user = User.objects.create_user('auteur', password='pw')
+        for minutes in (5, 12, 40):
+            Course.objects.create(
+                title=f'Cours {minutes}', user=user, status='published', is_public=True,
+                word_count=minutes * 200, estimated_duration=minutes,
+            )
+
+        response = self.client.get(reverse('course-list') + '?estimated_duration__lte=15&ordering=estimated_duration', secure=True)
+
+        self.assertEqual([course['estimated_duration'] for course in response.json()['results']], [5, 12])
+
+
+class CourseFullTextSearchTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user('auteur', password='pw')
+        with self.captureOnCommitCallbacks(execute=True):
+            Course.objects.create(
+                title='Probabilités conditionnelles', user=user, status='published', is_public=True,
+                extracted_text="La formule de Bayes relie les probabilités conditionnelles.",
+            )
+            Course.objects.create(
+                title='Statistique descriptive', user=user, status='published', is_public=True,
+                extracted_text="Moyenne, médiane et écart-type; la formule de Bayes est vue plus tard.",
+            )
+            Course.objects.create(
+                title='Brouillon Bayes', user=user, status='draft', is_public=True,
+                extracted_text="Formule de Bayes.",
+            )
+
+    def search(self, query):
+        response = self.client.get(reverse('search-global-search'), {'q': query}, secure=True)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_search_matches_extracted_text_and_ranks_title_first(self):
+        data = self.search('probabilités Bayes')
+
+        self.assertEqual([course['title'] for course in data['courses']], ['Probabilités conditionnelles'])
+        self.assertEqual(data['total_results'], 1)
+
+        data = self.search('formule bayes')
+        self.assertEqual(data['total_results'], 2)
+        self.assertIn('<mark>', data['courses'][0]['highlight'])
+
+    def test_search_index_follows_course_updates(self):
+        course = Course.objects.get(title='Statistique descriptive')
+        with self.captureOnCommitCallbacks(execute=True):
+            course.title = 'Statistique inférentielle'
+            course.save(update_fields=['title'])
+
+        self.assertEqual([c['title'] for c in self.search('inférentielle')['courses']], ['Statistique inférentielle'])
+        self.assertEqual(self.search('descriptive')['total_results'], 0)
+
+    def test_fts_rows_are_keyed_by_document_id(self):
+        """Rowid FTS5 = clé entière du document (le rowid implicite serait renuméroté par VACUUM)"""
+        if connection.vendor != 'sqlite':
+            self.skipTest("Table FTS5 propre à SQLite")
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT rowid FROM core_course_fts WHERE core_course_fts MATCH 'bayes' ORDER BY rowid")
+            rowids = [row[0] for row in cursor.fetchall()]
+        expected = CourseSearchDocument.objects.filter(body__icontains='bayes').order_by('id').values_list('id', flat=True)
+        self.assertEqual(rowids, list(expected))
+
+
+class InvertedIndexSearchTests(CourseFullTextSearchTests):
+    """Mêmes recherches avec l'index inversé, plus les mises à jour rejouées depuis le journal"""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        settings_override = override_settings(SEARCH_BACKEND='inverted', SEARCH_INVERTED_PATH=Path(directory) / 'courses.idx')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        super().setUp()
+        self.assertEqual(rebuild_index(), 'inverted')
+
+    def test_phrase_query(self):
+        self.assertEqual(self.search('"formule de Bayes"')['total_results'], 2)
+        self.assertEqual(self.search('"Bayes formule"')['total_results'], 0)
+
+    def test_deleted_and_unpublished_courses_leave_the_index(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Course.objects.get(title='Statistique descriptive').delete()
+        self.assertEqual(self.search('bayes')['total_results'], 1)
+
+        course = Course.objects.get(title='Probabilités conditionnelles')
+        with self.captureOnCommitCallbacks(execute=True):
+            course.status = 'draft'
+            course.save(update_fields=['status'])
+        self.assertEqual(self.search('bayes')['total_results'], 0)
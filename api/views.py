@@ -1,3 +1,5 @@
+import time
+
 from rest_framework import viewsets, status, filters, generics
 from rest_framework.decorators import action
 from rest_framework.response import Response
@@ -15,6 +17,7 @@ from drf_spectacular.types import OpenApiTypes
 
 from .serializers import *
 from core.models import *
+from core.search import search_courses
 from .permissions import IsOwnerOrReadOnly, IsCourseOwnerOrReadOnly
 
 
@@ -52,19 +55,35 @@ class TagViewSet(viewsets.ReadOnlyModelViewSet):
 
 class CourseViewSet(viewsets.ModelViewSet):
     """API complète pour les cours"""
-    queryset = Course.objects.select_related('category', 'user').prefetch_related('tags')
+    queryset = Course.objects.select_related('category', 'user', 'document').prefetch_related('tags')
     serializer_class = CourseListSerializer
     permission_classes = [IsAuthenticatedOrReadOnly, IsOwnerOrReadOnly]
     pagination_class = StandardResultsSetPagination
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['category', 'difficulty', 'status', 'is_public', 'is_featured']
+    # Métriques du texte: ?estimated_duration__lte=15 pour les cours de moins de 15 minutes
+    filterset_fields = {
+        'category': ['exact'],
+        'difficulty': ['exact'],
+        'status': ['exact'],
+        'is_public': ['exact'],
+        'is_featured': ['exact'],
+        'estimated_duration': ['exact', 'lte', 'gte'],
+        'word_count': ['lte', 'gte'],
+        'page_count': ['lte', 'gte'],
+    }
     search_fields = ['title', 'description', 'short_description', 'tags__name']
-    ordering_fields = ['title', 'created_at', 'updated_at', 'rating', 'view_count', 'like_count']
+    ordering_fields = [
+        'title', 'created_at', 'updated_at', 'rating', 'view_count', 'like_count',
+        'estimated_duration', 'word_count', 'page_count'
+    ]
     ordering = ['-created_at']
     
     def get_queryset(self):
         """Filtre les cours selon les permissions"""
         queryset = super().get_queryset()
+        if self.action == 'list':
+            # Compteurs de la liste en sous-requêtes (pas de requête par cours)
+            queryset = queryset.with_stats()
         
         # Pour les utilisateurs non connectés, seulement les cours publics publiés
         if not self.request.user.is_authenticated:
@@ -215,29 +234,35 @@ class SearchViewSet(viewsets.ViewSet):
         if not query:
             return Response({'error': 'Query parameter required'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Recherche dans les cours
-        courses = Course.objects.filter(
-            Q(title__icontains=query) |
-            Q(description__icontains=query) |
-            Q(short_description__icontains=query) |
-            Q(tags__name__icontains=query),
-            status='published',
-            is_public=True
-        ).distinct()[:20]
+        started = time.perf_counter()
+
+        # Recherche dans les cours: index plein texte (core/search), classée avec extraits
+        found = search_courses(query, limit=20)
+        courses_by_id = Course.objects.select_related('category', 'user').prefetch_related('tags').with_stats().in_bulk(
+            [hit.course_id for hit in found.hits]
+        )
+        courses = []
+        for hit in found.hits:
+            course = courses_by_id.get(hit.course_id)
+            if course is not None:
+                course.search_rank = hit.rank
+                course.search_highlight = hit.highlight
+                courses.append(course)
         
         # Recherche dans les quizzes
-        quizzes = Quiz.objects.filter(
+        quizzes = list(Quiz.objects.filter(
             Q(title__icontains=query) |
             Q(description__icontains=query),
             is_active=True,
             course__status='published',
             course__is_public=True
-        ).distinct()[:20]
+        ).distinct().select_related('course').annotate(num_questions=Count('questions', distinct=True))[:20])
         
         results = {
-            'courses': CourseListSerializer(courses, many=True).data,
-            'quizzes': QuizListSerializer(quizzes, many=True).data,
-            'total_results': courses.count() + quizzes.count(),
+            'courses': courses,
+            'quizzes': quizzes,
+            'total_results': found.total + len(quizzes),
+            'search_time': round(time.perf_counter() - started, 4),
         }
         
         serializer = SearchResultSerializer(results)
@@ -404,12 +429,13 @@ class CourseRecommendationsView(APIView):
                 category__in=profile.preferred_categories.all(),
                 status='published',
                 is_public=True
-            ).exclude(user=user).order_by('-rating', '-view_count')[:10]
+            ).exclude(user=user).order_by('-rating', '-view_count')
         else:
             recommended = Course.objects.filter(
                 status='published',
                 is_public=True
-            ).order_by('-rating', '-view_count')[:10]
+            ).order_by('-rating', '-view_count')
+        recommended = recommended.select_related('category', 'user').prefetch_related('tags').with_stats()[:10]
         
         serializer = CourseListSerializer(recommended, many=True)
         return Response({
@@ -437,13 +463,17 @@ class QuizRecommendationsView(APIView):
                 is_active=True,
                 course__status='published',
                 course__is_public=True
-            ).order_by('-rating', '-view_count')[:10]
+            )
         else:
             recommended = Quiz.objects.filter(
                 is_active=True,
                 course__status='published',
                 course__is_public=True
-            ).order_by('-rating', '-view_count')[:10]
+            )
+        # Quiz n'a ni note ni vues: classement selon ceux de son cours
+        recommended = recommended.select_related('course').annotate(
+            num_questions=Count('questions', distinct=True)
+        ).order_by('-course__rating', '-course__view_count')[:10]
         
         serializer = QuizListSerializer(recommended, many=True)
         return Response({
@@ -3,11 +3,12 @@ Configuration de l'administration Django pour l'application core
 """
 
 from django.contrib import admin
-from .models import Category, Tag, Course, Quiz, Question, QuizAttempt, StudySession, UserProfile, Notification
+from .models import Category, Tag, CourseDocument, Course, Quiz, Question, QuizAttempt, StudySession, UserProfile, Notification
 
 # Enregistrement des modèles
 admin.site.register(Category)
 admin.site.register(Tag)
+admin.site.register(CourseDocument)
 admin.site.register(Course)
 admin.site.register(Quiz)
 admin.site.register(Question)
@@ -7,19 +7,20 @@ from typing import Dict, Any
 from .phi3_ai import phi3_ai
 
 
-def get_ai_summary(text: str, level: str = 'intermediate') -> Dict[str, Any]:
+def get_ai_summary(text: str, level: str = 'intermediate', num_chunks: int = 0) -> Dict[str, Any]:
     """
     Génère un résumé IA du texte fourni
 
     Args:
         text: Le texte à résumer
         level: Niveau de détail ('beginner', 'intermediate', 'advanced')
+        num_chunks: Si > 0, ``text`` est déjà condensé (``phi3_ai.condense``)
 
     Returns:
         Dictionnaire avec 'success', 'summary' et 'summary_data' ou 'error'
     """
     try:
-        result = phi3_ai.generate_summary(text, level=level, language='french')
+        result = phi3_ai.generate_summary(text, level=level, language='french', num_chunks=num_chunks)
 
         if result.get('success'):
             return {
@@ -43,7 +44,7 @@ def get_ai_summary(text: str, level: str = 'intermediate') -> Dict[str, Any]:
         }
 
 
-def get_ai_quiz(text: str, num_questions: int = 5, difficulty: str = 'medium') -> Dict[str, Any]:
+def get_ai_quiz(text: str, num_questions: int = 5, difficulty: str = 'medium', num_chunks: int = 0) -> Dict[str, Any]:
     """
     Génère un quiz IA basé sur le texte fourni
 
@@ -51,6 +52,7 @@ def get_ai_quiz(text: str, num_questions: int = 5, difficulty: str = 'medium') -
         text: Le texte sur lequel baser le quiz
         num_questions: Nombre de questions à générer
         difficulty: Difficulté ('easy', 'medium', 'hard')
+        num_chunks: Si > 0, ``text`` est déjà condensé (``phi3_ai.condense``)
 
     Returns:
         Dictionnaire avec 'success', 'questions' et métadonnées ou 'error'
@@ -60,13 +62,14 @@ def get_ai_quiz(text: str, num_questions: int = 5, difficulty: str = 'medium') -
             text,
             num_questions=num_questions,
             difficulty=difficulty,
-            language='french'
+            language='french',
+            num_chunks=num_chunks
         )
 
         if result.get('success'):
             return {
                 'success': True,
-                'questions': result['quiz'],
+                'questions': result['questions'],
                 'quiz_data': {
                     'model': result.get('model', 'gpt-4o-mini'),
                     'num_questions': num_questions,
@@ -0,0 +1,73 @@
+"""
+Découpage des textes de cours en sections bornées en tokens
+
+Utilisé par le pipeline map-reduce des résumés (core.phi3_ai) et par
+l'index de recherche des cours. Le nombre de tokens est estimé (≈ 4
+caractères par token) pour ne pas dépendre d'un tokenizer.
+"""
+from __future__ import annotations
+
+import re
+from typing import List
+
+CHARS_PER_TOKEN = 4
+
+_PARAGRAPH_SPLIT = re.compile(r"\n\s*\n")
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?…])\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimation grossière du nombre de tokens d'un texte"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def split_paragraphs(text: str) -> List[str]:
+    """Paragraphes non vides du texte, espaces normalisés"""
+    return [p.strip() for p in _PARAGRAPH_SPLIT.split(text or "") if p.strip()]
+
+
+def _split_oversized(paragraph: str, max_chars: int) -> List[str]:
+    """Coupe un paragraphe trop long aux fins de phrase, sinon en dur"""
+    pieces: List[str] = []
+    current = ""
+    for sentence in _SENTENCE_SPLIT.split(paragraph):
+        while len(sentence) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(sentence[:max_chars])
+            sentence = sentence[max_chars:]
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            pieces.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def split_into_chunks(text: str, max_tokens: int = 2500) -> List[str]:
+    """Regroupe les paragraphes en sections d'au plus ``max_tokens`` tokens.
+
+    Les frontières de paragraphes sont respectées autant que possible;
+    l'ordre du texte est conservé.
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    chunks: List[str] = []
+    current: List[str] = []
+    current_len = 0
+
+    for paragraph in split_paragraphs(text):
+        parts = _split_oversized(paragraph, max_chars) if len(paragraph) > max_chars else [paragraph]
+        for part in parts:
+            # +2 pour le séparateur "\n\n"
+            if current and current_len + 2 + len(part) > max_chars:
+                chunks.append("\n\n".join(current))
+                current, current_len = [], 0
+            current.append(part)
+            current_len += len(part) + (2 if current_len else 0)
+
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
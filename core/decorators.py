@@ -3,7 +3,9 @@ from __future__ import annotations
 from functools import wraps
 from typing import Callable
 
+from asgiref.sync import sync_to_async
 from django.contrib import messages
+from django.contrib.auth.views import redirect_to_login
 from django.db import models
 from django.http import HttpRequest, HttpResponse
 from django.shortcuts import redirect
@@ -33,3 +35,39 @@ def subscription_required(view_func: Callable) -> Callable:
         return view_func(request, *args, **kwargs)
 
     return _wrapped_view
+
+
+def async_login_required(view_func: Callable) -> Callable:
+    """Équivalent de ``login_required`` pour les vues ``async def``.
+
+    Le décorateur de Django 4.2 n'est pas compatible avec les coroutines:
+    l'accès à ``request.user`` (requête en base) passe par sync_to_async.
+    """
+
+    @wraps(view_func)
+    async def _wrapped_view(request: HttpRequest, *args, **kwargs) -> HttpResponse:
+        is_authenticated = await sync_to_async(lambda: request.user.is_authenticated)()
+        if not is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await view_func(request, *args, **kwargs)
+
+    return _wrapped_view
+
+
+def async_subscription_required(view_func: Callable) -> Callable:
+    """Version asynchrone de ``subscription_required`` (version d'essai)"""
+
+    @wraps(view_func)
+    async def _wrapped_view(request: HttpRequest, *args, **kwargs) -> HttpResponse:
+        is_authenticated = await sync_to_async(lambda: request.user.is_authenticated)()
+        if not is_authenticated:
+            return redirect(f"{reverse('login')}?next={request.path}")
+
+        await sync_to_async(messages.info)(
+            request,
+            "Version d'essai - Toutes les fonctionnalités sont actuellement disponibles.",
+        )
+
+        return await view_func(request, *args, **kwargs)
+
+    return _wrapped_view
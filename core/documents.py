@@ -0,0 +1,121 @@
+"""
+Stockage des documents de cours adressé par le contenu
+
+L'empreinte SHA-256 d'un fichier uploadé est calculée en lisant l'upload
+par blocs (``UploadedFile.chunks()``), sans le charger en mémoire. Un
+fichier déjà connu n'est ni réécrit sur disque ni ré-extrait: le nouveau
+``Course`` référence le ``CourseDocument`` existant, qui porte aussi le
+texte extrait et les résumés IA partagés.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+from typing import Optional, Tuple
+
+from django.db import IntegrityError, transaction
+
+from .extraction import stats_from_extraction
+
+logger = logging.getLogger(__name__)
+
+
+def hash_upload(uploaded_file) -> str:
+    """SHA-256 du contenu d'un fichier uploadé, lu par blocs"""
+    digest = hashlib.sha256()
+    for block in uploaded_file.chunks():
+        digest.update(block)
+    uploaded_file.seek(0)
+    return digest.hexdigest()
+
+
+def get_or_create_document(uploaded_file) -> Tuple["CourseDocument", bool]:
+    """Document partagé correspondant au fichier uploadé (créé s'il est nouveau)"""
+    from .models import CourseDocument
+
+    sha256 = hash_upload(uploaded_file)
+    document = CourseDocument.objects.filter(sha256=sha256).first()
+    if document is not None:
+        logger.info(f"Document {sha256[:12]} déjà connu, fichier et extraction réutilisés")
+        return document, False
+
+    extension = os.path.splitext(uploaded_file.name or '')[1].lower()
+    document = CourseDocument(
+        sha256=sha256,
+        size=uploaded_file.size or 0,
+        content_type=getattr(uploaded_file, 'content_type', None) or '',
+    )
+    # Nom de fichier dérivé de l'empreinte: un contenu = un fichier
+    document.file.save(f"{sha256[:2]}/{sha256}{extension}", uploaded_file, save=False)
+    try:
+        with transaction.atomic():
+            document.save()
+    except IntegrityError:
+        # Upload concurrent du même fichier: on garde le document déjà enregistré
+        document.file.delete(save=False)
+        return CourseDocument.objects.get(sha256=sha256), False
+    return document, True
+
+
+def attach_document(course, uploaded_file) -> bool:
+    """Rattache le cours au document partagé de ``uploaded_file``.
+
+    ``course.file`` pointe vers le fichier du document (pas de copie sous
+    ``courses/``). Renvoie ``True`` si le texte du document est déjà extrait.
+    """
+    document, _ = get_or_create_document(uploaded_file)
+    course.document = document
+    course.file = document.file.name
+    if document.extraction_status != 'completed':
+        return False
+    stats = document.extraction_stats
+    # Documents extraits avant l'enregistrement des métriques: le texte est relu
+    course.set_text_stats(stats_from_extraction(stats, None if 'word_count' in stats else document.extracted_text))
+    return True
+
+
+def claim_extraction(course) -> bool:
+    """Le cours doit-il lancer l'extraction de son document ?
+
+    Oui si le document est en attente ou en échec: il passe alors à
+    « extracting » de façon atomique. Sinon une extraction est déjà en cours
+    pour un autre cours du document, et la tâche met à jour tous ces cours à
+    sa fin. Si elle s'est terminée depuis ``attach_document``, le cours
+    reçoit ici les métriques du texte.
+    """
+    from .models import Course, CourseDocument
+
+    claimed = CourseDocument.objects.filter(
+        pk=course.document_id, extraction_status__in=('pending', 'failed')
+    ).update(extraction_status='extracting')
+    if claimed:
+        return True
+    document = CourseDocument.objects.only('extraction_status', 'extraction_stats').get(pk=course.document_id)
+    if document.extraction_status == 'completed':
+        course.set_text_stats(stats_from_extraction(document.extraction_stats))
+        course.processing_status = 'pending'
+        course.save(update_fields=[*Course.TEXT_STATS_FIELDS, 'processing_status', 'updated_at'])
+    return False
+
+
+def shared_summary(course, level: str, language: str) -> Optional[str]:
+    """Résumé déjà généré pour le document du cours, s'il existe"""
+    if not course.document_id:
+        return None
+    return course.document.ai_summaries.get(course.document.summary_key(level, language))
+
+
+def store_shared_summary(course, level: str, language: str, summary: str) -> None:
+    """Enregistre un résumé sur le document du cours pour les autres cours qui le partagent"""
+    from .models import Course, CourseDocument
+
+    if not course.document_id or not summary:
+        return
+    with transaction.atomic():
+        document = CourseDocument.objects.select_for_update().only('ai_summaries').get(pk=course.document_id)
+        document.ai_summaries[document.summary_key(level, language)] = summary
+        document.save(update_fields=['ai_summaries'])
+    # Document déjà chargé seulement: sinon une requête de plus (texte extrait compris) pour rien
+    if Course.document.is_cached(course):
+        course.document.ai_summaries = document.ai_summaries
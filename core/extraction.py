@@ -0,0 +1,284 @@
+"""
+Extraction du texte des documents de cours (TXT, PDF, DOCX)
+
+Utilisé par la tâche Celery ``extract_course_text_async`` sur le fichier
+enregistré dans le stockage, et par les vues sur un fichier uploadé.
+Un rappel ``progress(done, total)`` optionnel permet de suivre l'avancement
+page par page (PDF) ou paragraphe par paragraphe (DOCX).
+
+Les PDF longs disponibles sur disque sont découpés en plages de pages
+extraites en parallèle par un ``ProcessPoolExecutor`` (chaque worker rouvre
+le fichier par son chemin). L'ordre des pages est toujours celui du document.
+"""
+from __future__ import annotations
+
+import logging
+import math
+import mimetypes
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    import PyPDF2
+except ImportError:
+    PyPDF2 = None
+
+try:
+    from docx import Document
+except ImportError:
+    Document = None
+
+logger = logging.getLogger(__name__)
+
+ProgressCallback = Callable[[int, int], None]
+
+PDF_CONTENT_TYPE = 'application/pdf'
+TEXT_CONTENT_TYPE = 'text/plain'
+WORD_CONTENT_TYPES = (
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    'application/msword',
+)
+
+_EXTENSION_CONTENT_TYPES = {
+    '.pdf': PDF_CONTENT_TYPE,
+    '.txt': TEXT_CONTENT_TYPE,
+    '.docx': WORD_CONTENT_TYPES[0],
+    '.doc': WORD_CONTENT_TYPES[1],
+}
+
+
+class ExtractionError(Exception):
+    """Le texte du document n'a pas pu être extrait"""
+
+
+@dataclass
+class ExtractionResult:
+    """Texte extrait et métriques de l'extraction"""
+    text: str
+    pages: int = 0
+    failed_pages: List[Dict[str, object]] = field(default_factory=list)
+    elapsed: float = 0.0
+    workers: int = 1
+
+    @property
+    def pages_per_second(self) -> float:
+        return round(self.pages / self.elapsed, 1) if self.elapsed and self.pages else 0.0
+
+    def as_dict(self) -> Dict[str, object]:
+        return {
+            'char_count': len(self.text),
+            'word_count': count_words(self.text),
+            'pages': self.pages,
+            'failed_pages': self.failed_pages,
+            'elapsed': round(self.elapsed, 3),
+            'pages_per_second': self.pages_per_second,
+            'workers': self.workers,
+        }
+
+
+WORDS_PER_MINUTE = 200
+
+
+def count_words(text: str) -> int:
+    """Nombre de mots (séparés par des blancs) d'un texte"""
+    return len(text.split()) if text else 0
+
+
+def reading_minutes(word_count: int) -> int:
+    """Durée de lecture estimée en minutes (5 minutes au moins pour un texte non vide)"""
+    return max(5, word_count // WORDS_PER_MINUTE) if word_count else 0
+
+
+def text_stats(text: str, pages: int = 0) -> Dict[str, int]:
+    """Métriques d'un texte extrait, enregistrées sur le cours (voir ``Course.TEXT_STATS_FIELDS``)"""
+    words = count_words(text)
+    return {
+        'word_count': words,
+        'char_count': len(text or ''),
+        'page_count': pages,
+        'estimated_duration': reading_minutes(words),
+    }
+
+
+def stats_from_extraction(extraction_stats: Dict[str, object], text: Optional[str] = None) -> Dict[str, int]:
+    """Métriques du cours depuis ``ExtractionResult.as_dict()``; recalculées depuis ``text`` si absentes"""
+    if 'word_count' not in extraction_stats and text is not None:
+        return text_stats(text, extraction_stats.get('pages', 0))
+    words = extraction_stats.get('word_count', 0)
+    return {
+        'word_count': words,
+        'char_count': extraction_stats.get('char_count', 0),
+        'page_count': extraction_stats.get('pages', 0),
+        'estimated_duration': reading_minutes(words),
+    }
+
+
+def guess_content_type(file_name: str) -> str:
+    """Type MIME d'un fichier enregistré (le stockage ne conserve pas celui de l'upload)"""
+    extension = os.path.splitext(file_name or '')[1].lower()
+    return _EXTENSION_CONTENT_TYPES.get(extension) or mimetypes.guess_type(file_name or '')[0] or ''
+
+
+def extract_document(file, content_type: str, progress: Optional[ProgressCallback] = None,
+                     path: Optional[str] = None) -> ExtractionResult:
+    """Extrait le texte d'un fichier ouvert en binaire selon son type MIME.
+
+    ``path`` (chemin du même fichier sur disque) permet l'extraction
+    parallèle des PDF.
+    """
+    started = time.perf_counter()
+    try:
+        if content_type == TEXT_CONTENT_TYPE:
+            file.seek(0)
+            result = ExtractionResult(file.read().decode('utf-8', errors='ignore'))
+            if progress:
+                progress(1, 1)
+        elif content_type == PDF_CONTENT_TYPE:
+            result = _extract_pdf(file, progress, path)
+        elif content_type in WORD_CONTENT_TYPES:
+            result = ExtractionResult(_extract_docx(file, progress))
+        else:
+            raise ExtractionError(f'Format de fichier non supporté: {content_type}')
+    except Exception as e:
+        raise ExtractionError(f'Erreur lors de l\'extraction du texte: {str(e)}') from e
+
+    result.text = result.text.strip()
+    result.elapsed = time.perf_counter() - started
+    if result.pages:
+        logger.info(
+            f"Extraction PDF: {result.pages} pages en {result.elapsed:.2f}s "
+            f"({result.pages_per_second} pages/s, {result.workers} worker(s), {len(result.failed_pages)} en échec)"
+        )
+    return result
+
+
+def extract_text(file, content_type: str, progress: Optional[ProgressCallback] = None,
+                 path: Optional[str] = None) -> str:
+    """Extrait le texte d'un fichier ouvert en binaire selon son type MIME"""
+    return extract_document(file, content_type, progress, path).text
+
+
+def extract_text_from_file(uploaded_file, progress: Optional[ProgressCallback] = None) -> str:
+    """
+    Extrait le texte d'un fichier uploadé selon son type MIME
+    Supporte: TXT, PDF, DOCX
+    """
+    content_type = getattr(uploaded_file, 'content_type', None) or guess_content_type(uploaded_file.name)
+    # Les gros uploads sont déjà sur disque (TemporaryUploadedFile)
+    path = uploaded_file.temporary_file_path() if hasattr(uploaded_file, 'temporary_file_path') else None
+    return extract_text(uploaded_file, content_type, progress, path)
+
+
+def _extract_pdf(file, progress: Optional[ProgressCallback], path: Optional[str] = None) -> ExtractionResult:
+    if not PyPDF2:
+        raise ExtractionError('PyPDF2 n\'est pas installé. Installez-le avec: pip install PyPDF2')
+
+    file.seek(0)
+    try:
+        reader = PyPDF2.PdfReader(file)
+        total = len(reader.pages)
+        workers = _pdf_workers(total) if path else 1
+
+        pages = None
+        if workers > 1:
+            try:
+                pages = _extract_pages_parallel(path, total, workers, progress)
+            except (BrokenProcessPool, OSError, AssertionError) as pool_error:
+                # AssertionError: processus démon (« daemonic processes are not allowed to have children »)
+                logger.warning(f"Extraction PDF parallèle impossible ({pool_error}), extraction séquentielle")
+                workers = 1
+        if pages is None:
+            pages = _extract_page_range(reader, 0, total, progress)
+
+        failed_pages = [{'page': number + 1, 'error': error} for number, _, error in pages if error]
+        for failure in failed_pages:
+            logger.warning(f"Erreur page {failure['page']}: {failure['error']}")
+        text = '\n\n'.join(page_text for _, page_text, _ in pages if page_text)
+    except PyPDF2.errors.PdfReadError as pdf_error:
+        raise ExtractionError(f'Erreur de lecture PDF: {str(pdf_error)}. Le fichier peut être corrompu ou protégé.')
+    except Exception as pdf_error:
+        if 'EOF marker not found' in str(pdf_error):
+            raise ExtractionError('Le fichier PDF est corrompu ou incomplet. Veuillez vérifier que le fichier a été correctement téléchargé.')
+        raise ExtractionError(f'Erreur lors de l\'extraction PDF: {str(pdf_error)}')
+
+    if not text.strip():
+        raise ExtractionError('Aucun texte lisible trouvé dans le PDF. Le fichier peut être corrompu, protégé par mot de passe, ou contenir uniquement des images.')
+    return ExtractionResult(text, pages=total, failed_pages=failed_pages, workers=workers)
+
+
+PageResult = Tuple[int, str, str]  # (index de page, texte, erreur)
+
+
+def _extract_page_range(reader, start: int, end: int,
+                        progress: Optional[ProgressCallback] = None) -> List[PageResult]:
+    results: List[PageResult] = []
+    for page_num in range(start, end):
+        try:
+            page_text = (reader.pages[page_num].extract_text() or '').strip()
+            results.append((page_num, page_text, ''))
+        except Exception as page_error:
+            results.append((page_num, '', str(page_error)))
+        if progress:
+            progress(page_num + 1, end)
+    return results
+
+
+def _extract_page_range_from_path(path: str, start: int, end: int) -> List[PageResult]:
+    """Exécuté dans un worker: rouvre le PDF par son chemin (rien de lourd à sérialiser)"""
+    return _extract_page_range(PyPDF2.PdfReader(path), start, end)
+
+
+def _extract_pages_parallel(path: str, total: int, workers: int,
+                            progress: Optional[ProgressCallback]) -> List[PageResult]:
+    # Plusieurs plages par worker pour équilibrer les pages lentes
+    span = max(1, math.ceil(total / (workers * 4)))
+    ranges = [(start, min(start + span, total)) for start in range(0, total, span)]
+
+    pages: List[PageResult] = []
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        futures = [executor.submit(_extract_page_range_from_path, path, start, end) for start, end in ranges]
+        for future in as_completed(futures):
+            pages.extend(future.result())
+            if progress:
+                progress(len(pages), total)
+
+    # Ordre déterministe quel que soit l'ordre de fin des workers
+    pages.sort(key=lambda page: page[0])
+    return pages
+
+
+def _pdf_workers(total_pages: int) -> int:
+    """Nombre de processus à utiliser (1 = extraction séquentielle)"""
+    from django.conf import settings
+
+    if total_pages < getattr(settings, 'PDF_PARALLEL_MIN_PAGES', 20):
+        return 1
+    # Un processus démon (worker Celery prefork) ne peut pas créer de processus enfants
+    if multiprocessing.current_process().daemon:
+        return 1
+    workers = getattr(settings, 'PDF_EXTRACTION_WORKERS', None) or min(4, os.cpu_count() or 1)
+    return max(1, min(workers, math.ceil(total_pages / 5)))
+
+
+def _extract_docx(file, progress: Optional[ProgressCallback]) -> str:
+    if not Document:
+        raise ExtractionError('python-docx n\'est pas installé. Installez-le avec: pip install python-docx')
+
+    file.seek(0)
+    doc = Document(file)
+    total = len(doc.paragraphs)
+    paragraphs = []
+
+    for index, paragraph in enumerate(doc.paragraphs, 1):
+        if paragraph.text.strip():
+            paragraphs.append(paragraph.text.strip())
+        if progress and (index % 200 == 0 or index == total):
+            progress(index, total)
+
+    return '\n\n'.join(paragraphs)
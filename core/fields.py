@@ -0,0 +1,72 @@
+"""
+Champs de modèle personnalisés
+
+``CompressedTextField`` stocke un texte compressé dans une colonne binaire
+et le restitue décompressé (``str``) à la lecture. zlib (bibliothèque
+standard) est utilisé par défaut; zstd si ``COURSE_TEXT_CODEC = 'zstd'``
+et que le paquet ``zstandard`` est installé. Le format est reconnu à la
+lecture par l'en-tête du flux: changer de codec ne demande aucune migration.
+"""
+from __future__ import annotations
+
+import zlib
+
+from django.conf import settings
+from django.db import models
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+_ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+
+def compress_text(text: str) -> bytes:
+    """Texte compressé avec le codec configuré (vide si le texte est vide)"""
+    if not text:
+        return b''
+    raw = text.encode('utf-8')
+    if zstandard and getattr(settings, 'COURSE_TEXT_CODEC', 'zlib') == 'zstd':
+        return zstandard.ZstdCompressor(level=getattr(settings, 'COURSE_TEXT_COMPRESSION_LEVEL', 6)).compress(raw)
+    return zlib.compress(raw, getattr(settings, 'COURSE_TEXT_COMPRESSION_LEVEL', 6))
+
+
+def decompress_text(payload) -> str:
+    """Texte d'une valeur produite par ``compress_text`` (zlib ou zstd)"""
+    if not payload:
+        return ''
+    payload = bytes(payload)
+    if payload.startswith(_ZSTD_MAGIC):
+        if not zstandard:
+            raise RuntimeError('Texte compressé en zstd: installez le paquet zstandard pour le lire')
+        return zstandard.ZstdDecompressor().decompress(payload).decode('utf-8')
+    return zlib.decompress(payload).decode('utf-8')
+
+
+class CompressedTextField(models.BinaryField):
+    """Texte compressé en base, ``str`` côté Python"""
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('default', b'')
+        super().__init__(*args, **kwargs)
+
+    def get_default(self):
+        default = super().get_default()
+        return default if isinstance(default, str) else decompress_text(default)
+
+    def from_db_value(self, value, expression, connection):
+        return decompress_text(value)
+
+    def to_python(self, value):
+        if isinstance(value, str):
+            return value
+        return decompress_text(value)
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if isinstance(value, str):
+            value = compress_text(value)
+        return super().get_db_prep_value(value, connection, prepared)
+
+    def value_to_string(self, obj):
+        return self.value_from_object(obj)
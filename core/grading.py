@@ -0,0 +1,189 @@
+"""
+Correction des parties de quiz
+
+``GradingEngine`` est construit une fois par payload de quiz (voir
+core/quiz_payload.py) avec un index question_id -> question; une partie est
+corrigée en un seul passage sur ses questions, chaque réponse étant lue par
+identifiant dans le dictionnaire des réponses.
+
+``regrade_attempts`` recorrige d'un coup plusieurs tentatives déjà
+enregistrées après la modification d'une question: les réponses par index
+sont recomparées à la position d'origine de la bonne option, les réponses
+libres de toutes les tentatives sont évaluées en un seul calcul de
+similarité.
+"""
+from __future__ import annotations
+
+import logging
+from typing import Any, Dict, List, Optional
+
+from django.db import transaction
+
+from .quiz_payload import INDEXED_TYPES, get_quiz_payload
+from .similarity import evaluate_quiz_answers, normalize_answer
+
+logger = logging.getLogger(__name__)
+
+REGRADE_BATCH_SIZE = 500
+
+
+def _selected_index(answer, options_count: int) -> Optional[int]:
+    try:
+        index = int(answer)
+    except (TypeError, ValueError):
+        return None
+    return index if 0 <= index < options_count else None
+
+
+def _correct_option(question: Dict[str, Any]) -> Optional[str]:
+    options = question['options']
+    return options[question['correct_index']] if options else None
+
+
+class GradingEngine:
+    """Correction des tentatives d'un quiz à partir de son payload compilé"""
+
+    def __init__(self, payload: Dict[str, Any]):
+        self.payload = payload
+        self.index = {question['id']: question for question in payload['questions']}
+
+    @classmethod
+    def for_quiz(cls, quiz) -> 'GradingEngine':
+        return cls(get_quiz_payload(quiz))
+
+    def grade(self, played: List[Dict[str, Any]], answers: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Correction d'une partie: une entrée par question, dans l'ordre affiché.
+
+        ``played`` est la liste produite par ``shuffle_payload`` et
+        ``answers`` les réponses brutes ({question_id: index ou texte}). Les
+        réponses libres sont comparées après normalisation; l'évaluation par
+        similarité (``evaluate_attempt_answers_async``) peut ensuite les réviser.
+        """
+        records = []
+        for item in played:
+            question = item['question']
+            answer = answers.get(question['id'], '')
+            options = item['options']
+            if question['question_type'] in INDEXED_TYPES and options:
+                selected = _selected_index(answer, len(options))
+                is_correct = selected is not None and selected == item['correct_answer_index']
+                correct_answer = options[item['correct_answer_index']]
+            else:
+                selected = None
+                is_correct = bool(answer) and normalize_answer(answer) == normalize_answer(question['correct_answer'])
+                correct_answer = question['correct_answer']
+            records.append({
+                'question_id': question['id'],
+                'options': options,
+                'permutation': item['permutation'],
+                'correct_answer_index': item['correct_answer_index'],
+                'correct_answer': correct_answer,
+                'answer': answer,
+                'selected_index': selected,
+                'is_correct': is_correct,
+            })
+        return records
+
+    def regrade_attempts(self, attempts) -> List[Any]:
+        """Recorrige ``attempts`` selon les questions actuelles; renvoie les tentatives modifiées.
+
+        L'ordre des options affiché à chaque joueur est celui enregistré dans
+        ``question_results`` (voir ``_regrade_indexed``). Les questions
+        supprimées depuis gardent leur correction.
+        """
+        free_text = []  # (tentative, enregistrement, réponse, réponse attendue)
+        changed = {}
+        for attempt in attempts:
+            for record in attempt.question_results or []:
+                question = self.index.get(record['question_id'])
+                if question is None:
+                    continue
+                if question['question_type'] in INDEXED_TYPES and record['options']:
+                    update = self._regrade_indexed(question, record)
+                else:
+                    free_text.append((attempt, record, record['answer'], question['correct_answer']))
+                    continue
+                if any(record.get(key) != value for key, value in update.items()):
+                    record.update(update)
+                    changed[attempt.pk] = attempt
+
+        if free_text:
+            evaluations = evaluate_quiz_answers([(answer, expected) for _, _, answer, expected in free_text])
+            for (attempt, record, _, expected), evaluation in zip(free_text, evaluations):
+                if record['is_correct'] != evaluation['is_correct'] or record['correct_answer'] != expected:
+                    record.update(is_correct=evaluation['is_correct'], correct_answer=expected)
+                    changed[attempt.pk] = attempt
+
+        for attempt in changed.values():
+            attempt.score = sum(1 for record in attempt.question_results if record['is_correct'])
+        return list(changed.values())
+
+    @staticmethod
+    def _regrade_indexed(question: Dict[str, Any], record: Dict[str, Any]) -> Dict[str, Any]:
+        """Correction d'une réponse par index selon la question actuelle.
+
+        La bonne option est retrouvée par sa position d'origine
+        (``permutation`` de la partie): une option renommée reste la bonne
+        réponse. Sans permutation utilisable (tentatives plus anciennes,
+        nombre d'options modifié), elle est recherchée par son texte, et à
+        défaut la position enregistrée est conservée.
+        """
+        correct_answer = _correct_option(question)
+        options = record['options']
+        permutation = record.get('permutation')
+        if permutation and sorted(permutation) == list(range(len(question['options']))):
+            # Mêmes positions, textes actuels
+            options = [question['options'][i] for i in permutation]
+            correct_index = permutation.index(question['correct_index'])
+        elif correct_answer in options:
+            correct_index = options.index(correct_answer)
+        else:
+            correct_index = record['correct_answer_index']
+        selected = record['selected_index']
+        return {
+            'options': options,
+            'correct_answer': correct_answer,
+            'correct_answer_index': correct_index,
+            'is_correct': selected is not None and selected == correct_index,
+        }
+
+
+def regrade_quiz_attempts(quiz, batch_size: int = REGRADE_BATCH_SIZE) -> int:
+    """Recorrige toutes les tentatives enregistrées d'un quiz, par lots; renvoie le nombre de tentatives modifiées"""
+    from .models import QuizAttempt
+
+    engine = GradingEngine.for_quiz(quiz)
+    attempts = (
+        QuizAttempt.objects.filter(quiz=quiz, is_completed=True)
+        .exclude(shuffle_seed=None)
+        .only('id', 'question_results', 'score', 'total_questions', 'is_completed', 'score_percentage', 'passed')
+        .iterator(chunk_size=batch_size)
+    )
+    updated = 0
+    batch = []
+    for attempt in attempts:
+        batch.append(attempt)
+        if len(batch) >= batch_size:
+            updated += _save_regraded(quiz, engine.regrade_attempts(batch))
+            batch = []
+    updated += _save_regraded(quiz, engine.regrade_attempts(batch))
+    logger.info(f"Quiz {quiz.id}: {updated} tentatives recorrigées")
+    return updated
+
+
+def _save_regraded(quiz, attempts) -> int:
+    from .models import Quiz, QuizAttempt
+
+    if not attempts:
+        return 0
+    deltas = [0, 0, 0]
+    for attempt in attempts:
+        # bulk_update ne passe pas par save(): pourcentage, réussite et statistiques du quiz mis à jour ici
+        if attempt.total_questions > 0:
+            attempt.score_percentage = round((attempt.score / attempt.total_questions) * 100, 2)
+            attempt.passed = attempt.score_percentage >= quiz.passing_score
+        deltas = [total + delta for total, delta in zip(deltas, attempt.stats_delta())]
+    with transaction.atomic():
+        QuizAttempt.objects.bulk_update(attempts, ['question_results', 'score', 'score_percentage', 'passed'])
+        Quiz.add_attempt_stats(quiz.id, *deltas)
+    return len(attempts)
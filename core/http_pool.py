@@ -0,0 +1,119 @@
+"""
+Session HTTP partagée (pool de connexions keep-alive) pour les clients externes
+
+Tous les appels sortants (OpenAI, Lygos, ...) passent par une seule
+``requests.Session`` par processus : les connexions TCP/TLS sont réutilisées
+d'un appel à l'autre au lieu d'être renégociées à chaque requête.
+"""
+from __future__ import annotations
+
+import os
+import threading
+from typing import Any, Dict, Optional
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+_lock = threading.Lock()
+_session: Optional[requests.Session] = None
+_session_pid: Optional[int] = None
+
+
+class MeteredHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter qui expose des métriques de réutilisation des connexions"""
+
+    def __init__(self, *args, **kwargs):
+        self._stats_lock = threading.Lock()
+        self.requests_sent = 0
+        self.errors = 0
+        super().__init__(*args, **kwargs)
+
+    def send(self, request, **kwargs):
+        with self._stats_lock:
+            self.requests_sent += 1
+        try:
+            return super().send(request, **kwargs)
+        except Exception:
+            with self._stats_lock:
+                self.errors += 1
+            raise
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Agrège les compteurs urllib3 de chaque pool (un pool par hôte)"""
+        hosts: Dict[str, Dict[str, int]] = {}
+        connections_opened = 0
+        pool_requests = 0
+        for key in list(self.poolmanager.pools.keys()):
+            pool = self.poolmanager.pools.get(key)
+            if pool is None:
+                continue
+            opened = getattr(pool, "num_connections", 0)
+            sent = getattr(pool, "num_requests", 0)
+            connections_opened += opened
+            pool_requests += sent
+            # La file du pool est pré-remplie de None: ne compter que les sockets ouvertes
+            idle = sum(1 for conn in list(pool.pool.queue) if conn is not None) if pool.pool is not None else 0
+            hosts[f"{key.key_scheme}://{key.key_host}:{key.key_port}"] = {
+                "connections_opened": opened,
+                "requests": sent,
+                "idle_connections": idle,
+            }
+        return {
+            "requests_sent": self.requests_sent,
+            "errors": self.errors,
+            "connections_opened": connections_opened,
+            "connections_reused": max(0, pool_requests - connections_opened),
+            "hosts": hosts,
+        }
+
+
+def _build_session() -> requests.Session:
+    session = requests.Session()
+    adapter = MeteredHTTPAdapter(
+        # Nombre d'hôtes distincts gardés en cache (un pool par hôte)
+        pool_connections=getattr(settings, "HTTP_POOL_CONNECTIONS", 10),
+        # Connexions keep-alive conservées par hôte
+        pool_maxsize=getattr(settings, "HTTP_POOL_MAXSIZE", 20),
+        # Bloquer plutôt que d'ouvrir des connexions jetables au-delà de la limite
+        pool_block=getattr(settings, "HTTP_POOL_BLOCK", False),
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Connection": "keep-alive"})
+    return session
+
+
+def get_http_session() -> requests.Session:
+    """Retourne la session partagée du processus courant.
+
+    La session est recréée après un fork (gunicorn ``--preload``, workers
+    Celery) pour ne jamais partager de sockets entre processus.
+    """
+    global _session, _session_pid
+    pid = os.getpid()
+    if _session is None or _session_pid != pid:
+        with _lock:
+            if _session is None or _session_pid != pid:
+                _session = _build_session()
+                _session_pid = pid
+    return _session
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """Métriques de réutilisation des connexions du processus courant"""
+    session = get_http_session()
+    adapter = session.get_adapter("https://")
+    if isinstance(adapter, MeteredHTTPAdapter):
+        return adapter.get_stats()
+    return {}
+
+
+def close_http_session() -> None:
+    """Ferme toutes les connexions du pool (tests, arrêt du worker)"""
+    global _session, _session_pid
+    with _lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+        _session_pid = None
@@ -0,0 +1,200 @@
+"""
+Cache des réponses LLM adressé par le contenu
+
+Les réponses sont indexées par le SHA-256 de la requête complète (messages,
+modèle, température, max_tokens). Deux niveaux:
+- L1: cache Django (mémoire/Redis), pour les lectures répétées; un hit L1
+  rafraîchit aussi l'entrée L2 (LRU), au plus une fois par
+  AI_CACHE_TOUCH_INTERVAL secondes
+- L2: table ``ai_engine.LLMResponseCache``, persistante, avec TTL et éviction LRU
+
+Les régénérations explicites ne lisent pas le cache (la température rend
+les réponses variables) mais y écrivent la nouvelle réponse.
+
+Toute erreur du cache est journalisée sans jamais bloquer l'appel à l'API.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, Q
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+class LLMCache:
+    """Cache à deux niveaux des complétions, avec compteurs de hits/misses"""
+
+    L1_PREFIX = "llm:"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.l1_hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return getattr(settings, "AI_CACHE_ENABLED", True)
+
+    @property
+    def ttl(self) -> int:
+        return getattr(settings, "AI_CACHE_TTL", 30 * 24 * 3600)
+
+    @property
+    def touch_interval(self) -> int:
+        return getattr(settings, "AI_CACHE_TOUCH_INTERVAL", 300)
+
+    @staticmethod
+    def make_key(messages: List[Dict[str, str]], model: str, temperature: float, max_tokens: int, **extra: Any) -> str:
+        """SHA-256 canonique de la requête (ordre des clés normalisé)"""
+        payload = {
+            "messages": messages,
+            "model": model,
+            "temperature": float(temperature),
+            "max_tokens": int(max_tokens),
+        }
+        payload.update(extra)
+        raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+
+        cached = cache.get(self.L1_PREFIX + key)
+        if cached is not None:
+            # (réponse, date du dernier rafraîchissement L2)
+            response, touched_at = cached if isinstance(cached, tuple) else (cached, 0)
+            if time.time() - touched_at >= self.touch_interval:
+                self._touch(key, response)
+            self._count(hits=1, l1_hits=1)
+            return response
+
+        from ai_engine.models import LLMResponseCache
+
+        try:
+            now = timezone.now()
+            entry = (
+                LLMResponseCache.objects
+                .filter(key=key)
+                .filter(Q(expires_at__isnull=True) | Q(expires_at__gt=now))
+                .only("response")
+                .first()
+            )
+            if entry is None:
+                self._count(misses=1)
+                return None
+            # Mise à jour LRU sans relire la ligne
+            LLMResponseCache.objects.filter(key=key).update(
+                hit_count=F("hit_count") + 1,
+                last_accessed_at=now,
+            )
+        except Exception as e:
+            logger.warning(f"Cache LLM indisponible (lecture): {e}")
+            self._count(misses=1)
+            return None
+
+        self._set_l1(key, entry.response)
+        self._count(hits=1)
+        return entry.response
+
+    def set(self, key: str, response: str, model_name: str) -> None:
+        if not self.enabled or not response:
+            return
+
+        from ai_engine.models import LLMResponseCache
+
+        now = timezone.now()
+        try:
+            LLMResponseCache.objects.update_or_create(
+                key=key,
+                defaults={
+                    "model_name": model_name,
+                    "response": response,
+                    "last_accessed_at": now,
+                    "expires_at": now + timedelta(seconds=self.ttl) if self.ttl else None,
+                },
+            )
+        except Exception as e:
+            logger.warning(f"Cache LLM indisponible (écriture): {e}")
+            return
+
+        self._set_l1(key, response)
+        with self._lock:
+            self.writes += 1
+            should_evict = self.writes % getattr(settings, "AI_CACHE_EVICTION_INTERVAL", 100) == 0
+        if should_evict:
+            self.evict()
+
+    def _set_l1(self, key: str, response: str) -> None:
+        cache.set(self.L1_PREFIX + key, (response, time.time()), min(self.ttl, 3600))
+
+    def _touch(self, key: str, response: str) -> None:
+        """Rafraîchit l'entrée L2 d'un hit L1 (les hits L1 intermédiaires ne sont pas comptés)"""
+        from ai_engine.models import LLMResponseCache
+
+        try:
+            LLMResponseCache.objects.filter(key=key).update(
+                hit_count=F("hit_count") + 1,
+                last_accessed_at=timezone.now(),
+            )
+        except Exception as e:
+            logger.warning(f"Cache LLM indisponible (rafraîchissement): {e}")
+            return
+        self._set_l1(key, response)
+
+    def evict(self) -> int:
+        """Supprime les entrées expirées puis les moins récemment utilisées au-delà de la limite"""
+        from ai_engine.models import LLMResponseCache
+
+        deleted = 0
+        try:
+            deleted += LLMResponseCache.objects.filter(expires_at__lte=timezone.now()).delete()[0]
+
+            max_entries = getattr(settings, "AI_CACHE_MAX_ENTRIES", 10000)
+            cutoff = (
+                LLMResponseCache.objects
+                .order_by("-last_accessed_at")
+                .values_list("last_accessed_at", flat=True)[max_entries:max_entries + 1]
+            )
+            cutoff = list(cutoff)
+            if cutoff:
+                deleted += LLMResponseCache.objects.filter(last_accessed_at__lte=cutoff[0]).delete()[0]
+        except Exception as e:
+            logger.warning(f"Éviction du cache LLM impossible: {e}")
+            return 0
+
+        self._count(evictions=deleted)
+        return deleted
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "l1_hits": self.l1_hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups * 100, 1) if lookups else 0.0,
+        }
+
+    def _count(self, **increments: int) -> None:
+        with self._lock:
+            for name, value in increments.items():
+                setattr(self, name, getattr(self, name) + value)
+
+
+llm_cache = LLMCache()
@@ -6,6 +6,8 @@ from typing import Any, Dict, Optional
 import requests
 from django.conf import settings
 
+from .http_pool import get_http_session
+
 logger = logging.getLogger(__name__)
 
 
@@ -33,19 +35,19 @@ class LygosClient:
 
     def list_gateways(self) -> Dict[str, Any]:
         url = f"{self.base_url}/gateway"
-        resp = requests.get(url, headers=self._headers(), timeout=30)
+        resp = get_http_session().get(url, headers=self._headers(), timeout=30)
         self._raise_for_status(resp)
         return resp.json()
 
     def get_gateway(self, gateway_id: str) -> Dict[str, Any]:
         url = f"{self.base_url}/gateway/{gateway_id}"
-        resp = requests.get(url, headers=self._headers(), timeout=30)
+        resp = get_http_session().get(url, headers=self._headers(), timeout=30)
         self._raise_for_status(resp)
         return resp.json()
 
     def get_payin_status(self, payin_id: str) -> Dict[str, Any]:
         url = f"{self.base_url}/payin/{payin_id}"
-        resp = requests.get(url, headers=self._headers(), timeout=30)
+        resp = get_http_session().get(url, headers=self._headers(), timeout=30)
         self._raise_for_status(resp)
         return resp.json()
 
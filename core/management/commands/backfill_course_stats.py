@@ -0,0 +1,71 @@
+"""
+Calcule les métriques de texte (mots, caractères, pages, durée estimée) des cours existants
+
+    python manage.py backfill_course_stats --batch-size 200
+    python manage.py backfill_course_stats --all   # recalcule aussi les cours déjà renseignés
+
+Les textes sont lus un par un (itérateurs par lots): la mémoire utilisée ne
+dépend pas du nombre de cours.
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.extraction import stats_from_extraction, text_stats
+from core.models import Course, CourseContent, CourseDocument
+
+
+class Command(BaseCommand):
+    help = "Renseigne word_count, char_count, page_count et estimated_duration des cours existants"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200, help="Lignes lues et écrites par lot")
+        parser.add_argument('--all', action='store_true', help="Recalcule aussi les cours déjà renseignés")
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+        courses = Course.objects.all() if options['all'] else Course.objects.filter(char_count=0)
+
+        shared = self._backfill_documents(courses, batch_size)
+        own = self._backfill_contents(courses, batch_size)
+        self.stdout.write(self.style.SUCCESS(
+            f"{shared} cours à document partagé et {own} cours à texte propre mis à jour"
+        ))
+
+    def _backfill_documents(self, courses, batch_size):
+        """Une fois par document: ses métriques valent pour tous les cours qui le partagent"""
+        updated = 0
+        documents = CourseDocument.objects.filter(extraction_status='completed').defer('extracted_text')
+        for document in documents.iterator(chunk_size=batch_size):
+            stats = document.extraction_stats or {}
+            if 'word_count' not in stats:
+                # Document extrait avant l'enregistrement des métriques: texte relu une fois
+                computed = text_stats(document.extracted_text, stats.get('pages', 0))
+                document.extraction_stats = {**stats, 'word_count': computed['word_count'], 'char_count': computed['char_count']}
+                document.save(update_fields=['extraction_stats'])
+            updated += courses.filter(document=document).update(**stats_from_extraction(document.extraction_stats))
+        return updated
+
+    def _backfill_contents(self, courses, batch_size):
+        """Cours sans document: texte de CourseContent, pages déjà connues conservées"""
+        updated = 0
+        batch = []
+        rows = (
+            CourseContent.objects.filter(course__in=courses.filter(document__isnull=True).values('pk'))
+            .values_list('course_id', 'extracted_text', 'course__page_count')
+            .iterator(chunk_size=batch_size)
+        )
+        for course_id, text, pages in rows:
+            course = Course(pk=course_id)
+            course.set_text_stats(text_stats(text, pages))
+            batch.append(course)
+            if len(batch) >= batch_size:
+                updated += self._save(batch)
+                batch = []
+        return updated + self._save(batch)
+
+    @staticmethod
+    def _save(batch):
+        if batch:
+            with transaction.atomic():
+                Course.objects.bulk_update(batch, Course.TEXT_STATS_FIELDS)
+        return len(batch)
@@ -0,0 +1,118 @@
+"""
+Mesure du temps de correction des parties de quiz
+
+    python manage.py benchmark_grading --sizes 10 100 1000 --attempts 200
+"""
+import random
+import time
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand
+
+from core.grading import GradingEngine
+from core.quiz_payload import shuffle_payload
+
+
+def synthetic_payload(num_questions, seed=0):
+    """Payload compilé d'un quiz fictif: QCM à 4 options, Vrai/Faux et réponses libres"""
+    rng = random.Random(seed)
+    questions = []
+    for i in range(num_questions):
+        kind = rng.choices(('multiple_choice', 'true_false', 'fill_blank'), weights=(6, 3, 1))[0]
+        if kind == 'multiple_choice':
+            options = [f"option {i}-{j}" for j in range(4)]
+        elif kind == 'true_false':
+            options = ['Vrai', 'Faux']
+        else:
+            options = []
+        correct_index = rng.randrange(len(options)) if options else 0
+        questions.append({
+            'id': f"q{i}",
+            'question_text': f"Question {i}",
+            'question_type': kind,
+            'correct_answer': options[correct_index] if options else f"réponse {i}",
+            'explanation': '',
+            'hint': '',
+            'points': 1,
+            'options': options,
+            'correct_index': correct_index,
+            'option_index': {option: j for j, option in enumerate(options)},
+        })
+    return {
+        'quiz_id': 'benchmark',
+        'version': 'benchmark',
+        'shuffle_questions': True,
+        'questions': questions,
+        'positions': {question['id']: j for j, question in enumerate(questions)},
+        'total_questions': num_questions,
+    }
+
+
+def synthetic_answers(played, rng):
+    answers = {}
+    for item in played:
+        question = item['question']
+        if item['options']:
+            answers[question['id']] = str(rng.randrange(len(item['options'])))
+        else:
+            answers[question['id']] = question['correct_answer'] if rng.random() < 0.5 else 'autre chose'
+    return answers
+
+
+def linear_grade(played, answers):
+    """Ancienne correction: recherche linéaire de la question de chaque réponse"""
+    score = 0
+    for question_id, answer in answers.items():
+        for item in played:
+            if item['question']['id'] == question_id:
+                if str(answer) == str(item['correct_answer_index']):
+                    score += 1
+                break
+    return score
+
+
+class Command(BaseCommand):
+    help = "Mesure le temps de correction d'une partie et de la recorrection groupée de tentatives"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000], help="Nombres de questions par quiz")
+        parser.add_argument('--attempts', type=int, default=200, help="Tentatives corrigées par mesure")
+        parser.add_argument('--repeat', type=int, default=3, help="Mesures par taille (la meilleure est retenue)")
+
+    def handle(self, *args, **options):
+        count, repeat = max(1, options['attempts']), max(1, options['repeat'])
+        self.stdout.write(f"{count} tentatives par mesure, meilleure de {repeat}")
+
+        for size in options['sizes']:
+            rng = random.Random(size)
+            payload = synthetic_payload(size)
+            engine = GradingEngine(payload)
+            games = []
+            for _ in range(count):
+                played = shuffle_payload(payload, rng.randrange(2 ** 31))
+                games.append((played, synthetic_answers(played, rng)))
+
+            linear = self._best(repeat, lambda: [linear_grade(played, answers) for played, answers in games])
+            single = self._best(repeat, lambda: [engine.grade(played, answers) for played, answers in games])
+
+            attempts = [
+                SimpleNamespace(pk=i, question_results=engine.grade(played, answers), score=0)
+                for i, (played, answers) in enumerate(games)
+            ]
+            batch = self._best(repeat, lambda: engine.regrade_attempts(attempts))
+
+            self.stdout.write(
+                f"{size:5d} questions: linéaire {linear / count * 1e3:8.3f} ms  "
+                f"un passage {single / count * 1e3:8.3f} ms  "
+                f"recorrection groupée {batch / count * 1e3:8.3f} ms  (par tentative)"
+            )
+
+    @staticmethod
+    def _best(repeat, func):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best
@@ -0,0 +1,63 @@
+"""
+Mesure du débit du prétraitement des textes (Mo/s)
+
+    python manage.py benchmark_preprocessing --sizes 1 5 --repeat 3
+"""
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.preprocessing import PreprocessingEngine
+
+_VOCABULARY = (
+    "la probabilité d'un événement est comprise entre zéro et un . "
+    "une variable aléatoire associe un nombre réel à chaque issue , "
+    "l'espérance mesure la valeur moyenne attendue ! la variance mesure la dispersion ? "
+    "le théorème central limite justifie l'approximation par la loi normale . "
+    "les étudiants révisent les définitions , les formules et les exemples du chapitre ."
+).split()
+
+
+def synthetic_text(size_bytes, seed=0):
+    """Texte pseudo-français d'environ ``size_bytes`` octets, en paragraphes"""
+    rng = random.Random(seed)
+    parts, size = [], 0
+    while size < size_bytes:
+        sentence = ' '.join(rng.choices(_VOCABULARY, k=rng.randint(8, 25))) + ' .'
+        parts.append(sentence + ('\n\n' if rng.random() < 0.2 else ' '))
+        size += len(parts[-1].encode('utf-8'))
+    return ''.join(parts)
+
+
+class Command(BaseCommand):
+    help = "Mesure le débit (Mo/s) du moteur de prétraitement sur des textes synthétiques"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=float, nargs='+', default=[0.5, 1, 5], help="Tailles de texte en Mo")
+        parser.add_argument('--repeat', type=int, default=3, help="Mesures par taille (la meilleure est retenue)")
+        parser.add_argument('--window', type=int, default=None, help="Taille des fenêtres en caractères")
+
+    def handle(self, *args, **options):
+        engine = PreprocessingEngine(window_chars=options['window'])
+
+        started = time.perf_counter()
+        engine.load()
+        self.stdout.write(
+            f"Chargement du moteur: {time.perf_counter() - started:.3f}s "
+            f"({'NLTK' if engine.use_nltk else 'expressions régulières'}, fenêtres de {engine.window_chars} caractères)"
+        )
+
+        for size_mb in options['sizes']:
+            text = synthetic_text(int(size_mb * 1024 * 1024))
+            megabytes = len(text.encode('utf-8')) / (1024 * 1024)
+            best = min(self._timed(engine, text) for _ in range(max(1, options['repeat'])))
+            self.stdout.write(
+                f"{megabytes:6.2f} Mo: {best:7.3f}s  {megabytes / best:6.2f} Mo/s  {best / megabytes:6.3f} s/Mo"
+            )
+
+    @staticmethod
+    def _timed(engine, text):
+        started = time.perf_counter()
+        engine.preprocess(text)
+        return time.perf_counter() - started
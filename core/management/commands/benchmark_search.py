@@ -0,0 +1,117 @@
+"""
+Mesure de l'index inversé de recherche sur un corpus de cours fictif
+
+    python manage.py benchmark_search --sizes 10000 100000 --words 300 --queries 200
+
+Pour chaque taille: construction et écriture du segment, ouverture par mmap,
+temps moyen d'une requête (un mot, deux mots, expression), comparés à un
+parcours linéaire des textes (équivalent d'un filtre ``icontains``), puis
+coût des mises à jour incrémentales. Aucune écriture en base.
+"""
+import os
+import random
+import tempfile
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+
+from core.search.inverted import IndexBuilder, InvertedIndex, MappedSegment
+
+SYLLABLES = ('ma', 'thé', 'ti', 'que', 'pro', 'ba', 'bi', 'li', 'té', 'for', 'mu', 'le', 'sta', 'dé', 'ri', 'vé', 'no', 'con')
+
+
+def synthetic_vocabulary(size, rng):
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def synthetic_corpus(count, words_per_course, vocabulary, rng):
+    """Textes à fréquences de Zipf: quelques mots très courants, beaucoup de mots rares"""
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    for i in range(count):
+        body = rng.choices(vocabulary, weights, k=words_per_course)
+        yield uuid.UUID(int=i + 1), {'title': ' '.join(body[:4]), 'description': '', 'tags': '', 'body': ' '.join(body)}
+
+
+class Command(BaseCommand):
+    help = "Mesure construction, chargement et requêtes de l'index inversé (10k et 100k cours par défaut)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000], help="Nombres de cours")
+        parser.add_argument('--words', type=int, default=300, help="Mots par cours")
+        parser.add_argument('--vocabulary', type=int, default=30_000, help="Mots distincts du corpus")
+        parser.add_argument('--queries', type=int, default=200, help="Requêtes par type")
+        parser.add_argument('--scan-queries', type=int, default=5, help="Requêtes du parcours linéaire (lent)")
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        vocabulary = synthetic_vocabulary(options['vocabulary'], rng)
+        directory = tempfile.mkdtemp(prefix='benchmark_search_')
+
+        for size in options['sizes']:
+            corpus = list(synthetic_corpus(size, options['words'], vocabulary, rng))
+            path = os.path.join(directory, f"courses_{size}.idx")
+
+            started = time.perf_counter()
+            builder = IndexBuilder()
+            for key, fields in corpus:
+                builder.add(key, fields)
+            built = time.perf_counter() - started
+            started = time.perf_counter()
+            builder.write(path)
+            written = time.perf_counter() - started
+            del builder
+
+            started = time.perf_counter()
+            index = InvertedIndex(MappedSegment(path))
+            opened = time.perf_counter() - started
+
+            self.stdout.write(
+                f"{size:7d} cours: construction {built:6.2f} s, écriture {written:5.2f} s, "
+                f"fichier {os.path.getsize(path) / 2 ** 20:7.1f} Mo, ouverture {opened * 1e3:6.2f} ms"
+            )
+            queries = self._queries(corpus, vocabulary, options['queries'], rng)
+            for kind, batch in queries.items():
+                elapsed = self._time(lambda: [index.search(query) for query in batch])
+                self.stdout.write(f"    {kind:12s} {elapsed / len(batch) * 1e3:8.3f} ms/requête")
+
+            scan_batch = queries['deux mots'][:max(1, options['scan_queries'])]
+            texts = [(key, fields['body']) for key, fields in corpus]
+            elapsed = self._time(lambda: [self._scan(texts, query) for query in scan_batch])
+            self.stdout.write(f"    {'parcours':12s} {elapsed / len(scan_batch) * 1e3:8.3f} ms/requête (icontains)")
+
+            updates = corpus[:min(1000, size)]
+            elapsed = self._time(lambda: [index.upsert(key, fields) for key, fields in updates])
+            self.stdout.write(f"    {'mise à jour':12s} {elapsed / len(updates) * 1e3:8.3f} ms/cours")
+            index.close()
+            os.remove(path)
+        os.rmdir(directory)
+
+    @staticmethod
+    def _queries(corpus, vocabulary, count, rng):
+        common = vocabulary[:50]
+        mid = vocabulary[50:2000]
+        phrases = []
+        for _ in range(count):
+            body = rng.choice(corpus)[1]['body'].split()
+            start = rng.randrange(len(body) - 1)
+            phrases.append(f'"{body[start]} {body[start + 1]}"')
+        return {
+            'un mot': [rng.choice(mid) for _ in range(count)],
+            'deux mots': [f"{rng.choice(common)} {rng.choice(mid)}" for _ in range(count)],
+            'expression': phrases,
+        }
+
+    @staticmethod
+    def _scan(texts, query):
+        words = query.split()
+        return [key for key, text in texts if all(word in text for word in words)]
+
+    @staticmethod
+    def _time(func):
+        started = time.perf_counter()
+        func()
+        return time.perf_counter() - started
@@ -0,0 +1,29 @@
+"""
+Reconstruit l'index de recherche plein texte des cours
+
+    python manage.py rebuild_search_index --batch-size 200
+    python manage.py rebuild_search_index --index-only   # recrée seulement l'index de la base
+
+Les documents de recherche sont réécrits depuis les cours (texte extrait
+compris), puis l'index propre à la base (GIN PostgreSQL, FTS5 SQLite) est
+recréé à partir d'eux.
+"""
+from django.core.management.base import BaseCommand
+
+from core.models import Course
+from core.search import index_courses, rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Réindexe les cours et recrée l'index de recherche plein texte"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200, help="Cours lus par lot")
+        parser.add_argument('--index-only', action='store_true', help="Ne réécrit pas les documents de recherche")
+
+    def handle(self, *args, **options):
+        if not options['index_only']:
+            count = index_courses(Course.objects.all(), batch_size=max(1, options['batch_size']))
+            self.stdout.write(f"{count} cours indexés")
+        backend = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"Index de recherche reconstruit ({backend})"))
@@ -1,45 +1,39 @@
 """
-Middleware personnalisé pour gérer les sessions corrompues
+Middleware personnalisé
 """
-from django.contrib.sessions.models import Session
-from django.contrib.sessions.backends.base import SessionBase
-import logging
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from whitenoise.middleware import WhiteNoiseMiddleware
 
-logger = logging.getLogger(__name__)
 
-
-class CleanCorruptedSessionsMiddleware:
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
     """
-    Middleware qui nettoie automatiquement les sessions corrompues
-    S'exécute APRÈS SessionMiddleware pour avoir accès à request.session
+    WhiteNoise compatible avec une chaîne de middleware asynchrone (ASGI)
+
+    WhiteNoiseMiddleware n'est que synchrone: sous uvicorn, Django exécuterait
+    toutes les requêtes (vues asynchrones comprises) à travers un thread, ce
+    qui sérialise les appels LLM en cours. Ici, seuls les fichiers statiques
+    sont servis dans un thread (lecture disque); les autres requêtes passent
+    directement au middleware suivant, sans quitter la boucle d'événements.
     """
-    def __init__(self, get_response):
-        self.get_response = get_response
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
 
     def __call__(self, request):
-        # Vérifier si la session existe et si elle est corrompue
-        if hasattr(request, 'session'):
-            session_key = getattr(request.session, 'session_key', None)
-            if session_key:
-                # Vérifier directement dans la DB si la session peut être décodée
-                try:
-                    session_obj = Session.objects.get(session_key=session_key)
-                    # Essayer de décoder la session
-                    session_obj.get_decoded()
-                except Session.DoesNotExist:
-                    # Session n'existe pas en DB, créer une nouvelle
-                    request.session.flush()
-                    request.session.create()
-                except Exception as e:
-                    # Session corrompue - la supprimer de la DB et créer une nouvelle
-                    logger.warning(f"Session corrompue détectée: {session_key}, suppression...")
-                    try:
-                        Session.objects.filter(session_key=session_key).delete()
-                    except Exception:
-                        pass
-                    # Forcer la création d'une nouvelle session
-                    request.session.flush()
-                    request.session.create()
+        if self.async_mode:
+            return self.__acall__(request)
+        return super().__call__(request)
 
-        response = self.get_response(request)
-        return response
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve, thread_sensitive=False)(static_file, request)
+        return await self.get_response(request)
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.24 on 2026-10-16 20:51
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_alter_payment_external_id_alter_payment_operator'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseChunkIndex',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('text_hash', models.CharField(help_text='SHA-256 du texte extrait indexé', max_length=64, verbose_name='Empreinte du texte')),
+                ('chunks', models.JSONField(default=list, verbose_name='Sections')),
+                ('payload', models.BinaryField(help_text='Vocabulaire et postings NumPy (npz)', verbose_name='Index sérialisé')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('course', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='chunk_index', to='core.course', verbose_name='Cours')),
+            ],
+            options={
+                'verbose_name': 'Index de cours',
+                'verbose_name_plural': 'Index de cours',
+            },
+        ),
+    ]
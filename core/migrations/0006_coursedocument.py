@@ -0,0 +1,69 @@
+# Generated by Django 4.2.24 on 2026-10-16 20:58
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def clear_chunk_indexes(apps, schema_editor):
+    # Index reconstructibles à la demande; les doublons empêcheraient la contrainte d'unicité
+    apps.get_model('core', 'CourseChunkIndex').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_coursechunkindex'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True, verbose_name='Empreinte SHA-256')),
+                ('file', models.FileField(upload_to='documents/', verbose_name='Fichier')),
+                ('size', models.PositiveBigIntegerField(default=0, verbose_name='Taille (octets)')),
+                ('content_type', models.CharField(blank=True, max_length=100, verbose_name='Type MIME')),
+                ('extracted_text', models.TextField(blank=True, verbose_name='Texte extrait')),
+                ('extraction_status', models.CharField(choices=[('pending', 'En attente'), ('extracting', 'Extraction en cours'), ('completed', 'Terminé'), ('failed', 'Échoué')], default='pending', max_length=20, verbose_name="Statut de l'extraction")),
+                ('extraction_stats', models.JSONField(blank=True, default=dict, verbose_name="Métriques d'extraction")),
+                ('ai_summaries', models.JSONField(blank=True, default=dict, help_text="Résumés générés, par niveau et langue ('intermediate:french')", verbose_name='Résumés IA')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('extracted_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Document de cours',
+                'verbose_name_plural': 'Documents de cours',
+            },
+        ),
+        # Même colonne en base (db_column): seul le nom du champ change
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.RenameField(
+                    model_name='course',
+                    old_name='extracted_text',
+                    new_name='legacy_extracted_text',
+                ),
+                migrations.AlterField(
+                    model_name='course',
+                    name='legacy_extracted_text',
+                    field=models.TextField(blank=True, db_column='extracted_text', verbose_name='Texte extrait (ancien stockage)'),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='document',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='courses', to='core.coursedocument', verbose_name='Document partagé'),
+        ),
+        migrations.RunPython(clear_chunk_indexes, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='coursechunkindex',
+            name='course',
+        ),
+        migrations.AlterField(
+            model_name='coursechunkindex',
+            name='text_hash',
+            field=models.CharField(help_text='SHA-256 du texte extrait indexé', max_length=64, unique=True, verbose_name='Empreinte du texte'),
+        ),
+    ]
@@ -0,0 +1,88 @@
+# Generated by Django 4.2.24 on 2026-10-16 22:19
+
+import core.fields
+from django.db import migrations, models
+import django.db.models.deletion
+
+BATCH_SIZE = 200
+
+
+def move_course_texts(apps, schema_editor):
+    Course = apps.get_model('core', 'Course')
+    CourseContent = apps.get_model('core', 'CourseContent')
+    rows = (
+        Course.objects.exclude(legacy_extracted_text='')
+        .values_list('id', 'legacy_extracted_text')
+        .iterator(chunk_size=BATCH_SIZE)
+    )
+    batch = []
+    for course_id, text in rows:
+        batch.append(CourseContent(course_id=course_id, extracted_text=text))
+        if len(batch) >= BATCH_SIZE:
+            CourseContent.objects.bulk_create(batch)
+            batch = []
+    CourseContent.objects.bulk_create(batch)
+
+
+def restore_course_texts(apps, schema_editor):
+    Course = apps.get_model('core', 'Course')
+    CourseContent = apps.get_model('core', 'CourseContent')
+    for content in CourseContent.objects.iterator(chunk_size=BATCH_SIZE):
+        Course.objects.filter(id=content.course_id).update(legacy_extracted_text=content.extracted_text)
+
+
+def compress_document_texts(apps, schema_editor):
+    CourseDocument = apps.get_model('core', 'CourseDocument')
+    for document in CourseDocument.objects.exclude(plain_extracted_text='').iterator(chunk_size=BATCH_SIZE):
+        document.extracted_text = document.plain_extracted_text
+        document.save(update_fields=['extracted_text'])
+
+
+def decompress_document_texts(apps, schema_editor):
+    CourseDocument = apps.get_model('core', 'CourseDocument')
+    for document in CourseDocument.objects.iterator(chunk_size=BATCH_SIZE):
+        document.plain_extracted_text = document.extracted_text
+        document.save(update_fields=['plain_extracted_text'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_coursedocument'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseContent',
+            fields=[
+                ('course', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='content', serialize=False, to='core.course', verbose_name='Cours')),
+                ('extracted_text', core.fields.CompressedTextField(blank=True, default=b'', verbose_name='Texte extrait')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Contenu de cours',
+                'verbose_name_plural': 'Contenus de cours',
+            },
+        ),
+        migrations.RunPython(move_course_texts, restore_course_texts),
+        migrations.RemoveField(
+            model_name='course',
+            name='legacy_extracted_text',
+        ),
+        # Texte des documents partagés: colonne texte -> colonne compressée
+        migrations.RenameField(
+            model_name='coursedocument',
+            old_name='extracted_text',
+            new_name='plain_extracted_text',
+        ),
+        migrations.AddField(
+            model_name='coursedocument',
+            name='extracted_text',
+            field=core.fields.CompressedTextField(blank=True, default=b'', verbose_name='Texte extrait'),
+        ),
+        migrations.RunPython(compress_document_texts, decompress_document_texts),
+        migrations.RemoveField(
+            model_name='coursedocument',
+            name='plain_extracted_text',
+        ),
+    ]
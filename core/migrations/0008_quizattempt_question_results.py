@@ -0,0 +1,28 @@
+# Generated by Django 4.2.24 on 2026-10-16 22:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_coursecontent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizattempt',
+            name='payload_version',
+            field=models.CharField(blank=True, max_length=16),
+        ),
+        migrations.AddField(
+            model_name='quizattempt',
+            name='question_results',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='quizattempt',
+            name='shuffle_seed',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 4.2.24 on 2026-10-16 22:31
+
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+def compute_quiz_statistics(apps, schema_editor):
+    """Compteurs initiaux: une agrégation groupée sur les tentatives terminées"""
+    Quiz = apps.get_model('core', 'Quiz')
+    QuizAttempt = apps.get_model('core', 'QuizAttempt')
+    rows = (
+        QuizAttempt.objects.filter(is_completed=True)
+        .order_by()
+        .values('quiz_id')
+        .annotate(
+            count=models.Count('id'),
+            total=models.Sum('score_percentage'),
+            passed=models.Count('id', filter=models.Q(passed=True)),
+        )
+    )
+    for row in rows.iterator():
+        total = Decimal(row['total'] or 0)
+        Quiz.objects.filter(pk=row['quiz_id']).update(
+            total_attempts=row['count'],
+            total_score=total,
+            passed_attempts=row['passed'],
+            average_score=round(total / row['count'], 2),
+            success_rate=round(Decimal(row['passed'] * 100) / row['count'], 2),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_quizattempt_question_results'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quiz',
+            name='passed_attempts',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='quiz',
+            name='total_score',
+            field=models.DecimalField(decimal_places=2, default=0.0, max_digits=14),
+        ),
+        migrations.RunPython(compute_quiz_statistics, migrations.RunPython.noop),
+    ]
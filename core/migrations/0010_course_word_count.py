@@ -0,0 +1,33 @@
+# Generated by Django 4.2.24 on 2026-10-16 22:33
+
+from django.db import migrations, models
+
+BATCH_SIZE = 200
+
+
+def count_course_words(apps, schema_editor):
+    """Nombre de mots des textes déjà extraits, lus un par un"""
+    Course = apps.get_model('core', 'Course')
+    CourseContent = apps.get_model('core', 'CourseContent')
+    CourseDocument = apps.get_model('core', 'CourseDocument')
+    for document in CourseDocument.objects.filter(extraction_status='completed').iterator(chunk_size=BATCH_SIZE):
+        words = document.extraction_stats.get('word_count') or len(document.extracted_text.split())
+        Course.objects.filter(document_id=document.pk).update(word_count=words)
+    for content in CourseContent.objects.exclude(extracted_text=b'').iterator(chunk_size=BATCH_SIZE):
+        Course.objects.filter(pk=content.course_id, document__isnull=True).update(word_count=len(content.extracted_text.split()))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_quiz_statistics_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text="Mots du texte extrait, calculé à l'extraction", verbose_name='Nombre de mots'),
+        ),
+        migrations.RunPython(count_course_words, migrations.RunPython.noop),
+    ]
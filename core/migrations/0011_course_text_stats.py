@@ -0,0 +1,48 @@
+# Generated by Django 4.2.24 on 2026-10-16 22:36
+
+from django.db import migrations, models
+
+
+def compute_estimated_duration(apps, schema_editor):
+    """Durée depuis le nombre de mots déjà enregistré, en une requête (max(5, mots // 200))"""
+    Course = apps.get_model('core', 'Course')
+    Course.objects.filter(word_count__gt=0).update(
+        estimated_duration=models.Case(
+            models.When(word_count__lt=1000, then=models.Value(5)),
+            default=models.F('word_count') / 200,
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_course_word_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='char_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Nombre de caractères'),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='estimated_duration',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Durée de lecture estimée en minutes (200 mots par minute)', verbose_name='Durée estimée'),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='page_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Nombre de pages'),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['estimated_duration'], name='core_course_estimat_1b54d2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['word_count'], name='core_course_word_co_1e3daf_idx'),
+        ),
+        migrations.RunPython(compute_estimated_duration, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,151 @@
+# Generated by Django 4.2.24 on 2026-10-16 22:40
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+BATCH_SIZE = 200
+
+# SQL de l'index recopié ici (état au moment de la migration), sans dépendre de core.search
+DOCUMENT_TABLE = 'core_coursesearchdocument'
+FTS_TABLE = 'core_course_fts'
+FTS_COLUMNS = ('title', 'description', 'tags', 'body')
+GIN_INDEX = 'core_course_search_vector_gin'
+
+
+def _columns(prefix=''):
+    return ', '.join(f"{prefix}{column}" for column in FTS_COLUMNS)
+
+
+def fts5_statements(rowid):
+    """Table FTS5 à contenu externe et triggers de synchronisation, rowid FTS tiré de la colonne ``rowid`` des documents"""
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+        f"{_columns()}, content='{DOCUMENT_TABLE}', content_rowid='{rowid}', "
+        f"tokenize='unicode61 remove_diacritics 2')",
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {DOCUMENT_TABLE} BEGIN "
+        f"INSERT INTO {FTS_TABLE}(rowid, {_columns()}) VALUES (new.{rowid}, {_columns('new.')}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {DOCUMENT_TABLE} BEGIN "
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_columns()}) VALUES ('delete', old.{rowid}, {_columns('old.')}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE ON {DOCUMENT_TABLE} BEGIN "
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_columns()}) VALUES ('delete', old.{rowid}, {_columns('old.')}); "
+        f"INSERT INTO {FTS_TABLE}(rowid, {_columns()}) VALUES (new.{rowid}, {_columns('new.')}); END",
+    ]
+
+
+def postgres_statements(config):
+    """Colonne tsvector générée (titre A, description et mots-clés B, texte C) et son index GIN"""
+    vector = ' || '.join(
+        f"setweight(to_tsvector('{config}'::regconfig, coalesce({column}, '')), '{weight}')"
+        for column, weight in (('title', 'A'), ('description', 'B'), ('tags', 'B'), ('body', 'C'))
+    )
+    return [
+        f"ALTER TABLE {DOCUMENT_TABLE} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        f"GENERATED ALWAYS AS ({vector}) STORED",
+        f"CREATE INDEX IF NOT EXISTS {GIN_INDEX} ON {DOCUMENT_TABLE} USING GIN (search_vector)",
+    ]
+
+
+UNINSTALL_STATEMENTS = {
+    'sqlite': [f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}" for suffix in ('ai', 'ad', 'au')] + [
+        f"DROP TABLE IF EXISTS {FTS_TABLE}"
+    ],
+    'postgresql': [
+        f"DROP INDEX IF EXISTS {GIN_INDEX}",
+        f"ALTER TABLE {DOCUMENT_TABLE} DROP COLUMN IF EXISTS search_vector",
+    ],
+}
+
+
+def _fts5_available(cursor):
+    cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+    if cursor.fetchone()[0]:
+        return True
+    # Certaines compilations chargent FTS5 sans l'option: on essaie
+    try:
+        cursor.execute("CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(x)")
+        cursor.execute("DROP TABLE temp.fts5_probe")
+        return True
+    except Exception:
+        return False
+
+
+def install_index(schema_editor, rowid):
+    """Index propre à la base: GIN sous PostgreSQL, FTS5 sous SQLite (rien ailleurs ni sans FTS5)"""
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            statements = postgres_statements(getattr(settings, 'SEARCH_POSTGRES_CONFIG', 'french'))
+        elif connection.vendor == 'sqlite' and _fts5_available(cursor):
+            statements = fts5_statements(rowid)
+        else:
+            return
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def install_search_index(apps, schema_editor):
+    # Table de cette migration: rowid implicite (clé entière 'id' depuis 0013)
+    install_index(schema_editor, rowid='rowid')
+
+
+def uninstall_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        for statement in UNINSTALL_STATEMENTS.get(connection.vendor, []):
+            cursor.execute(statement)
+
+
+def index_existing_courses(apps, schema_editor):
+    """Documents de recherche des cours existants (textes lus un par un)"""
+    Course = apps.get_model('core', 'Course')
+    CourseContent = apps.get_model('core', 'CourseContent')
+    CourseDocument = apps.get_model('core', 'CourseDocument')
+    CourseSearchDocument = apps.get_model('core', 'CourseSearchDocument')
+    max_chars = getattr(settings, 'SEARCH_BODY_MAX_CHARS', 100_000)
+
+    batch = []
+    for course in Course.objects.prefetch_related('tags').iterator(chunk_size=BATCH_SIZE):
+        if course.document_id:
+            text = CourseDocument.objects.filter(pk=course.document_id).values_list('extracted_text', flat=True).first()
+        else:
+            text = CourseContent.objects.filter(pk=course.pk).values_list('extracted_text', flat=True).first()
+        batch.append(CourseSearchDocument(
+            course_id=course.pk,
+            title=course.title or '',
+            description=' '.join(part for part in (course.short_description, course.description) if part),
+            tags=' '.join(tag.name for tag in course.tags.all()),
+            body=(text or '')[:max_chars],
+        ))
+        if len(batch) >= BATCH_SIZE:
+            CourseSearchDocument.objects.bulk_create(batch)
+            batch = []
+    CourseSearchDocument.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_course_text_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseSearchDocument',
+            fields=[
+                ('course', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='core.course', verbose_name='Cours')),
+                ('title', models.CharField(blank=True, max_length=255)),
+                ('description', models.TextField(blank=True)),
+                ('tags', models.TextField(blank=True)),
+                ('body', models.TextField(blank=True, help_text='Début du texte extrait (SEARCH_BODY_MAX_CHARS)')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Document de recherche',
+                'verbose_name_plural': 'Documents de recherche',
+            },
+        ),
+        # Index propre à la base (GIN ou FTS5), puis remplissage: les triggers FTS5 indexent chaque ligne
+        migrations.RunPython(install_search_index, uninstall_search_index),
+        migrations.RunPython(index_existing_courses, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 4.2.24 on 2026-10-17 01:40
+
+from importlib import import_module
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# SQL de l'index et remplissage repris de 0012 (nom de module non importable directement)
+initial = import_module('core.migrations.0012_coursesearchdocument')
+
+
+def install_search_index(apps, schema_editor):
+    """Index sur la clé entière ``id`` des documents"""
+    initial.install_index(schema_editor, rowid='id')
+
+
+def restore_initial_index(apps, schema_editor):
+    """Retour à 0012: index sur le rowid implicite, documents recréés"""
+    initial.install_search_index(apps, schema_editor)
+    initial.index_existing_courses(apps, schema_editor)
+
+
+class Migration(migrations.Migration):
+    """
+    Clé entière explicite pour les documents de recherche
+
+    La table FTS5 (SQLite) utilisait le rowid implicite d'une table à clé
+    non entière, renuméroté par VACUUM. Les documents ne contiennent que des
+    données dérivées des cours: la table est recréée avec une clé ``id``,
+    l'index réinstallé puis rempli à nouveau.
+    """
+
+    dependencies = [
+        ('core', '0012_coursesearchdocument'),
+    ]
+
+    operations = [
+        migrations.RunPython(initial.uninstall_search_index, restore_initial_index),
+        migrations.DeleteModel(
+            name='CourseSearchDocument',
+        ),
+        migrations.CreateModel(
+            name='CourseSearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('course', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='search_document', to='core.course', verbose_name='Cours')),
+                ('title', models.CharField(blank=True, max_length=255)),
+                ('description', models.TextField(blank=True)),
+                ('tags', models.TextField(blank=True)),
+                ('body', models.TextField(blank=True, help_text='Début du texte extrait (SEARCH_BODY_MAX_CHARS)')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Document de recherche',
+                'verbose_name_plural': 'Documents de recherche',
+            },
+        ),
+        migrations.RunPython(install_search_index, initial.uninstall_search_index),
+        migrations.RunPython(initial.index_existing_courses, migrations.RunPython.noop),
+    ]
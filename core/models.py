@@ -13,12 +13,17 @@ Date: 2024
 Version: 1.0.0
 """
 
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
 from django.urls import reverse
+from django.db.models import Value
+from django.db.models.functions import Coalesce, NullIf
+from .fields import CompressedTextField
+from .extraction import text_stats
 import uuid
+from decimal import Decimal
 
 
 class Category(models.Model):
@@ -107,6 +112,92 @@ class Tag(models.Model):
         return reverse('tag_detail', kwargs={'pk': self.pk})
 
 
+class CourseDocument(models.Model):
+    """
+    Document source adressé par son contenu (SHA-256 des octets du fichier)
+
+    Un même polycopié uploadé par plusieurs étudiants n'est stocké, extrait
+    et résumé qu'une seule fois: chaque ``Course`` qui le référence partage
+    le fichier, le texte extrait et les résumés IA.
+    """
+
+    EXTRACTION_STATUS_CHOICES = [
+        ('pending', 'En attente'),
+        ('extracting', 'Extraction en cours'),
+        ('completed', 'Terminé'),
+        ('failed', 'Échoué'),
+    ]
+
+    sha256 = models.CharField(
+        max_length=64,
+        unique=True,
+        verbose_name="Empreinte SHA-256"
+    )
+    file = models.FileField(
+        upload_to='documents/',
+        verbose_name="Fichier"
+    )
+    size = models.PositiveBigIntegerField(default=0, verbose_name="Taille (octets)")
+    content_type = models.CharField(max_length=100, blank=True, verbose_name="Type MIME")
+    extracted_text = CompressedTextField(blank=True, verbose_name="Texte extrait")
+    extraction_status = models.CharField(
+        max_length=20,
+        choices=EXTRACTION_STATUS_CHOICES,
+        default='pending',
+        verbose_name="Statut de l'extraction"
+    )
+    extraction_stats = models.JSONField(default=dict, blank=True, verbose_name="Métriques d'extraction")
+    ai_summaries = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name="Résumés IA",
+        help_text="Résumés générés, par niveau et langue ('intermediate:french')"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    extracted_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Document de cours"
+        verbose_name_plural = "Documents de cours"
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.file.name})"
+
+    @staticmethod
+    def summary_key(level, language):
+        return f"{level}:{language}"
+
+
+class CourseQuerySet(models.QuerySet):
+    def with_content(self):
+        """Charge aussi les champs volumineux et le texte extrait (pages de détail, vues async)"""
+        return self.defer(None).select_related('document', 'content')
+
+    def with_stats(self):
+        """
+        Annote le nombre de quiz, de tentatives et de tentatives réussies
+        (sous-requêtes corrélées: une seule requête pour toute la liste, sans
+        multiplier les lignes d'éventuelles jointures de filtrage)
+        """
+        attempts = QuizAttempt.objects.filter(quiz__course=models.OuterRef('pk')).order_by().values('quiz__course')
+        quizzes = Quiz.objects.filter(course=models.OuterRef('pk')).order_by().values('course')
+        count = models.Count('*')
+        return self.annotate(
+            num_quizzes=Coalesce(models.Subquery(quizzes.annotate(n=count).values('n')), 0),
+            num_attempts=Coalesce(models.Subquery(attempts.annotate(n=count).values('n')), 0),
+            num_successful_attempts=Coalesce(models.Subquery(
+                attempts.filter(score__gte=models.F('total_questions') * 0.7).annotate(n=count).values('n')
+            ), 0),
+        )
+
+
+class CourseManager(models.Manager.from_queryset(CourseQuerySet)):
+    """Les listes de cours ne chargent pas les champs volumineux (chargés à l'accès)"""
+
+    def get_queryset(self):
+        return super().get_queryset().defer(*Course.HEAVY_FIELDS)
+
+
 class Course(models.Model):
     """
     Modèle de cours amélioré avec IA et analytics
@@ -209,9 +300,13 @@ class Course(models.Model):
         null=True,
         verbose_name="Miniature"
     )
-    extracted_text = models.TextField(
+    document = models.ForeignKey(
+        CourseDocument,
+        on_delete=models.PROTECT,
+        null=True,
         blank=True,
-        verbose_name="Texte extrait"
+        related_name='courses',
+        verbose_name="Document partagé"
     )
     summary = models.TextField(
         blank=True,
@@ -286,6 +381,30 @@ class Course(models.Model):
         default=0,
         verbose_name="Nombre de notes"
     )
+
+    # Métriques du texte extrait, enregistrées à l'extraction (voir core/extraction.py: text_stats)
+    word_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Nombre de mots",
+        help_text="Mots du texte extrait, calculé à l'extraction"
+    )
+    char_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Nombre de caractères"
+    )
+    page_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Nombre de pages"
+    )
+    estimated_duration = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Durée estimée",
+        help_text="Durée de lecture estimée en minutes (200 mots par minute)"
+    )
     
     # =====================================================================
     # MÉTADONNÉES TEMPORELLES
@@ -324,6 +443,13 @@ class Course(models.Model):
         verbose_name="Dernière mise à jour IA"
     )
     
+    # Champs volumineux différés par défaut (voir CourseManager)
+    HEAVY_FIELDS = ('summary', 'ai_summary', 'key_concepts')
+    # Métriques du texte, mises à jour avec lui ('extracted_text' dans update_fields)
+    TEXT_STATS_FIELDS = ('word_count', 'char_count', 'page_count', 'estimated_duration')
+
+    objects = CourseManager()
+
     class Meta:
         verbose_name = "Cours"
         verbose_name_plural = "Cours"
@@ -335,6 +461,9 @@ class Course(models.Model):
             models.Index(fields=['rating', 'view_count']),
             models.Index(fields=['created_at']),
             models.Index(fields=['user']),
+            # Filtres et tris de l'API ("cours de moins de 15 minutes")
+            models.Index(fields=['estimated_duration']),
+            models.Index(fields=['word_count']),
         ]
     
     def __str__(self):
@@ -350,16 +479,69 @@ class Course(models.Model):
             self.slug = f"{self.title.lower().replace(' ', '-')}-{self.id}"
         if self.status == 'published' and not self.published_at:
             self.published_at = timezone.now()
-        super().save(*args, **kwargs)
-    
+
+        # 'extracted_text' dans update_fields désigne la table CourseContent
+        # (et les métriques du texte, enregistrées sur le cours)
+        update_fields = kwargs.get('update_fields')
+        save_content = getattr(self, '_content_changed', False) and (
+            update_fields is None or 'extracted_text' in update_fields
+        )
+        if update_fields is not None:
+            update_fields = [name for name in update_fields if name != 'extracted_text'] + (
+                list(self.TEXT_STATS_FIELDS) if 'extracted_text' in update_fields else []
+            )
+            kwargs['update_fields'] = list(dict.fromkeys(update_fields))
+
+        if not save_content:
+            super().save(*args, **kwargs)
+            return
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            self.content.save()
+        self._content_changed = False
+
+    @property
+    def extracted_text(self):
+        """Texte extrait: celui du document partagé, sinon celui de CourseContent (chargé à l'accès)"""
+        if self.document_id:
+            return self.document.extracted_text
+        try:
+            return self.content.extracted_text
+        except CourseContent.DoesNotExist:
+            return ''
+
+    @extracted_text.setter
+    def extracted_text(self, value):
+        # Le texte d'un document partagé appartient à tous les cours qui le
+        # référencent: il ne s'écrit que sur le document (voir extract_course_text_async)
+        if self.document_id:
+            raise ValueError(
+                f"Le cours {self.pk} partage le document {self.document_id}: "
+                "modifiez document.extracted_text et enregistrez le document"
+            )
+        self.set_text_stats(text_stats(value, self.page_count))
+        try:
+            content = self.content
+        except CourseContent.DoesNotExist:
+            content = CourseContent(course=self)
+        content.extracted_text = value
+        self._content_changed = True
+
+    # Les compteurs ci-dessous lisent les annotations de CourseQuerySet.with_stats()
+    # si elles sont présentes, sinon interrogent la base
+
     @property
     def quiz_count(self):
         """Retourne le nombre de quiz associés au cours"""
+        if hasattr(self, 'num_quizzes'):
+            return self.num_quizzes
         return self.quizzes.count()
     
     @property
     def total_attempts(self):
         """Retourne le nombre total de tentatives de quiz"""
+        if hasattr(self, 'num_attempts'):
+            return self.num_attempts
         return QuizAttempt.objects.filter(quiz__course=self).count()
     
     @property
@@ -368,19 +550,110 @@ class Course(models.Model):
         attempts = self.total_attempts
         if attempts == 0:
             return 0
-        successful_attempts = QuizAttempt.objects.filter(
-            quiz__course=self, 
-            score__gte=models.F('total_questions') * 0.7
-        ).count()
+        if hasattr(self, 'num_successful_attempts'):
+            successful_attempts = self.num_successful_attempts
+        else:
+            successful_attempts = QuizAttempt.objects.filter(
+                quiz__course=self, 
+                score__gte=models.F('total_questions') * 0.7
+            ).count()
         return round((successful_attempts / attempts) * 100, 1)
     
-    @property
-    def estimated_duration(self):
-        """Durée estimée en minutes basée sur la longueur du texte"""
-        if not self.extracted_text:
-            return 0
-        word_count = len(self.extracted_text.split())
-        return max(5, word_count // 200)  # 200 mots par minute en moyenne
+    def set_text_stats(self, stats):
+        """Applique les métriques de ``text_stats`` / ``stats_from_extraction`` (sans enregistrer)"""
+        for name in self.TEXT_STATS_FIELDS:
+            setattr(self, name, stats[name])
+
+
+class CourseContent(models.Model):
+    """
+    Texte extrait d'un cours sans document partagé, compressé (voir core/fields.py)
+
+    Hors de la table des cours: les listes de cours ne lisent jamais ce texte.
+    """
+
+    course = models.OneToOneField(
+        Course,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='content',
+        verbose_name="Cours"
+    )
+    extracted_text = CompressedTextField(blank=True, verbose_name="Texte extrait")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Contenu de cours"
+        verbose_name_plural = "Contenus de cours"
+
+    def __str__(self):
+        return f"Contenu - {self.course_id}"
+
+
+class CourseSearchDocument(models.Model):
+    """
+    Texte indexé pour la recherche plein texte d'un cours (voir core/search)
+
+    Tenu à jour par les signaux du cours. L'index lui-même dépend de la base:
+    colonne ``search_vector`` générée + index GIN sous PostgreSQL, table
+    virtuelle FTS5 synchronisée par triggers sous SQLite (créés par la
+    migration; à recréer avec ``rebuild_search_index`` si la table est
+    modifiée par une migration ultérieure). La clé entière ``id`` sert de
+    rowid à la table FTS5: contrairement au rowid implicite d'une table à
+    clé non entière, elle n'est pas renumérotée par VACUUM.
+    """
+
+    course = models.OneToOneField(
+        Course,
+        on_delete=models.CASCADE,
+        related_name='search_document',
+        verbose_name="Cours"
+    )
+    title = models.CharField(max_length=255, blank=True)
+    description = models.TextField(blank=True)
+    tags = models.TextField(blank=True)
+    body = models.TextField(blank=True, help_text="Début du texte extrait (SEARCH_BODY_MAX_CHARS)")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Document de recherche"
+        verbose_name_plural = "Documents de recherche"
+
+    def __str__(self):
+        return f"Recherche - {self.course_id}"
+
+
+class CourseChunkIndex(models.Model):
+    """
+    Index BM25 des sections d'un texte de cours (voir core/retrieval.py)
+
+    Adressé par l'empreinte du texte extrait: partagé par tous les cours
+    au contenu identique, et naturellement obsolète quand le texte change.
+    """
+
+    text_hash = models.CharField(
+        max_length=64,
+        unique=True,
+        verbose_name="Empreinte du texte",
+        help_text="SHA-256 du texte extrait indexé"
+    )
+    chunks = models.JSONField(
+        default=list,
+        verbose_name="Sections"
+    )
+    payload = models.BinaryField(
+        verbose_name="Index sérialisé",
+        help_text="Vocabulaire et postings NumPy (npz)"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Index de cours"
+        verbose_name_plural = "Index de cours"
+
+    def __str__(self):
+        return f"Index - {self.text_hash[:12]}"
 
 
 class Quiz(models.Model):
@@ -404,8 +677,10 @@ class Quiz(models.Model):
     shuffle_questions = models.BooleanField(default=True)
     show_results_immediately = models.BooleanField(default=False)
     
-    # Statistiques
+    # Statistiques (tentatives terminées), tenues à jour par add_attempt_stats
     total_attempts = models.PositiveIntegerField(default=0)
+    total_score = models.DecimalField(max_digits=14, decimal_places=2, default=0.00)  # Somme des pourcentages
+    passed_attempts = models.PositiveIntegerField(default=0)
     average_score = models.DecimalField(max_digits=5, decimal_places=2, default=0.00)
     success_rate = models.DecimalField(max_digits=5, decimal_places=2, default=0.00)
     
@@ -421,14 +696,54 @@ class Quiz(models.Model):
     def __str__(self):
         return f"{self.course.title} - {self.title}"
     
+    @classmethod
+    def add_attempt_stats(cls, quiz_id, attempts=0, score=0, passed=0):
+        """
+        Applique aux statistiques d'un quiz la variation due à des tentatives,
+        en une seule requête UPDATE atomique (expressions F())
+
+        ``attempts``, ``score`` (somme des pourcentages) et ``passed`` sont
+        des différences, négatives si une tentative ne compte plus.
+        """
+        if not (attempts or score or passed):
+            return
+        count = models.F('total_attempts') + attempts
+        ratio = models.DecimalField(max_digits=5, decimal_places=2)
+        # Moyenne et taux calculés en premier, sur les anciennes valeurs des compteurs
+        # (MySQL évalue les affectations dans l'ordre)
+        cls.objects.filter(pk=quiz_id).update(
+            average_score=Coalesce(
+                models.ExpressionWrapper((models.F('total_score') + score) * 1.0 / NullIf(count, 0), output_field=ratio),
+                Value(0), output_field=ratio,
+            ),
+            success_rate=Coalesce(
+                models.ExpressionWrapper((models.F('passed_attempts') + passed) * 100.0 / NullIf(count, 0), output_field=ratio),
+                Value(0), output_field=ratio,
+            ),
+            total_attempts=count,
+            total_score=models.F('total_score') + score,
+            passed_attempts=models.F('passed_attempts') + passed,
+        )
+
     def update_statistics(self):
-        """Met à jour les statistiques du quiz"""
-        attempts = self.attempts.all()
-        if attempts.exists():
-            self.total_attempts = attempts.count()
-            self.average_score = attempts.aggregate(avg=models.Avg('score_percentage'))['avg'] or 0
-            self.success_rate = attempts.filter(score_percentage__gte=self.passing_score).count() / self.total_attempts * 100
-            self.save(update_fields=['total_attempts', 'average_score', 'success_rate'])
+        """
+        Recalcule entièrement les statistiques du quiz (une agrégation)
+
+        Les statistiques sont tenues à jour à chaque tentative
+        (``add_attempt_stats``); ce recalcul ne sert qu'à les réparer
+        périodiquement (``repair_quiz_statistics_async``).
+        """
+        stats = self.attempts.filter(is_completed=True).aggregate(
+            count=models.Count('id'),
+            total=models.Sum('score_percentage'),
+            passed=models.Count('id', filter=models.Q(passed=True)),
+        )
+        self.total_attempts = stats['count']
+        self.total_score = stats['total'] or 0
+        self.passed_attempts = stats['passed']
+        self.average_score = round(Decimal(self.total_score) / self.total_attempts, 2) if self.total_attempts else 0
+        self.success_rate = round(Decimal(self.passed_attempts * 100) / self.total_attempts, 2) if self.total_attempts else 0
+        self.save(update_fields=['total_attempts', 'total_score', 'passed_attempts', 'average_score', 'success_rate'])
 
 
 class Question(models.Model):
@@ -490,6 +805,11 @@ class QuizAttempt(models.Model):
     
     # Réponses et scoring
     answers = models.JSONField(default=dict)  # {question_id: answer}
+    # Partie jouée: graine du mélange et correction par question, dans l'ordre affiché
+    # (voir core/grading.py). Les pages de résultats les lisent telles quelles.
+    shuffle_seed = models.BigIntegerField(null=True, blank=True)
+    payload_version = models.CharField(max_length=16, blank=True)
+    question_results = models.JSONField(default=list, blank=True)
     score = models.IntegerField(default=0)
     total_questions = models.IntegerField(default=0)
     score_percentage = models.DecimalField(max_digits=5, decimal_places=2, default=0.00)
@@ -516,11 +836,41 @@ class QuizAttempt(models.Model):
     def __str__(self):
         return f"{self.user_name} - {self.quiz.title} ({self.score}/{self.total_questions})"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._stats_state = instance._current_stats_state()
+        return instance
+
+    def _current_stats_state(self):
+        """(terminée, pourcentage, réussie) tels que comptés dans les statistiques du quiz, None si non chargés"""
+        if any(name not in self.__dict__ for name in ('is_completed', 'score_percentage', 'passed')):
+            return None
+        if not self.is_completed:
+            return (False, Decimal(0), False)
+        return (True, Decimal(str(self.score_percentage)), bool(self.passed))
+
+    def stats_delta(self):
+        """Variation (tentatives, score, réussites) à appliquer aux statistiques du quiz depuis le chargement"""
+        previous = (False, Decimal(0), False) if self._state.adding else getattr(self, '_stats_state', None)
+        current = self._current_stats_state()
+        if previous is None or current is None or previous == current:
+            return 0, Decimal(0), 0
+        return (
+            int(current[0]) - int(previous[0]),
+            current[1] - previous[1],
+            int(current[2]) - int(previous[2]),
+        )
+
     def save(self, *args, **kwargs):
         if self.total_questions > 0:
             self.score_percentage = round((self.score / self.total_questions) * 100, 2)
             self.passed = self.score_percentage >= self.quiz.passing_score
-        super().save(*args, **kwargs)
+        attempts, score, passed = self.stats_delta()
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            Quiz.add_attempt_stats(self.quiz_id, attempts, score, passed)
+        self._stats_state = self._current_stats_state()
     
     @property
     def duration_minutes(self):
@@ -2,13 +2,73 @@
 Intégration du modèle OpenAI (chat completions) pour SmartEtude
 Client HTTP vers l'API OpenAI à la place d'un modèle local ou OpenQI
 """
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple, Iterator, AsyncIterator, Optional
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import json
 import logging
-import requests
+import weakref
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from django.db import connections
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+from .chunking import estimate_tokens, split_into_chunks
+from .http_pool import get_http_session, get_pool_stats
+from .llm_cache import llm_cache
+from .quiz_parsing import QUIZ_RESPONSE_FORMAT, QuizParseError, parse_quiz
 
 logger = logging.getLogger(__name__)
 
+# Consignes du format JSON structuré (schéma: quiz_parsing.QUIZ_JSON_SCHEMA)
+QUIZ_JSON_FORMAT = """
+
+Réponds uniquement avec un objet JSON {"questions": [...]}. Pour chaque question:
+- "type": "multiple_choice" (4 options) ou "true_false" (options ["Vrai", "Faux"])
+- "question": l'énoncé seul, sans numéro, options ni réponse
+- "options": la liste des options, sans lettres A/B/C/D
+- "answer": le texte exact de la bonne option ("Vrai" ou "Faux" pour une question Vrai/Faux)
+- "explanation": une courte explication de la bonne réponse
+Mélange environ 60% de QCM et 40% de Vrai/Faux."""
+
+# Consignes de format pour le parsing texte des quiz (voir quiz_parsing.parse_ai_quiz_text)
+QUIZ_TEXT_FORMAT = """
+
+FORMAT STRICT REQUIS:
+Génère un mélange de questions QCM et Vrai/Faux. Pour chaque question, utilise EXACTEMENT ce format:
+
+POUR LES QUESTIONS QCM:
+1. [Texte de la question uniquement, sans options ni réponses]
+
+A) [Option A]
+B) [Option B] 
+C) [Option C]
+D) [Option D]
+
+Réponse correcte: [A/B/C/D]
+
+POUR LES QUESTIONS VRAI/FAUX:
+2. [Texte de la question uniquement, sans options ni réponses]
+
+Vrai
+Faux
+
+Réponse correcte: [Vrai/Faux]
+
+IMPORTANT: 
+- Mélange environ 60% de QCM et 40% de Vrai/Faux
+- Ne mélange JAMAIS la question avec les options ou la réponse
+- Chaque question doit être sur une ligne séparée
+- Les options doivent être clairement séparées
+- La réponse correcte doit être sur une ligne séparée
+- Pas d'explications dans le texte de la question
+- Pour Vrai/Faux, utilise simplement "Vrai" et "Faux" comme options
+"""
+
 
 class Phi3AI:
     """Client OpenAI compatible avec l'ancienne interface Phi-3"""
@@ -23,6 +83,14 @@ class Phi3AI:
         # Paramètres de génération
         self.max_tokens = getattr(settings, "AI_MAX_TOKENS", 800)
         self.temperature = getattr(settings, "AI_TEMPERATURE", 0.7)
+        self.timeout = getattr(settings, "AI_REQUEST_TIMEOUT", 60)
+        # Quiz en JSON validé par schéma (sinon format texte parsé par regex)
+        self.structured_quiz = getattr(settings, "AI_QUIZ_STRUCTURED_OUTPUT", True)
+
+        # Découpage map-reduce des textes longs
+        self.single_pass_tokens = getattr(settings, "AI_SINGLE_PASS_TOKENS", 4000)
+        self.chunk_tokens = getattr(settings, "AI_CHUNK_TOKENS", 2500)
+        self.map_concurrency = max(1, getattr(settings, "AI_MAP_CONCURRENCY", 4))
 
         # Compat pour les vues existantes
         self.is_loaded = True
@@ -36,93 +104,191 @@ class Phi3AI:
     def load_model(self) -> bool:
         return True
 
-    def generate_summary(self, text: str, level: str = "intermediate", language: str = "french") -> Dict[str, Any]:
+    def generate_summary(self, text: str, level: str = "intermediate", language: str = "french",
+                         num_chunks: int = 0, regenerate: bool = False) -> Dict[str, Any]:
+        """``num_chunks`` > 0: ``text`` a déjà été condensé par ``condense``;
+        ``regenerate``: nouvelle réponse, sans lire le cache LLM"""
         try:
-            system_prompt = self._get_system_prompt("summary", level, language)
-            messages = [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"Résume ce texte de manière {level} en {language}:\n\n{text[:16000]}"},
-            ]
-            result = self._chat_completion(messages)
-            return {
-                "success": True,
-                "summary": result,
-                "model": self.model_name,
-                "level": level,
-                "language": language,
-            }
+            messages, num_chunks = self._prepare_summary(text, level, language, num_chunks)
+            result = self._chat_completion(messages, regenerate=regenerate)
+            return self._summary_result(result, level, language, num_chunks)
         except Exception as e:
             logger.error(f"Erreur génération résumé: {e}")
             return {"success": False, "error": str(e)}
 
-    def generate_quiz(self, text: str, num_questions: int = 5, difficulty: str = "medium", language: str = "french") -> Dict[str, Any]:
+    def generate_quiz(self, text: str, num_questions: int = 5, difficulty: str = "medium", language: str = "french",
+                      num_chunks: int = 0, regenerate: bool = False) -> Dict[str, Any]:
+        """``num_chunks`` > 0: ``text`` a déjà été condensé par ``condense``;
+        ``regenerate``: nouveau quiz, sans lire le cache LLM"""
+        try:
+            source, num_chunks = (text, num_chunks) if num_chunks else self._condense(text, language)
+            result = self._chat_completion(
+                self._quiz_messages(source, num_questions, difficulty, language),
+                regenerate=regenerate,
+                **self._quiz_options(num_questions),
+            )
+            return self._quiz_result(result, num_questions, difficulty, language, num_chunks)
+        except Exception as e:
+            logger.error(f"Erreur génération quiz: {e}")
+            return {"success": False, "error": str(e)}
+
+    def chat_with_course(self, course_text: str, question: str, language: str = "french") -> Dict[str, Any]:
         try:
-            system_prompt = self._get_system_prompt("quiz", difficulty, language)
-            messages = [
-                {"role": "system", "content": system_prompt + """
+            result = self._chat_completion(self._chat_messages(course_text, question, language))
+            return self._chat_result(result, language)
+        except Exception as e:
+            logger.error(f"Erreur chat: {e}")
+            return {"success": False, "error": str(e)}
 
-FORMAT STRICT REQUIS:
-Génère un mélange de questions QCM et Vrai/Faux. Pour chaque question, utilise EXACTEMENT ce format:
+    def stream_summary(self, text: str, level: str = "intermediate", language: str = "french",
+                       regenerate: bool = False) -> Iterator[str]:
+        """Génère le résumé token par token (fragments de texte).
 
-POUR LES QUESTIONS QCM:
-1. [Texte de la question uniquement, sans options ni réponses]
+        Pour un texte long, la phase map est exécutée avant le premier
+        fragment; seule la réduction est streamée (et régénérée).
+        """
+        messages, _ = self._prepare_summary(text, level, language)
+        yield from self._stream_chat_completion(messages, regenerate=regenerate)
 
-A) [Option A]
-B) [Option B] 
-C) [Option C]
-D) [Option D]
+    # ------------------------------------------------------------------
+    # Map-reduce des textes longs
+    # ------------------------------------------------------------------
 
-Réponse correcte: [A/B/C/D]
+    def condense(self, text: str, language: str = "french") -> Tuple[str, int]:
+        """Texte condensé une fois et partagé entre résumé et quiz (pipeline Celery)"""
+        return self._condense(text, language)
 
-POUR LES QUESTIONS VRAI/FAUX:
-2. [Texte de la question uniquement, sans options ni réponses]
+    def _prepare_summary(self, text: str, level: str, language: str,
+                         num_chunks: int = 0) -> Tuple[List[Dict[str, str]], int]:
+        """Messages du résumé final et nombre de sections résumées"""
+        source, num_chunks = (text, num_chunks) if num_chunks else self._condense(text, language)
+        if num_chunks > 1:
+            return self._reduce_messages(source, level, language), num_chunks
+        return self._summary_messages(source, level, language), num_chunks
 
-Vrai
-Faux
+    def _condense(self, text: str, language: str) -> Tuple[str, int]:
+        """Ramène un texte long sous la limite d'un appel unique.
 
-Réponse correcte: [Vrai/Faux]
+        Le texte est découpé en sections résumées en parallèle (phase map);
+        les résumés concaténés sont re-résumés tant qu'ils dépassent la
+        limite. Retourne le texte à utiliser et le nombre de sections du
+        premier découpage (1 si aucun découpage n'a été nécessaire).
+        """
+        if estimate_tokens(text) <= self.single_pass_tokens:
+            return text, 1
 
-IMPORTANT: 
-- Mélange environ 60% de QCM et 40% de Vrai/Faux
-- Ne mélange JAMAIS la question avec les options ou la réponse
-- Chaque question doit être sur une ligne séparée
-- Les options doivent être clairement séparées
-- La réponse correcte doit être sur une ligne séparée
-- Pas d'explications dans le texte de la question
-- Pour Vrai/Faux, utilise simplement "Vrai" et "Faux" comme options
-"""},
-                {"role": "user", "content": f"Crée {num_questions} questions de niveau {difficulty} en {language} basées sur ce texte:\n\n{text[:20000]}"},
-            ]
-            result = self._chat_completion(messages)
-            return {
-                "success": True,
-                "quiz_text": result,
-                "model": self.model_name,
-                "num_questions": num_questions,
-                "difficulty": difficulty,
-                "language": language,
-            }
-        except Exception as e:
-            logger.error(f"Erreur génération quiz: {e}")
-            return {"success": False, "error": str(e)}
+        num_chunks = 0
+        while estimate_tokens(text) > self.single_pass_tokens:
+            chunks = split_into_chunks(text, self.chunk_tokens)
+            if len(chunks) <= 1:
+                # AI_CHUNK_TOKENS >= AI_SINGLE_PASS_TOKENS: le texte est envoyé tel quel, sans troncature
+                logger.warning(f"Texte de {estimate_tokens(text)} tokens estimés non découpable sous AI_SINGLE_PASS_TOKENS")
+                break
+            num_chunks = num_chunks or len(chunks)
+            logger.info(f"Résumé map-reduce: {len(chunks)} sections ({estimate_tokens(text)} tokens estimés)")
+            text = "\n\n".join(self._map_chunks(chunks, language))
+        return text, max(num_chunks, 1)
 
-    def chat_with_course(self, course_text: str, question: str, language: str = "french") -> Dict[str, Any]:
+    def _map_chunks(self, chunks: List[str], language: str) -> List[str]:
+        """Résume les sections avec au plus ``map_concurrency`` appels simultanés"""
+        if self.map_concurrency == 1 or len(chunks) == 1:
+            return [self._chat_completion(self._map_messages(chunk, language)) for chunk in chunks]
+        with ThreadPoolExecutor(max_workers=min(self.map_concurrency, len(chunks))) as executor:
+            return list(executor.map(lambda chunk: self._map_chunk(chunk, language), chunks))
+
+    def _map_chunk(self, chunk: str, language: str) -> str:
         try:
-            system_prompt = self._get_system_prompt("chat", "intermediate", language)
-            messages = [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"Contexte du cours:\n{course_text[:18000]}\n\nQuestion: {question}"},
-            ]
-            result = self._chat_completion(messages)
-            return {
-                "success": True,
-                "answer": result,
-                "model": self.model_name,
-                "language": language,
-            }
-        except Exception as e:
-            logger.error(f"Erreur chat: {e}")
-            return {"success": False, "error": str(e)}
+            return self._chat_completion(self._map_messages(chunk, language))
+        finally:
+            # Le cache LLM ouvre une connexion DB propre à ce thread
+            connections.close_all()
+
+    def stream_chat_with_course(self, course_text: str, question: str, language: str = "french") -> Iterator[str]:
+        """Répond à une question sur le cours token par token"""
+        return self._stream_chat_completion(self._chat_messages(course_text, question, language))
+
+    # ------------------------------------------------------------------
+    # Construction des prompts et des résultats (partagée avec AsyncPhi3AI)
+    # ------------------------------------------------------------------
+
+    def _summary_messages(self, text: str, level: str, language: str) -> List[Dict[str, str]]:
+        system_prompt = self._get_system_prompt("summary", level, language)
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": f"Résume ce texte de manière {level} en {language}:\n\n{text}"},
+        ]
+
+    def _map_messages(self, chunk: str, language: str) -> List[Dict[str, str]]:
+        # Indépendant du niveau: les résumés de sections sont réutilisés par tous les niveaux
+        system_prompt = self._get_system_prompt("chunk_summary", "intermediate", language)
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": f"Résume cette section de cours en {language}:\n\n{chunk}"},
+        ]
+
+    def _reduce_messages(self, chunk_summaries: str, level: str, language: str) -> List[Dict[str, str]]:
+        system_prompt = self._get_system_prompt("summary", level, language)
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": f"Voici les résumés successifs des sections d'un cours. Rédige un résumé unique, {level} et cohérent du cours entier en {language}:\n\n{chunk_summaries}"},
+        ]
+
+    def _quiz_messages(self, text: str, num_questions: int, difficulty: str, language: str) -> List[Dict[str, str]]:
+        system_prompt = self._get_system_prompt("quiz", difficulty, language)
+        return [
+            {"role": "system", "content": system_prompt + (QUIZ_JSON_FORMAT if self.structured_quiz else QUIZ_TEXT_FORMAT)},
+            {"role": "user", "content": f"Crée {num_questions} questions de niveau {difficulty} en {language} basées sur ce texte:\n\n{text}"},
+        ]
+
+    def _chat_messages(self, course_text: str, question: str, language: str) -> List[Dict[str, str]]:
+        system_prompt = self._get_system_prompt("chat", "intermediate", language)
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": f"Contexte du cours:\n{course_text}\n\nQuestion: {question}"},
+        ]
+
+    def _quiz_options(self, num_questions: int) -> Dict[str, Any]:
+        """Paramètres de requête propres au quiz (sortie structurée, budget de tokens)"""
+        if not self.structured_quiz:
+            return {}
+        # Un JSON tronqué est inexploitable: ~200 tokens par question
+        return {
+            "response_format": QUIZ_RESPONSE_FORMAT,
+            "max_tokens": max(self.max_tokens, 200 * num_questions),
+        }
+
+    def _summary_result(self, summary: str, level: str, language: str, num_chunks: int = 1) -> Dict[str, Any]:
+        return {
+            "success": True,
+            "summary": summary,
+            "model": self.model_name,
+            "level": level,
+            "language": language,
+            "chunks": num_chunks,
+        }
+
+    def _quiz_result(self, quiz_text: str, num_questions: int, difficulty: str, language: str, num_chunks: int = 1) -> Dict[str, Any]:
+        questions = parse_quiz(quiz_text)
+        if not questions:
+            raise QuizParseError("Aucune question exploitable dans la réponse de l'IA")
+        return {
+            "success": True,
+            "quiz_text": quiz_text,
+            "questions": questions,
+            "model": self.model_name,
+            "num_questions": num_questions,
+            "difficulty": difficulty,
+            "language": language,
+            "chunks": num_chunks,
+        }
+
+    def _chat_result(self, answer: str, language: str) -> Dict[str, Any]:
+        return {
+            "success": True,
+            "answer": answer,
+            "model": self.model_name,
+            "language": language,
+        }
 
     def _get_system_prompt(self, task: str, level: str, language: str) -> str:
         prompts = {
@@ -134,6 +300,10 @@ IMPORTANT:
                 "french": f"Tu es un assistant IA spécialisé dans la création de quiz éducatifs. Crée des questions de niveau {level} avec des réponses claires et des explications.",
                 "english": f"You are an AI assistant specialized in creating educational quizzes. Create {level} level questions with clear answers and explanations.",
             },
+            "chunk_summary": {
+                "french": "Tu es un assistant IA qui résume une section d'un cours plus long. Conserve fidèlement les définitions, notions clés, formules et exemples importants, sans introduction ni conclusion.",
+                "english": "You are an AI assistant summarising one section of a longer course. Faithfully keep definitions, key concepts, formulas and important examples, with no introduction or conclusion.",
+            },
             "chat": {
                 "french": f"Tu es un assistant IA éducatif. Réponds aux questions des étudiants en te basant sur le contenu du cours fourni. Sois précis, pédagogique et adapté au niveau {level}.",
                 "english": f"You are an educational AI assistant. Answer student questions based on the provided course content. Be precise, pedagogical and adapted to {level} level.",
@@ -141,8 +311,65 @@ IMPORTANT:
         }
         return prompts.get(task, {}).get(language, prompts[task]["french"])
 
-    def _chat_completion(self, messages: List[Dict[str, str]]) -> str:
+    def _chat_completion(self, messages: List[Dict[str, str]], regenerate: bool = False, **options: Any) -> str:
+        """Retourne la complétion depuis le cache LLM, ou appelle l'API.
+
+        ``options`` complète ou remplace les champs de la requête
+        (``response_format``, ``max_tokens``...). ``regenerate``: appelle
+        l'API sans lire le cache (réponses échantillonnées), puis remplace
+        l'entrée.
+        """
+        key = self._cache_key(messages, **options)
+        cached = None if regenerate else llm_cache.get(key)
+        if cached is not None:
+            return cached
+        content = self._request_completion(messages, **options)
+        llm_cache.set(key, content, self.model_name)
+        return content
+
+    def _request_completion(self, messages: List[Dict[str, str]], **options: Any) -> str:
         """Appelle l'API OpenAI Chat Completions et retourne le texte"""
+        url, headers, payload = self._build_request(messages, **options)
+        # Session partagée: réutilise les connexions keep-alive vers l'API
+        resp = get_http_session().post(url, json=payload, headers=headers, timeout=self.timeout)
+        if resp.status_code >= 400:
+            try:
+                detail = resp.json()
+            except Exception:
+                detail = resp.text
+            raise RuntimeError(f"OpenAI API error {resp.status_code}: {detail}")
+        return self._extract_content(resp.json())
+
+    def _stream_chat_completion(self, messages: List[Dict[str, str]], regenerate: bool = False) -> Iterator[str]:
+        """Appelle l'API en mode ``stream=True`` et produit les fragments au fil de l'eau"""
+        key = self._cache_key(messages)
+        cached = None if regenerate else llm_cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+
+        url, headers, payload = self._build_request(messages, stream=True)
+        parts: List[str] = []
+        with get_http_session().post(url, json=payload, headers=headers, timeout=self.timeout, stream=True) as resp:
+            if resp.status_code >= 400:
+                raise RuntimeError(f"OpenAI API error {resp.status_code}: {resp.text}")
+            # text/event-stream sans charset: requests décoderait en ISO-8859-1
+            resp.encoding = "utf-8"
+            for line in resp.iter_lines(decode_unicode=True):
+                delta = self._parse_sse_line(line)
+                if delta is None:
+                    break
+                if delta:
+                    parts.append(delta)
+                    yield delta
+        # Flux complet: même entrée de cache qu'un appel non streamé
+        llm_cache.set(key, "".join(parts).strip(), self.model_name)
+
+    def _cache_key(self, messages: List[Dict[str, str]], **options: Any) -> str:
+        max_tokens = options.pop("max_tokens", self.max_tokens)
+        return llm_cache.make_key(messages, self.model_name, self.temperature, max_tokens, **options)
+
+    def _build_request(self, messages: List[Dict[str, str]], stream: bool = False, **options: Any) -> Tuple[str, Dict[str, str], Dict[str, Any]]:
         if not self.api_key:
             raise RuntimeError("OPENAI_API_KEY n'est pas configuré.")
 
@@ -157,16 +384,32 @@ IMPORTANT:
             "max_tokens": self.max_tokens,
             "temperature": self.temperature,
         }
+        payload.update(options)
+        if stream:
+            payload["stream"] = True
+        return url, headers, payload
 
-        resp = requests.post(url, json=payload, headers=headers, timeout=60)
-        if resp.status_code >= 400:
-            try:
-                detail = resp.json()
-            except Exception:
-                detail = resp.text
-            raise RuntimeError(f"OpenAI API error {resp.status_code}: {detail}")
+    @staticmethod
+    def _parse_sse_line(line: str) -> Optional[str]:
+        """Extrait le fragment de texte d'une ligne SSE.
 
-        data = resp.json()
+        Retourne None à la fin du flux (``data: [DONE]``) et une chaîne vide
+        pour les lignes sans contenu (keep-alive, rôle, commentaires).
+        """
+        if not line or not line.startswith("data:"):
+            return ""
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            return None
+        try:
+            chunk = json.loads(data)
+        except ValueError:
+            return ""
+        choice = (chunk.get("choices") or [{}])[0]
+        return (choice.get("delta") or {}).get("content") or choice.get("text") or ""
+
+    @staticmethod
+    def _extract_content(data: Dict[str, Any]) -> str:
         # Format supposé proche d'OpenAI: choices[0].message.content
         content = (
             data.get("choices", [{}])[0]
@@ -187,8 +430,166 @@ IMPORTANT:
             "temperature": self.temperature,
             "provider": "openai",
             "base_url": self.base_url,
+            "http_pool": get_pool_stats(),
+            "cache": llm_cache.stats(),
         }
 
 
+class AsyncPhi3AI(Phi3AI):
+    """Variante asyncio (httpx) de Phi3AI pour les vues servies en ASGI.
+
+    Même interface que Phi3AI, mais les méthodes sont des coroutines: un
+    appel LLM en cours ne bloque plus un worker, seulement une tâche de la
+    boucle d'événements.
+    """
+
+    def __init__(self, model_name: str | None = None):
+        super().__init__(model_name)
+        # Un AsyncClient est lié à sa boucle d'événements: un client par boucle
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = weakref.WeakKeyDictionary()
+
+    def _get_client(self):
+        if httpx is None:
+            raise RuntimeError("httpx n'est pas installé. Installez-le avec: pip install httpx")
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None or client.is_closed:
+            limits = httpx.Limits(
+                max_connections=getattr(settings, "AI_ASYNC_MAX_CONNECTIONS", 200),
+                max_keepalive_connections=getattr(settings, "HTTP_POOL_MAXSIZE", 20),
+            )
+            client = httpx.AsyncClient(limits=limits, timeout=self.timeout)
+            self._clients[loop] = client
+        return client
+
+    async def generate_summary(self, text: str, level: str = "intermediate", language: str = "french",
+                               num_chunks: int = 0, regenerate: bool = False) -> Dict[str, Any]:
+        try:
+            messages, num_chunks = await self._prepare_summary(text, level, language, num_chunks)
+            result = await self._chat_completion(messages, regenerate=regenerate)
+            return self._summary_result(result, level, language, num_chunks)
+        except Exception as e:
+            logger.error(f"Erreur génération résumé: {e}")
+            return {"success": False, "error": str(e)}
+
+    async def generate_quiz(self, text: str, num_questions: int = 5, difficulty: str = "medium", language: str = "french",
+                            num_chunks: int = 0, regenerate: bool = False) -> Dict[str, Any]:
+        try:
+            source, num_chunks = (text, num_chunks) if num_chunks else await self._condense(text, language)
+            result = await self._chat_completion(
+                self._quiz_messages(source, num_questions, difficulty, language),
+                regenerate=regenerate,
+                **self._quiz_options(num_questions),
+            )
+            return self._quiz_result(result, num_questions, difficulty, language, num_chunks)
+        except Exception as e:
+            logger.error(f"Erreur génération quiz: {e}")
+            return {"success": False, "error": str(e)}
+
+    async def chat_with_course(self, course_text: str, question: str, language: str = "french") -> Dict[str, Any]:
+        try:
+            result = await self._chat_completion(self._chat_messages(course_text, question, language))
+            return self._chat_result(result, language)
+        except Exception as e:
+            logger.error(f"Erreur chat: {e}")
+            return {"success": False, "error": str(e)}
+
+    async def stream_summary(self, text: str, level: str = "intermediate", language: str = "french",
+                             regenerate: bool = False) -> AsyncIterator[str]:
+        messages, _ = await self._prepare_summary(text, level, language)
+        async for delta in self._stream_chat_completion(messages, regenerate=regenerate):
+            yield delta
+
+    async def stream_chat_with_course(self, course_text: str, question: str, language: str = "french") -> AsyncIterator[str]:
+        async for delta in self._stream_chat_completion(self._chat_messages(course_text, question, language)):
+            yield delta
+
+    async def condense(self, text: str, language: str = "french") -> Tuple[str, int]:
+        return await self._condense(text, language)
+
+    async def _prepare_summary(self, text: str, level: str, language: str,
+                               num_chunks: int = 0) -> Tuple[List[Dict[str, str]], int]:
+        source, num_chunks = (text, num_chunks) if num_chunks else await self._condense(text, language)
+        if num_chunks > 1:
+            return self._reduce_messages(source, level, language), num_chunks
+        return self._summary_messages(source, level, language), num_chunks
+
+    async def _condense(self, text: str, language: str) -> Tuple[str, int]:
+        if estimate_tokens(text) <= self.single_pass_tokens:
+            return text, 1
+
+        num_chunks = 0
+        while estimate_tokens(text) > self.single_pass_tokens:
+            chunks = split_into_chunks(text, self.chunk_tokens)
+            if len(chunks) <= 1:
+                # AI_CHUNK_TOKENS >= AI_SINGLE_PASS_TOKENS: le texte est envoyé tel quel, sans troncature
+                logger.warning(f"Texte de {estimate_tokens(text)} tokens estimés non découpable sous AI_SINGLE_PASS_TOKENS")
+                break
+            num_chunks = num_chunks or len(chunks)
+            logger.info(f"Résumé map-reduce: {len(chunks)} sections ({estimate_tokens(text)} tokens estimés)")
+            text = "\n\n".join(await self._map_chunks(chunks, language))
+        return text, max(num_chunks, 1)
+
+    async def _map_chunks(self, chunks: List[str], language: str) -> List[str]:
+        semaphore = asyncio.Semaphore(self.map_concurrency)
+
+        async def summarise(chunk: str) -> str:
+            async with semaphore:
+                return await self._chat_completion(self._map_messages(chunk, language))
+
+        # gather conserve l'ordre des sections
+        return list(await asyncio.gather(*(summarise(chunk) for chunk in chunks)))
+
+    async def _stream_chat_completion(self, messages: List[Dict[str, str]], regenerate: bool = False) -> AsyncIterator[str]:
+        key = self._cache_key(messages)
+        cached = None if regenerate else await sync_to_async(llm_cache.get)(key)
+        if cached is not None:
+            yield cached
+            return
+
+        url, headers, payload = self._build_request(messages, stream=True)
+        parts: List[str] = []
+        async with self._get_client().stream("POST", url, json=payload, headers=headers) as resp:
+            if resp.status_code >= 400:
+                detail = (await resp.aread()).decode("utf-8", errors="replace")
+                raise RuntimeError(f"OpenAI API error {resp.status_code}: {detail}")
+            async for line in resp.aiter_lines():
+                delta = self._parse_sse_line(line)
+                if delta is None:
+                    break
+                if delta:
+                    parts.append(delta)
+                    yield delta
+        await sync_to_async(llm_cache.set)(key, "".join(parts).strip(), self.model_name)
+
+    async def _chat_completion(self, messages: List[Dict[str, str]], regenerate: bool = False, **options: Any) -> str:
+        key = self._cache_key(messages, **options)
+        cached = None if regenerate else await sync_to_async(llm_cache.get)(key)
+        if cached is not None:
+            return cached
+        content = await self._request_completion(messages, **options)
+        await sync_to_async(llm_cache.set)(key, content, self.model_name)
+        return content
+
+    async def _request_completion(self, messages: List[Dict[str, str]], **options: Any) -> str:
+        """Appelle l'API OpenAI Chat Completions sans bloquer la boucle"""
+        url, headers, payload = self._build_request(messages, **options)
+        resp = await self._get_client().post(url, json=payload, headers=headers)
+        if resp.status_code >= 400:
+            try:
+                detail = resp.json()
+            except Exception:
+                detail = resp.text
+            raise RuntimeError(f"OpenAI API error {resp.status_code}: {detail}")
+        return self._extract_content(resp.json())
+
+    async def aclose(self) -> None:
+        """Ferme le client httpx de la boucle courante"""
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+
 # Instance globale (API compatible)
 phi3_ai = Phi3AI()
+async_phi3_ai = AsyncPhi3AI()
@@ -0,0 +1,160 @@
+"""
+Prétraitement des textes de cours: nettoyage, phrases, mots clés
+
+Un moteur par processus: les ressources NLTK sont vérifiées une seule fois
+(au démarrage de chaque worker Celery, voir ``worker_process_init`` dans
+core/tasks.py), les mots vides sont figés dans un ``frozenset`` et les
+expressions régulières précompilées. Les textes longs sont traités par
+fenêtres de taille bornée, coupées en fin de phrase ou sur un espace.
+
+NLTK est optionnel: sans lui, phrases et mots sont découpés par expressions
+régulières.
+"""
+from __future__ import annotations
+
+import logging
+import re
+import threading
+from collections import Counter
+from typing import Dict, Iterator, List, Optional
+
+from django.conf import settings
+
+try:
+    import nltk
+    from nltk.tokenize import sent_tokenize, word_tokenize
+except ImportError:
+    nltk = None
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r'\s+')
+_SPECIAL_CHARS_RE = re.compile(r'[^\w\s\.\,\!\?]')
+# Repli sans NLTK
+_SENTENCE_RE = re.compile(r'(?<=[.!?])\s+')
+_WORD_RE = re.compile(r'\w+|[^\w\s]')
+
+# Ressources NLTK: (chemin nltk.data, paquet à télécharger)
+NLTK_RESOURCES = (
+    ('tokenizers/punkt', 'punkt'),
+    ('tokenizers/punkt_tab', 'punkt_tab'),
+    ('corpora/stopwords', 'stopwords'),
+)
+
+# Mots vides sans NLTK, partagés avec l'index des sections (core/retrieval.py)
+FALLBACK_STOPWORDS = frozenset("""
+a au aux avec ce ces dans de des du elle en et eux il ils je la le les leur lui ma mais me même
+mes moi mon ne nos notre nous on ou par pas pour qu que qui sa se ses son sur ta te tes toi ton
+tu un une vos votre vous est sont été être avoir cette comme plus elles leurs dont
+the of and to in is are was were be been for on with as by at an or it this that from which
+what how why when who
+""".split())
+
+
+class PreprocessingEngine:
+    """Moteur de prétraitement à durée de vie du processus"""
+
+    def __init__(self, window_chars: Optional[int] = None, key_words: int = 20, language: str = 'french'):
+        self.window_chars = window_chars or getattr(settings, 'PREPROCESSING_WINDOW_CHARS', 256 * 1024)
+        self.key_words = key_words
+        self.language = language
+        self.stop_words: frozenset = FALLBACK_STOPWORDS
+        self.use_nltk = False
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def load(self) -> None:
+        """Vérifie (et télécharge au besoin) les ressources NLTK, une seule fois"""
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            if nltk is not None:
+                self.use_nltk = self._ensure_nltk_resources()
+                if self.use_nltk:
+                    from nltk.corpus import stopwords
+                    self.stop_words = frozenset(stopwords.words(self.language))
+            self._loaded = True
+            logger.info(
+                f"Moteur de prétraitement prêt ({'NLTK' if self.use_nltk else 'expressions régulières'}, "
+                f"{len(self.stop_words)} mots vides)"
+            )
+
+    @staticmethod
+    def _ensure_nltk_resources() -> bool:
+        auto_download = getattr(settings, 'NLTK_AUTO_DOWNLOAD', True)
+        for path, package in NLTK_RESOURCES:
+            try:
+                nltk.data.find(path)
+                continue
+            except LookupError:
+                pass
+            if not auto_download or not nltk.download(package, quiet=True):
+                logger.warning(f"Ressource NLTK '{package}' indisponible, découpage par expressions régulières")
+                return False
+        return True
+
+    def iter_windows(self, text: str) -> Iterator[str]:
+        """Fenêtres d'au plus ``window_chars`` caractères, coupées en fin de phrase si possible"""
+        start, length = 0, len(text)
+        while start < length:
+            end = start + self.window_chars
+            if end < length:
+                cut = max(text.rfind('. ', start, end), text.rfind('\n', start, end))
+                if cut <= start:
+                    cut = text.rfind(' ', start, end)
+                if cut > start:
+                    end = cut + 1
+            yield text[start:end]
+            start = end
+
+    def preprocess(self, text: str) -> Dict[str, object]:
+        """Texte nettoyé, phrases, mots clés et compteurs, fenêtre par fenêtre"""
+        self.load()
+        cleaned_parts: List[str] = []
+        sentences: List[str] = []
+        word_freq: Counter = Counter()
+        word_count = 0
+
+        for window in self.iter_windows(text or ''):
+            cleaned = _SPECIAL_CHARS_RE.sub('', _WHITESPACE_RE.sub(' ', window)).strip()
+            if not cleaned:
+                continue
+            cleaned_parts.append(cleaned)
+            sentences.extend(self._sentences(cleaned))
+            words = self._words(cleaned.lower())
+            word_count += len(words)
+            word_freq.update(word for word in words if len(word) > 3 and word not in self.stop_words)
+
+        return {
+            'cleaned_text': ' '.join(cleaned_parts),
+            'sentences': sentences,
+            'key_words': [word for word, _ in word_freq.most_common(self.key_words)],
+            'word_count': word_count,
+            'sentence_count': len(sentences),
+        }
+
+    def _sentences(self, text: str) -> List[str]:
+        if self.use_nltk:
+            return sent_tokenize(text, language=self.language)
+        return [sentence for sentence in _SENTENCE_RE.split(text) if sentence]
+
+    def _words(self, text: str) -> List[str]:
+        if self.use_nltk:
+            return word_tokenize(text, language=self.language)
+        return _WORD_RE.findall(text)
+
+
+_engine: Optional[PreprocessingEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> PreprocessingEngine:
+    """Moteur partagé du processus (créé au premier appel)"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = PreprocessingEngine()
+    return _engine
@@ -0,0 +1,254 @@
+"""
+Parsing des quiz générés par l'IA
+
+Deux formats sont acceptés:
+- JSON structuré (``response_format`` json_schema de l'API), validé question
+  par question: c'est le format demandé par défaut à ``Phi3AI.generate_quiz``
+- texte libre numéroté (ancien format), lu par des expressions régulières
+  précompilées en secours
+
+Les deux parseurs produisent des dictionnaires directement utilisables pour
+créer des ``Question``: ``question_text``, ``question_type``, ``options``,
+``correct_answer`` (texte de la bonne option) et ``explanation``.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import re
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+TRUE_FALSE_OPTIONS = ["Vrai", "Faux"]
+MIN_OPTIONS = 2
+MAX_OPTIONS = 6
+
+# Schéma imposé au modèle (mode strict: tous les champs requis, aucun champ en plus)
+QUIZ_JSON_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "questions": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "type": {"type": "string", "enum": ["multiple_choice", "true_false"]},
+                    "question": {"type": "string"},
+                    "options": {"type": "array", "items": {"type": "string"}},
+                    "answer": {"type": "string"},
+                    "explanation": {"type": "string"},
+                },
+                "required": ["type", "question", "options", "answer", "explanation"],
+                "additionalProperties": False,
+            },
+        },
+    },
+    "required": ["questions"],
+    "additionalProperties": False,
+}
+
+QUIZ_RESPONSE_FORMAT: Dict[str, Any] = {
+    "type": "json_schema",
+    "json_schema": {"name": "quiz", "strict": True, "schema": QUIZ_JSON_SCHEMA},
+}
+
+_TRUE_VALUES = frozenset({"vrai", "true", "v"})
+_FALSE_VALUES = frozenset({"faux", "false", "f"})
+
+_CODE_FENCE_RE = re.compile(r"^```(?:json)?\s*|\s*```$", re.IGNORECASE)
+_QUESTION_RE = re.compile(r"^(\d+)[\.\)]\s*(.+)$")
+_OPTION_RE = re.compile(r"^([A-F])[\.\)]\s*(.+)$")
+_ANSWER_RE = re.compile(r"^\**(?:Réponse correcte|Bonne réponse|Réponse|Correct answer|Correct|Answer)\**\s*:\s*\**(.+?)\**$", re.IGNORECASE)
+_LETTER_ANSWER_RE = re.compile(r"^([A-F])(?:[\.\)]|\s|$)", re.IGNORECASE)
+_EXPLANATION_RE = re.compile(r"^\**(?:Explication|Explanation)\**\s*:\s*(.+)$", re.IGNORECASE)
+_QUESTION_CLEANUP_RE = re.compile(r"\*\*.*?\*\*|Réponse correcte.*?$|Explication.*?$", re.IGNORECASE | re.DOTALL)
+
+
+class QuizParseError(ValueError):
+    """Aucune question valide n'a pu être extraite de la réponse de l'IA"""
+
+
+def parse_quiz(raw: str) -> List[Dict[str, Any]]:
+    """Parse une réponse de l'IA: JSON structuré d'abord, texte libre en secours"""
+    try:
+        return parse_quiz_json(raw)
+    except QuizParseError as e:
+        logger.info(f"Quiz non structuré, parsing texte en secours: {e}")
+    return parse_ai_quiz_text(raw)
+
+
+def parse_quiz_json(raw: str) -> List[Dict[str, Any]]:
+    """Valide un quiz JSON conforme à ``QUIZ_JSON_SCHEMA``.
+
+    Les questions invalides sont ignorées; lève ``QuizParseError`` si
+    aucune ne l'est.
+    """
+    try:
+        data = json.loads(_CODE_FENCE_RE.sub("", (raw or "").strip()))
+    except ValueError as e:
+        raise QuizParseError(f"JSON invalide: {e}")
+
+    items = data.get("questions") if isinstance(data, dict) else data
+    if not isinstance(items, list):
+        raise QuizParseError("Champ 'questions' manquant")
+
+    questions = []
+    for position, item in enumerate(items, 1):
+        question = _validate_item(item) if isinstance(item, dict) else None
+        if question is None:
+            logger.warning(f"Question {position} du quiz IA ignorée (invalide): {str(item)[:200]}")
+            continue
+        questions.append(question)
+
+    if not questions:
+        raise QuizParseError("Aucune question valide")
+    return questions
+
+
+def _validate_item(item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    text = clean_question_text(str(item.get("question") or ""))
+    answer = str(item.get("answer") or "").strip()
+    options = [str(o).strip() for o in item.get("options") or [] if str(o).strip()]
+    if not text or not answer:
+        return None
+
+    if item.get("type") == "true_false" or _is_true_false(options):
+        correct = _true_false_answer(answer)
+        if correct is None:
+            return None
+        return _question(text, "true_false", TRUE_FALSE_OPTIONS, correct, item.get("explanation"))
+
+    options = list(dict.fromkeys(_strip_option_prefix(o) for o in options))
+    if not MIN_OPTIONS <= len(options) <= MAX_OPTIONS:
+        return None
+    correct = _resolve_choice(answer, options)
+    if correct is None:
+        return None
+    return _question(text, "multiple_choice", options, correct, item.get("explanation"))
+
+
+def parse_ai_quiz_text(quiz_text: str) -> List[Dict[str, Any]]:
+    """Parse le format texte numéroté (voir ``phi3_ai.QUIZ_TEXT_FORMAT``).
+
+    Le type de chaque question est déduit de sa structure (options A-F ou
+    Vrai/Faux, réponse attendue) et non de mots-clés dans l'énoncé. Les
+    questions sans bonne réponse reconnue sont ignorées; la liste peut
+    être vide.
+    """
+    questions: List[Dict[str, Any]] = []
+    current: Optional[Dict[str, Any]] = None
+
+    for line in (quiz_text or "").splitlines():
+        line = line.strip().strip("*").strip()
+        if not line:
+            continue
+
+        match = _QUESTION_RE.match(line)
+        if match:
+            _finalize(current, questions)
+            current = {"text": match.group(2), "options": [], "tf": False, "answer": "", "explanation": ""}
+            continue
+        if current is None:
+            continue
+
+        match = _OPTION_RE.match(line)
+        if match:
+            current["options"].append(match.group(2).strip())
+            continue
+        if line.lower() in _TRUE_VALUES | _FALSE_VALUES:
+            current["tf"] = True
+            continue
+        match = _ANSWER_RE.match(line)
+        if match:
+            current["answer"] = match.group(1).strip()
+            continue
+        match = _EXPLANATION_RE.match(line)
+        if match:
+            current["explanation"] = match.group(1).strip()
+
+    _finalize(current, questions)
+    logger.debug(f"Quiz texte: {len(questions)} questions extraites")
+
+    if not questions:
+        logger.warning(f"Aucune question reconnue dans le quiz IA: {(quiz_text or '')[:200]}")
+    return questions
+
+
+def _finalize(current: Optional[Dict[str, Any]], questions: List[Dict[str, Any]]) -> None:
+    if current is None:
+        return
+    text = clean_question_text(current["text"])
+    options = current["options"]
+    answer = current["answer"]
+    tf_answer = _true_false_answer(answer) if answer else None
+
+    # Une question dont la bonne réponse est introuvable est ignorée: en
+    # choisir une au hasard noterait faux les étudiants qui répondent juste
+    if len(options) >= MIN_OPTIONS:
+        options = options[:MAX_OPTIONS]
+        correct = _resolve_choice(answer, options) if answer else None
+        if correct is None:
+            logger.warning(f"Question IA sans bonne réponse reconnue ignorée ({answer!r}): {text[:100]}")
+            return
+        questions.append(_question(text, "multiple_choice", options, correct, current["explanation"]))
+    elif current["tf"] or tf_answer is not None:
+        if tf_answer is None:
+            logger.warning(f"Question Vrai/Faux sans réponse reconnue ignorée ({answer!r}): {text[:100]}")
+            return
+        questions.append(_question(text, "true_false", TRUE_FALSE_OPTIONS, tf_answer, current["explanation"]))
+    else:
+        logger.warning(f"Question IA sans options ignorée: {text[:100]}")
+
+
+def _question(text: str, question_type: str, options: List[str], correct_answer: str,
+              explanation: Any = "") -> Dict[str, Any]:
+    return {
+        "question_text": text[:500],
+        "question_type": question_type,
+        "options": list(options),
+        "correct_answer": correct_answer[:500],
+        "explanation": str(explanation or "").strip(),
+    }
+
+
+def clean_question_text(text: str) -> str:
+    """Retire la numérotation et toute réponse restée dans l'énoncé"""
+    text = _QUESTION_RE.sub(r"\2", text.strip())
+    return _QUESTION_CLEANUP_RE.sub("", text).strip()
+
+
+def _strip_option_prefix(option: str) -> str:
+    match = _OPTION_RE.match(option)
+    return match.group(2).strip() if match else option
+
+
+def _is_true_false(options: List[str]) -> bool:
+    lowered = {o.lower() for o in options}
+    return len(lowered) == 2 and bool(lowered & _TRUE_VALUES) and bool(lowered & _FALSE_VALUES)
+
+
+def _true_false_answer(answer: str) -> Optional[str]:
+    value = answer.strip().strip(".").lower()
+    if value in _TRUE_VALUES:
+        return "Vrai"
+    if value in _FALSE_VALUES:
+        return "Faux"
+    return None
+
+
+def _resolve_choice(answer: str, options: List[str]) -> Optional[str]:
+    """Texte de l'option désignée par ``answer`` (texte exact ou lettre)"""
+    for option in options:
+        if option.lower() == answer.lower():
+            return option
+    match = _LETTER_ANSWER_RE.match(answer)
+    if match:
+        index = ord(match.group(1).upper()) - ord("A")
+        if index < len(options):
+            return options[index]
+    stripped = _strip_option_prefix(answer)
+    for option in options:
+        if option.lower() == stripped.lower():
+            return option
+    return None
@@ -0,0 +1,182 @@
+"""
+Données de jeu d'un quiz, compilées une fois par version du quiz
+
+``compile_quiz`` lit les questions une seule fois et produit un dictionnaire
+sérialisable: textes, options, index de la bonne réponse et tables de
+correspondance (option -> index, question -> position). Il est mis en cache
+(``get_quiz_payload``) sous une clé qui contient ``quiz.updated_at``: quand
+une question est enregistrée ou supprimée, ``invalidate_quiz_payload`` avance
+cette date en base (voir core/signals.py), et tous les processus (workers web
+et Celery, chacun avec son cache) lisent alors une nouvelle clé. Sa
+``version`` est l'empreinte de son contenu.
+
+``shuffle_payload`` dérive de ce payload l'ordre des questions et des
+options d'une partie à partir d'une graine: la même graine redonne
+exactement le même mélange, sans relire la base.
+
+Une partie est corrigée une seule fois (core/grading.py); le résultat (une
+entrée par question, dans l'ordre affiché) est stocké sur la tentative avec
+la graine et relu tel quel par ``attempt_results`` pour les pages de résultats.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import random
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+TRUE_FALSE_OPTIONS = ['Vrai', 'Faux']
+TRUE_ANSWERS = ('vrai', 'true', 'a')
+# Types dont la réponse est l'index de l'option choisie
+INDEXED_TYPES = ('multiple_choice', 'true_false')
+
+_CACHE_PREFIX = 'quiz_payload:'
+
+
+def _cache_key(quiz) -> str:
+    """Clé propre à l'état du quiz: date de modification et mélange des questions"""
+    updated = int(quiz.updated_at.timestamp() * 1_000_000) if quiz.updated_at else 0
+    return f"{_CACHE_PREFIX}{quiz.id}:{updated}:{int(quiz.shuffle_questions)}"
+
+
+def _compile_question(question) -> Dict[str, Any]:
+    if question.question_type == 'true_false':
+        # Le jeu affiche toujours Vrai (0) puis Faux (1)
+        options = list(TRUE_FALSE_OPTIONS)
+        correct_index = 0 if question.correct_answer.strip().lower() in TRUE_ANSWERS else 1
+    else:
+        options = list(question.options or [])
+        option_index = {option: i for i, option in enumerate(options)}
+        # Réponse absente des options: la première option sert de repli (comportement historique)
+        correct_index = option_index.get(question.correct_answer, 0)
+
+    return {
+        'id': str(question.id),
+        'question_text': question.question_text,
+        'question_type': question.question_type,
+        'correct_answer': question.correct_answer,
+        'explanation': question.explanation,
+        'hint': question.hint,
+        'points': question.points,
+        'options': options,
+        'correct_index': correct_index,
+        'option_index': {option: i for i, option in enumerate(options)},
+    }
+
+
+def compile_quiz(quiz) -> Dict[str, Any]:
+    """Payload de jeu du quiz (une requête sur les questions)"""
+    questions = [_compile_question(question) for question in quiz.questions.all()]
+    content = json.dumps(questions, sort_keys=True, ensure_ascii=False)
+    return {
+        'quiz_id': str(quiz.id),
+        'version': hashlib.sha256(content.encode('utf-8')).hexdigest()[:16],
+        'shuffle_questions': quiz.shuffle_questions,
+        'questions': questions,
+        'positions': {question['id']: i for i, question in enumerate(questions)},
+        'total_questions': len(questions),
+    }
+
+
+def get_quiz_payload(quiz) -> Dict[str, Any]:
+    """Payload du quiz depuis le cache, compilé au besoin"""
+    key = _cache_key(quiz)
+    payload = cache.get(key)
+    if payload is None:
+        payload = compile_quiz(quiz)
+        cache.set(key, payload, getattr(settings, 'QUIZ_PAYLOAD_CACHE_TTL', 24 * 3600))
+    return payload
+
+
+def invalidate_quiz_payload(quiz_id) -> None:
+    """Avance ``updated_at`` du quiz: les payloads en cache, dans tous les processus, ne sont plus lus"""
+    from .models import Quiz
+
+    Quiz.objects.filter(pk=quiz_id).update(updated_at=timezone.now())
+
+
+def new_seed() -> int:
+    return random.SystemRandom().randrange(2 ** 31)
+
+
+def shuffle_payload(payload: Dict[str, Any], seed: int) -> List[Dict[str, Any]]:
+    """Questions d'une partie, mélangées de façon déterministe par ``seed``.
+
+    Chaque élément contient la question compilée, ses ``options`` dans
+    l'ordre affiché, ``permutation`` (index d'origine de chaque option
+    affichée) et ``correct_answer_index`` dans l'ordre affiché. Les options
+    Vrai/Faux ne sont pas mélangées (ordre fixe à l'écran).
+    """
+    rng = random.Random(seed)
+    questions = list(payload['questions'])
+    if payload.get('shuffle_questions', True):
+        rng.shuffle(questions)
+
+    played = []
+    for question in questions:
+        permutation = list(range(len(question['options'])))
+        if question['question_type'] == 'multiple_choice':
+            rng.shuffle(permutation)
+        # Position affichée de chaque option d'origine
+        displayed_at = {original: shown for shown, original in enumerate(permutation)}
+        played.append({
+            'question': question,
+            'options': [question['options'][i] for i in permutation],
+            'permutation': permutation,
+            'correct_answer_index': displayed_at.get(question['correct_index'], 0),
+        })
+    return played
+
+
+def build_quiz_data(quiz, seed: Optional[int] = None) -> Dict[str, Any]:
+    """Données de jeu d'une partie (format historique de ``create_quiz_data``)"""
+    payload = get_quiz_payload(quiz)
+    seed = new_seed() if seed is None else seed
+    questions = shuffle_payload(payload, seed)
+    return {
+        'quiz': quiz,
+        'payload': payload,
+        'seed': seed,
+        'version': payload['version'],
+        'questions': questions,
+        'correct_answers': {item['question']['id']: item['correct_answer_index'] for item in questions},
+        'total_questions': payload['total_questions'],
+    }
+
+
+def attempt_results(attempt, payload: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """Lignes des pages de résultats d'une tentative, lues sans recorriger.
+
+    Les textes des questions viennent du payload en cache; le reste
+    (options affichées, réponse, correction) de ``attempt.question_results``.
+    Les tentatives antérieures au stockage de la correction n'ont pas de
+    lignes.
+    """
+    payload = payload or get_quiz_payload(attempt.quiz)
+    rows = []
+    for record in attempt.question_results or []:
+        position = payload['positions'].get(record['question_id'])
+        question = payload['questions'][position] if position is not None else {
+            'id': record['question_id'], 'question_text': '', 'question_type': '', 'explanation': '',
+        }
+        options = record['options']
+        answer = record['answer']
+        if record['selected_index'] is not None:
+            user_answer = options[record['selected_index']]
+        elif answer and question['question_type'] in INDEXED_TYPES and options:
+            user_answer = "Réponse invalide"
+        else:
+            user_answer = answer or ''
+        rows.append({
+            'question': question,
+            'options': options if question['question_type'] == 'multiple_choice' else None,
+            'correct_answer_index': record['correct_answer_index'],
+            'correct_answer': record['correct_answer'],
+            'user_answer': user_answer,
+            'is_correct': record['is_correct'],
+        })
+    return rows
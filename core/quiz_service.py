@@ -0,0 +1,44 @@
+"""
+Création des quiz générés par l'IA
+
+Point d'entrée unique pour enregistrer un quiz et ses questions (vues IA,
+tâches Celery): une seule transaction et un seul INSERT pour les questions.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, Optional
+
+from django.db import transaction
+
+from .models import Question, Quiz
+
+
+def materialize_quiz(course, questions: Iterable[Dict[str, Any]], difficulty: str = 'medium',
+                     title: Optional[str] = None, description: Optional[str] = None) -> Quiz:
+    """Crée le quiz et ses questions de façon atomique.
+
+    ``questions`` est une liste de dictionnaires au format de
+    ``quiz_parsing`` (``question_text``, ``question_type``, ``options``,
+    ``correct_answer``, ``explanation``). L'ordre de la liste est conservé
+    dans ``Question.order``; les UUID sont attribués avant l'insertion.
+    """
+    with transaction.atomic():
+        quiz = Quiz.objects.create(
+            title=title or f"Quiz IA - {course.title}",
+            description=description or f"Quiz généré par IA ({difficulty}) pour le cours {course.title}",
+            course=course,
+            difficulty=difficulty
+        )
+        Question.objects.bulk_create([
+            Question(
+                quiz=quiz,
+                question_text=q_data.get('question_text', q_data.get('question', ''))[:500],
+                question_type=q_data.get('question_type', q_data.get('type', 'multiple_choice')),
+                correct_answer=str(q_data.get('correct_answer', ''))[:500],
+                options=q_data.get('options', []),
+                explanation=q_data.get('explanation', ''),
+                order=i + 1
+            )
+            for i, q_data in enumerate(questions)
+        ])
+    return quiz
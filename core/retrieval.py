@@ -0,0 +1,233 @@
+"""
+Recherche des passages pertinents d'un cours pour le chat IA
+
+Chaque texte de cours possède un index BM25 de ses paragraphes, construit
+une seule fois (à l'upload ou dès que le texte change) et stocké dans
+``CourseChunkIndex`` sous l'empreinte du texte: les cours au contenu
+identique partagent le même index. Les postings sont des tableaux NumPy rangés par terme
+(format CSC): pour une question, seules les colonnes de ses termes sont
+lues et le score de chaque section est calculé de façon vectorisée.
+"""
+from __future__ import annotations
+
+import hashlib
+import io
+import logging
+import re
+import threading
+import unicodedata
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+from django.conf import settings
+
+from .chunking import split_into_chunks
+from .preprocessing import FALLBACK_STOPWORDS
+
+logger = logging.getLogger(__name__)
+
+# Paramètres BM25 usuels
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _normalize(text: str) -> str:
+    """Minuscules, sans accents"""
+    normalized = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in normalized if not unicodedata.combining(c))
+
+
+# Mots vides du prétraitement, sous la forme normalisée des termes indexés
+STOPWORDS = frozenset(_normalize(word) for word in FALLBACK_STOPWORDS)
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+
+def tokenize(text: str) -> List[str]:
+    """Termes normalisés (minuscules, sans accents, sans mots vides)"""
+    return [t for t in _TOKEN_RE.findall(_normalize(text)) if len(t) > 1 and t not in STOPWORDS]
+
+
+class ChunkIndex:
+    """Index BM25 des sections d'un texte"""
+
+    def __init__(self, chunks: List[str], vocabulary: Dict[str, int], indptr: np.ndarray,
+                 indices: np.ndarray, tf: np.ndarray, doc_lengths: np.ndarray):
+        self.chunks = chunks
+        self.vocabulary = vocabulary
+        # Colonne du terme t: indices[indptr[t]:indptr[t + 1]] (sections), tf[...] (fréquences)
+        self.indptr = indptr
+        self.indices = indices
+        self.tf = tf
+        self.doc_lengths = doc_lengths
+        self.avg_length = float(doc_lengths.mean()) if len(doc_lengths) else 0.0
+        df = np.diff(indptr).astype(np.float32)
+        n = float(len(chunks))
+        self.idf = np.log1p((n - df + 0.5) / (df + 0.5)).astype(np.float32)
+
+    @classmethod
+    def build(cls, text: str, chunk_tokens: int) -> "ChunkIndex":
+        chunks = split_into_chunks(text, chunk_tokens)
+        vocabulary: Dict[str, int] = {}
+        postings: List[List[tuple]] = []
+        doc_lengths = np.zeros(len(chunks), dtype=np.float32)
+
+        for chunk_id, chunk in enumerate(chunks):
+            terms = tokenize(chunk)
+            doc_lengths[chunk_id] = len(terms)
+            for term, count in Counter(terms).items():
+                term_id = vocabulary.setdefault(term, len(vocabulary))
+                if term_id == len(postings):
+                    postings.append([])
+                postings[term_id].append((chunk_id, count))
+
+        indptr = np.zeros(len(postings) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([len(p) for p in postings])
+        indices = np.fromiter((c for p in postings for c, _ in p), dtype=np.int32, count=int(indptr[-1]))
+        tf = np.fromiter((n for p in postings for _, n in p), dtype=np.float32, count=int(indptr[-1]))
+        return cls(chunks, vocabulary, indptr, indices, tf, doc_lengths)
+
+    def scores(self, query: str) -> np.ndarray:
+        scores = np.zeros(len(self.chunks), dtype=np.float32)
+        if not self.avg_length:
+            return scores
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lengths / self.avg_length)
+        for term in set(tokenize(query)):
+            term_id = self.vocabulary.get(term)
+            if term_id is None:
+                continue
+            start, end = self.indptr[term_id], self.indptr[term_id + 1]
+            ids = self.indices[start:end]
+            tf = self.tf[start:end]
+            scores[ids] += self.idf[term_id] * tf * (BM25_K1 + 1) / (tf + norm[ids])
+        return scores
+
+    def top_k(self, query: str, k: int) -> List[int]:
+        """Identifiants des k meilleures sections (score > 0), par score décroissant"""
+        scores = self.scores(query)
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return [int(i) for i in best if scores[i] > 0]
+
+    # ------------------------------------------------------------------
+    # Sérialisation (BinaryField)
+    # ------------------------------------------------------------------
+
+    def to_bytes(self) -> bytes:
+        terms = sorted(self.vocabulary, key=self.vocabulary.get)
+        buffer = io.BytesIO()
+        np.savez_compressed(
+            buffer,
+            terms=np.frombuffer("\n".join(terms).encode("utf-8"), dtype=np.uint8),
+            indptr=self.indptr,
+            indices=self.indices,
+            tf=self.tf,
+            doc_lengths=self.doc_lengths,
+        )
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, payload: bytes, chunks: List[str]) -> "ChunkIndex":
+        with np.load(io.BytesIO(payload), allow_pickle=False) as data:
+            raw_terms = data["terms"].tobytes().decode("utf-8")
+            terms = raw_terms.split("\n") if raw_terms else []
+            return cls(
+                chunks,
+                {term: i for i, term in enumerate(terms)},
+                data["indptr"],
+                data["indices"],
+                data["tf"],
+                data["doc_lengths"],
+            )
+
+
+# Index désérialisés récemment utilisés, par empreinte du texte
+_loaded: "OrderedDict[str, ChunkIndex]" = OrderedDict()
+_loaded_lock = threading.Lock()
+_LOADED_MAX = 64
+
+
+def build_course_index(course) -> ChunkIndex:
+    """Construit (ou reconstruit) et enregistre l'index des sections d'un cours"""
+    from .models import CourseChunkIndex
+
+    text = course.extracted_text or ""
+    index = ChunkIndex.build(text, getattr(settings, "AI_RETRIEVAL_CHUNK_TOKENS", 300))
+    entry, _ = CourseChunkIndex.objects.update_or_create(
+        text_hash=text_hash(text),
+        defaults={
+            "chunks": index.chunks,
+            "payload": index.to_bytes(),
+        },
+    )
+    _remember(entry.text_hash, index)
+    logger.info(f"Index du cours {course.pk}: {len(index.chunks)} sections, {len(index.vocabulary)} termes")
+    return index
+
+
+def get_course_index(course) -> ChunkIndex:
+    """Index à jour du cours, reconstruit si le texte a changé depuis sa création"""
+    from .models import CourseChunkIndex
+
+    digest = text_hash(course.extracted_text or "")
+    with _loaded_lock:
+        index = _loaded.get(digest)
+        if index is not None:
+            _loaded.move_to_end(digest)
+            return index
+
+    entry = CourseChunkIndex.objects.filter(text_hash=digest).first()
+    if entry is None:
+        return build_course_index(course)
+
+    index = ChunkIndex.from_bytes(bytes(entry.payload), entry.chunks)
+    _remember(digest, index)
+    return index
+
+
+def retrieve_context(course, question: str, top_k: Optional[int] = None) -> str:
+    """Extraits du cours à envoyer au LLM pour répondre à ``question``.
+
+    Les cours courts sont envoyés en entier. Sinon, les ``top_k`` sections
+    les mieux classées sont renvoyées dans l'ordre du cours, dans la limite
+    de ``AI_RETRIEVAL_MAX_CHARS`` caractères.
+    """
+    text = course.extracted_text or ""
+    max_chars = getattr(settings, "AI_RETRIEVAL_MAX_CHARS", 4000)
+    if len(text) <= max_chars:
+        return text
+
+    top_k = top_k or getattr(settings, "AI_RETRIEVAL_TOP_K", 5)
+    try:
+        index = get_course_index(course)
+    except Exception as e:
+        logger.warning(f"Index du cours {course.pk} indisponible: {e}")
+        return text[:max_chars]
+
+    # Aucun terme en commun: le début du cours sert de contexte général
+    chunk_ids = index.top_k(question, top_k) or list(range(min(top_k, len(index.chunks))))
+    selected: List[int] = []
+    size = 0
+    for chunk_id in chunk_ids:
+        length = len(index.chunks[chunk_id]) + 2
+        if selected and size + length > max_chars:
+            break
+        selected.append(chunk_id)
+        size += length
+    return "\n\n".join(index.chunks[i] for i in sorted(selected))[:max_chars]
+
+
+def _remember(key: str, index: ChunkIndex) -> None:
+    with _loaded_lock:
+        _loaded[key] = index
+        _loaded.move_to_end(key)
+        while len(_loaded) > _LOADED_MAX:
+            _loaded.popitem(last=False)
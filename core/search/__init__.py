@@ -0,0 +1,259 @@
+"""
+Recherche plein texte des cours
+
+Chaque cours a une ligne ``CourseSearchDocument`` (titre, descriptions,
+mots-clés, début du texte extrait), écrite par ``index_course`` depuis les
+signaux du cours (core/signals.py) et la tâche d'extraction.
+
+``search_courses`` interroge l'index de la base utilisée:
+
+- PostgreSQL: ``search_vector`` (tsvector généré) + index GIN (postgres.py);
+- SQLite: table virtuelle FTS5 synchronisée par triggers (sqlite.py);
+- autres bases, ou SQLite sans FTS5: filtres ``icontains`` sur la seule
+  table des documents de recherche.
+
+Avec ``SEARCH_BACKEND = 'inverted'``, la recherche passe par l'index inversé
+du processus (inverted.py), construit depuis ces mêmes documents par
+``rebuild_search_index`` et tenu à jour par le journal qu'écrivent
+``index_course`` et ``unindex_course``. Fichier et journal sont ceux de
+``SEARCH_INVERTED_PATH``, sur le disque de l'instance: les processus d'une
+même machine partagent l'index, chaque machine a le sien (à construire et à
+tenir à jour sur chacune, ou chemin sur un volume partagé).
+
+Les résultats sont classés, accompagnés d'un extrait où les termes trouvés
+sont entourés de ``<mark>`` (le reste du texte est échappé) et du nombre
+total de résultats, compté dans la même requête que la page.
+"""
+from __future__ import annotations
+
+import html
+import logging
+import re
+import uuid
+from dataclasses import dataclass, field
+from typing import Iterable, List
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+
+from . import inverted, postgres, sqlite
+
+logger = logging.getLogger(__name__)
+
+# Délimiteurs des termes trouvés dans les extraits (caractères à usage privé,
+# remplacés par <mark> après échappement HTML)
+_MARK = ('\ue000', '\ue001')
+_WORD_RE = re.compile(r'\w+')
+
+
+@dataclass
+class SearchHit:
+    course_id: uuid.UUID
+    rank: float
+    highlight: str
+
+
+@dataclass
+class SearchResults:
+    hits: List[SearchHit] = field(default_factory=list)
+    total: int = 0
+    backend: str = ''
+
+
+def _body_max_chars() -> int:
+    return getattr(settings, 'SEARCH_BODY_MAX_CHARS', 100_000)
+
+
+def _postgres_config() -> str:
+    return getattr(settings, 'SEARCH_POSTGRES_CONFIG', 'french')
+
+
+def _inverted_enabled() -> bool:
+    return getattr(settings, 'SEARCH_BACKEND', 'database') == 'inverted'
+
+
+_inverted_files = {}
+
+
+def inverted_index() -> inverted.IndexFile:
+    """Index inversé du processus pour ``SEARCH_INVERTED_PATH`` (réglage lu à chaque appel, un index par chemin)"""
+    path = str(settings.SEARCH_INVERTED_PATH)
+    index_file = _inverted_files.get(path)
+    if index_file is None:
+        index_file = _inverted_files.setdefault(path, inverted.IndexFile(path, _load_documents, _iter_documents))
+    return index_file
+
+
+def _indexed_documents():
+    from core.models import CourseSearchDocument
+
+    return CourseSearchDocument.objects.filter(course__status='published', course__is_public=True)
+
+
+def _document_fields(title, description, tags, body) -> dict:
+    return {'title': title, 'description': description, 'tags': tags, 'body': body}
+
+
+def _load_documents(course_ids) -> dict:
+    if not course_ids:
+        return {}
+    rows = _indexed_documents().filter(course_id__in=course_ids).values_list('course_id', 'title', 'description', 'tags', 'body')
+    return {course_id: _document_fields(*fields) for course_id, *fields in rows}
+
+
+def _iter_documents(batch_size: int = 500):
+    rows = _indexed_documents().order_by().values_list('course_id', 'title', 'description', 'tags', 'body')
+    for course_id, *fields in rows.iterator(chunk_size=batch_size):
+        yield course_id, _document_fields(*fields)
+
+
+# ----------------------------------------------------------------------
+# Indexation
+# ----------------------------------------------------------------------
+
+def search_row(course) -> dict:
+    """Colonnes du document de recherche d'un cours"""
+    return {
+        'title': course.title or '',
+        'description': ' '.join(part for part in (course.short_description, course.description) if part),
+        'tags': ' '.join(tag.name for tag in course.tags.all()),
+        'body': (course.extracted_text or '')[:_body_max_chars()],
+    }
+
+
+def index_course(course) -> None:
+    """Crée ou met à jour le document de recherche d'un cours (les erreurs sont journalisées)"""
+    from core.models import CourseSearchDocument
+
+    try:
+        CourseSearchDocument.objects.update_or_create(course_id=course.pk, defaults=search_row(course))
+        if _inverted_enabled():
+            inverted_index().record('u', course.pk)
+    except Exception as e:
+        logger.error(f"Indexation de recherche du cours {course.pk} impossible: {e}")
+
+
+def unindex_course(course_id) -> None:
+    """Retire un cours supprimé de l'index inversé (le document de recherche est supprimé en cascade)"""
+    if not _inverted_enabled():
+        return
+    try:
+        inverted_index().record('d', course_id)
+    except Exception as e:
+        logger.error(f"Retrait du cours {course_id} de l'index de recherche impossible: {e}")
+
+
+def index_courses(courses: Iterable, batch_size: int = 200) -> int:
+    """Indexe un queryset de cours, lu par lots (texte et mots-clés compris)"""
+    count = 0
+    for course in courses.with_content().prefetch_related('tags').iterator(chunk_size=batch_size):
+        index_course(course)
+        count += 1
+    return count
+
+
+def rebuild_index() -> str:
+    """Recrée l'index utilisé (inversé, ou propre à la base) à partir des documents de recherche"""
+    if _inverted_enabled():
+        count = inverted_index().build()
+        logger.info(f"Index inversé de recherche reconstruit: {count} cours")
+        return 'inverted'
+    if connection.vendor == 'postgresql':
+        postgres.rebuild(connection, _postgres_config())
+        return 'postgresql'
+    if connection.vendor == 'sqlite' and sqlite.fts5_available(connection):
+        sqlite.rebuild(connection)
+        return 'sqlite_fts5'
+    return 'icontains'
+
+
+# ----------------------------------------------------------------------
+# Recherche
+# ----------------------------------------------------------------------
+
+def _render_highlight(text: str) -> str:
+    escaped = html.escape(text or '')
+    return escaped.replace(_MARK[0], '<mark>').replace(_MARK[1], '</mark>')
+
+
+def _backend() -> str:
+    if _inverted_enabled() and inverted_index().exists():
+        return 'inverted'
+    if connection.vendor == 'postgresql':
+        return 'postgresql'
+    if connection.vendor == 'sqlite' and sqlite.is_installed(connection):
+        return 'sqlite_fts5'
+    return 'icontains'
+
+
+def search_courses(query: str, limit: int = 20, offset: int = 0) -> SearchResults:
+    """Cours publiés et publics correspondant à ``query``, du plus au moins pertinent"""
+    query = (query or '').strip()
+    if not query:
+        return SearchResults()
+
+    backend = _backend()
+    if backend == 'postgresql':
+        rows, total = postgres.search(connection, query, limit, offset, _MARK, _postgres_config())
+    elif backend == 'inverted':
+        rows, total = _search_inverted(query, limit, offset)
+    elif backend == 'sqlite_fts5':
+        rows, total = sqlite.search(connection, query, limit, offset, _MARK)
+    else:
+        rows, total = _search_icontains(query, limit, offset)
+
+    hits = [
+        SearchHit(
+            course_id=course_id if isinstance(course_id, uuid.UUID) else uuid.UUID(str(course_id)),
+            rank=round(rank, 6),
+            highlight=_render_highlight(highlight),
+        )
+        for course_id, rank, highlight in rows
+    ]
+    return SearchResults(hits=hits, total=total, backend=backend)
+
+
+def _search_inverted(query: str, limit: int, offset: int):
+    """Index inversé du processus; extraits tirés des documents de recherche de la page"""
+    from core.models import CourseSearchDocument
+
+    hits, total = inverted_index().search(query, limit, offset)
+    documents = CourseSearchDocument.objects.only('course_id', 'description', 'body').in_bulk(
+        [course_id for course_id, _ in hits], field_name='course_id'
+    )
+    words = _WORD_RE.findall(query)
+    rows = []
+    for course_id, score in hits:
+        document = documents.get(course_id)
+        rows.append((course_id, score, _excerpt(f"{document.description} {document.body}", words) if document else ''))
+    return rows, total
+
+
+def _search_icontains(query: str, limit: int, offset: int):
+    """Repli sans index plein texte: tous les mots dans l'une des colonnes, un extrait autour du premier"""
+    from core.models import CourseSearchDocument
+
+    words = _WORD_RE.findall(query)
+    if not words:
+        return [], 0
+    documents = CourseSearchDocument.objects.filter(course__status='published', course__is_public=True)
+    for word in words:
+        documents = documents.filter(
+            Q(title__icontains=word) | Q(description__icontains=word) | Q(tags__icontains=word) | Q(body__icontains=word)
+        )
+    total = documents.count()
+    rows = []
+    for document in documents.order_by('-course__rating', 'title')[offset:offset + limit]:
+        rows.append((document.course_id, 1.0, _excerpt(f"{document.description} {document.body}", words)))
+    return rows, total
+
+
+def _excerpt(text: str, words: List[str], radius: int = 80) -> str:
+    lowered = text.lower()
+    positions = [lowered.find(word.lower()) for word in words]
+    positions = [position for position in positions if position >= 0]
+    start = max(0, min(positions) - radius) if positions else 0
+    excerpt = text[start:start + 2 * radius]
+    pattern = re.compile('|'.join(re.escape(word) for word in words), re.IGNORECASE)
+    return pattern.sub(lambda match: f"{_MARK[0]}{match.group(0)}{_MARK[1]}", excerpt)
@@ -0,0 +1,555 @@
+"""
+Index inversé des cours, interrogé dans le processus (SEARCH_BACKEND='inverted')
+
+Pour les déploiements sans base plein texte, ou quand la recherche doit
+rester hors de la base. Chaque terme (minuscules, sans accents) a une liste de
+postings en tableaux d'entiers 32 bits: cours, poids (titre 5, description et
+mots-clés 2, texte 1), début des positions, positions. Les positions servent
+aux expressions entre guillemets; le classement est BM25 sur les poids.
+
+- ``IndexBuilder`` construit un segment et l'écrit en un seul fichier;
+- ``MappedSegment`` lit ce fichier par ``mmap``: rien n'est copié au
+  chargement, les tableaux sont des ``memoryview`` sur les pages du fichier,
+  partagées entre processus par le cache du système;
+- ``InvertedIndex`` ajoute au segment les cours modifiés depuis son écriture
+  (petit segment en mémoire) et masque leurs anciennes versions;
+- ``IndexFile`` relie l'index d'un processus au fichier et au journal des
+  modifications (``<fichier>.journal``, une ligne par cours modifié ou
+  supprimé), rejoué à la recherche suivante dans chaque processus.
+  ``build`` réécrit le segment et vide la partie du journal déjà prise en
+  compte (compactage).
+
+L'index est local: chaque processus a le sien en mémoire, et le fichier et
+son journal (SEARCH_INVERTED_PATH) sont ceux de l'instance. Les processus
+d'une même machine restent cohérents par le journal; plusieurs machines ont
+chacune leur index, à reconstruire sur chacune, sauf chemin sur un volume
+partagé.
+
+Ce module ne dépend pas de Django: les documents sont lus par les fonctions
+passées à ``IndexFile`` (voir core/search/__init__.py).
+"""
+from __future__ import annotations
+
+import bisect
+import contextlib
+import heapq
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+import unicodedata
+import uuid
+from array import array
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: ajouts au journal sans verrou (une ligne par write)
+    fcntl = None
+
+# Champs indexés et poids de leurs occurrences
+FIELD_WEIGHTS = (('title', 5), ('description', 2), ('tags', 2), ('body', 1))
+K1 = 1.2
+B = 0.75
+
+MAGIC = b'SEIX'
+VERSION = 1
+# magic, version, ordre des octets, -, cours, termes, longueur totale,
+# puis positions des sections: identifiants, longueurs, table des termes, termes, postings
+_HEADER = struct.Struct('<4sBBHIIQQQQQQ')
+_BYTEORDER = 0 if sys.byteorder == 'little' else 1
+# Par terme: début et fin dans les termes, début des postings (en entiers), nombre de cours, de positions
+_TERM_FIELDS = 5
+
+_TOKEN_RE = re.compile(r'\w+')
+_QUERY_RE = re.compile(r'"([^"]+)"|([^\s"]+)')
+_STRIP_MARKS = dict.fromkeys(range(0x300, 0x370))
+
+Fields = Dict[str, str]
+# Document analysé: longueur pondérée, {terme: [poids, position, position, ...]}
+Analyzed = Tuple[int, Dict[str, list]]
+
+
+def tokens(text: str) -> List[str]:
+    """Termes d'un texte: minuscules, accents retirés"""
+    return _TOKEN_RE.findall(unicodedata.normalize('NFKD', text).translate(_STRIP_MARKS).lower())
+
+
+def analyze(fields: Fields) -> Analyzed:
+    """Poids et positions de chaque terme d'un document; un champ n'en prolonge pas un autre dans une expression"""
+    terms: Dict[str, list] = {}
+    length = 0
+    position = 0
+    for name, weight in FIELD_WEIGHTS:
+        for token in tokens(fields.get(name) or ''):
+            entry = terms.get(token)
+            if entry is None:
+                terms[token] = [weight, position]
+            else:
+                entry[0] += weight
+                entry.append(position)
+            position += 1
+            length += weight
+        position += 1
+    return length, terms
+
+
+def parse_query(query: str) -> List[List[str]]:
+    """Groupes de termes, tous requis: un mot, ou une expression (entre guillemets ou composée, "écart-type")"""
+    groups = []
+    for phrase, word in _QUERY_RE.findall(query or ''):
+        terms = tokens(phrase or word)
+        if terms:
+            groups.append(terms)
+    return groups
+
+
+def _find(docs: Sequence[int], doc: int) -> int:
+    """Rang de ``doc`` dans des postings triés, -1 s'il n'y est pas"""
+    i = bisect.bisect_left(docs, doc)
+    return i if i < len(docs) and docs[i] == doc else -1
+
+
+def _phrase_match(position_lists: List[Sequence[int]]) -> bool:
+    """Vrai si les termes se suivent: positions du premier, décalées de k pour le k-ième (boucles en C)"""
+    starts = set(position_lists[0])
+    for k, positions in enumerate(position_lists[1:], 1):
+        starts.intersection_update(map((-k).__add__, positions))
+        if not starts:
+            return False
+    return True
+
+
+def _bm25(weight: int, length: int, idf: float, avg_length: float) -> float:
+    return idf * weight * (K1 + 1) / (weight + K1 * (1 - B + B * length / avg_length))
+
+
+# ----------------------------------------------------------------------
+# Segment sur disque
+# ----------------------------------------------------------------------
+
+class IndexBuilder:
+    """Segment en construction: postings en ``array('I')``, cours numérotés dans l'ordre d'ajout"""
+
+    def __init__(self):
+        self.keys: List[uuid.UUID] = []
+        self.lengths = array('I')
+        self.total_length = 0
+        # terme -> (cours, poids, débuts des positions, positions)
+        self._postings: Dict[str, Tuple[array, array, array, array]] = {}
+
+    @property
+    def doc_count(self) -> int:
+        return len(self.keys)
+
+    def add(self, key: uuid.UUID, fields: Fields) -> None:
+        self.add_analyzed(key, analyze(fields))
+
+    def add_analyzed(self, key: uuid.UUID, analyzed: Analyzed) -> None:
+        length, terms = analyzed
+        if not terms:
+            return
+        doc = len(self.keys)
+        self.keys.append(key)
+        self.lengths.append(length)
+        self.total_length += length
+        for term, entry in terms.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = (array('I'), array('I'), array('I'), array('I'))
+            docs, weights, starts, positions = postings
+            docs.append(doc)
+            weights.append(entry[0])
+            starts.append(len(positions))
+            positions.extend(entry[1:])
+
+    def write(self, path: str) -> None:
+        """Écrit le segment dans ``path`` (fichier temporaire puis remplacement atomique)"""
+        terms = sorted((term.encode('utf-8'), term) for term in self._postings)
+        table = array('Q')
+        blob_size = postings_size = 0
+        for encoded, term in terms:
+            docs, _, _, positions = self._postings[term]
+            table.extend((blob_size, blob_size + len(encoded), postings_size, len(docs), len(positions)))
+            blob_size += len(encoded)
+            postings_size += 3 * len(docs) + 1 + len(positions)
+
+        off_ids = _HEADER.size
+        off_lengths = _align(off_ids + 16 * self.doc_count)
+        off_table = _align(off_lengths + 4 * self.doc_count)
+        off_blob = off_table + 8 * len(table)
+        off_postings = _align(off_blob + blob_size)
+        header = _HEADER.pack(
+            MAGIC, VERSION, _BYTEORDER, 0, self.doc_count, len(terms), self.total_length,
+            off_ids, off_lengths, off_table, off_blob, off_postings,
+        )
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(header)
+            f.write(b''.join(key.bytes for key in self.keys))
+            _pad(f, off_lengths)
+            self.lengths.tofile(f)
+            _pad(f, off_table)
+            table.tofile(f)
+            f.write(b''.join(encoded for encoded, _ in terms))
+            _pad(f, off_postings)
+            for _, term in terms:
+                docs, weights, starts, positions = self._postings[term]
+                docs.tofile(f)
+                weights.tofile(f)
+                starts.tofile(f)
+                array('I', (len(positions),)).tofile(f)
+                positions.tofile(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def _pad(f, offset: int) -> None:
+    f.write(b'\0' * (offset - f.tell()))
+
+
+class Postings:
+    __slots__ = ('docs', 'weights', 'starts', 'positions')
+
+    def __init__(self, docs, weights, starts, positions):
+        self.docs, self.weights, self.starts, self.positions = docs, weights, starts, positions
+
+    def positions_at(self, i: int) -> Sequence[int]:
+        return self.positions[self.starts[i]:self.starts[i + 1]]
+
+
+class MappedSegment:
+    """Segment écrit par ``IndexBuilder``, lu par ``mmap`` sans copie"""
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = view = memoryview(self._mmap)
+        (magic, version, byteorder, _, self.doc_count, self.term_count, self.total_length,
+         off_ids, off_lengths, off_table, off_blob, off_postings) = _HEADER.unpack_from(view)
+        if magic != MAGIC or version != VERSION or byteorder != _BYTEORDER:
+            self.close()
+            raise ValueError(f"{path}: index de recherche d'un autre format, à reconstruire")
+        self._ids = view[off_ids:off_ids + 16 * self.doc_count]
+        self.lengths = view[off_lengths:off_lengths + 4 * self.doc_count].cast('I')
+        self._table = view[off_table:off_blob].cast('Q')
+        self._blob = view[off_blob:off_postings]
+        self._postings = view[off_postings:].cast('I')
+        self._key_index: Optional[Dict[uuid.UUID, int]] = None
+
+    def key(self, doc: int) -> uuid.UUID:
+        return uuid.UUID(bytes=self._ids[16 * doc:16 * doc + 16].tobytes())
+
+    def key_index(self) -> Dict[uuid.UUID, int]:
+        """Rang de chaque cours (construit à la première modification, pas au chargement)"""
+        if self._key_index is None:
+            ids = self._ids.tobytes()
+            self._key_index = {uuid.UUID(bytes=ids[i:i + 16]): i // 16 for i in range(0, len(ids), 16)}
+        return self._key_index
+
+    def postings(self, term: str) -> Optional[Postings]:
+        """Recherche dichotomique du terme dans la table triée"""
+        encoded = term.encode('utf-8')
+        table, blob = self._table, self._blob
+        lo, hi = 0, self.term_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            base = mid * _TERM_FIELDS
+            current = blob[table[base]:table[base + 1]].tobytes()
+            if current < encoded:
+                lo = mid + 1
+            elif current > encoded:
+                hi = mid
+            else:
+                offset, df, count = table[base + 2], table[base + 3], table[base + 4]
+                p = self._postings
+                return Postings(
+                    p[offset:offset + df],
+                    p[offset + df:offset + 2 * df],
+                    p[offset + 2 * df:offset + 3 * df + 1],
+                    p[offset + 3 * df + 1:offset + 3 * df + 1 + count],
+                )
+        return None
+
+    def close(self) -> None:
+        for name in ('_ids', 'lengths', '_table', '_blob', '_postings', '_view'):
+            view = self.__dict__.pop(name, None)
+            if view is not None:
+                view.release()
+        try:
+            self._mmap.close()
+        except BufferError:
+            # Des postings sont encore référencés (recherche en cours): libérés par le ramasse-miettes
+            pass
+
+
+# ----------------------------------------------------------------------
+# Index interrogeable: segment + modifications récentes
+# ----------------------------------------------------------------------
+
+class InvertedIndex:
+    """Segment projeté en mémoire, plus les cours modifiés depuis son écriture"""
+
+    def __init__(self, base: Optional[MappedSegment] = None):
+        self.base = base
+        self._deleted: Set[int] = set()
+        self._deleted_length = 0
+        self._delta: Dict[uuid.UUID, Analyzed] = {}
+        self._delta_terms: Dict[str, Set[uuid.UUID]] = {}
+        self._delta_length = 0
+
+    @property
+    def doc_count(self) -> int:
+        base = self.base.doc_count - len(self._deleted) if self.base else 0
+        return base + len(self._delta)
+
+    @property
+    def total_length(self) -> int:
+        base = self.base.total_length - self._deleted_length if self.base else 0
+        return base + self._delta_length
+
+    def upsert(self, key: uuid.UUID, fields: Fields) -> None:
+        self.remove(key)
+        length, terms = analyzed = analyze(fields)
+        if not terms:
+            return
+        self._delta[key] = analyzed
+        self._delta_length += length
+        for term in terms:
+            self._delta_terms.setdefault(term, set()).add(key)
+
+    def remove(self, key: uuid.UUID) -> None:
+        previous = self._delta.pop(key, None)
+        if previous is not None:
+            self._delta_length -= previous[0]
+            for term in previous[1]:
+                docs = self._delta_terms[term]
+                docs.discard(key)
+                if not docs:
+                    del self._delta_terms[term]
+        if self.base is not None:
+            doc = self.base.key_index().get(key)
+            if doc is not None and doc not in self._deleted:
+                self._deleted.add(doc)
+                self._deleted_length += self.base.lengths[doc]
+
+    def close(self) -> None:
+        if self.base is not None:
+            self.base.close()
+            self.base = None
+
+    def search(self, query: str, limit: int = 20, offset: int = 0) -> Tuple[List[Tuple[uuid.UUID, float]], int]:
+        """``([(cours, score), ...], total)``: cours contenant tous les mots et expressions, BM25 décroissant"""
+        groups = parse_query(query)
+        count = self.doc_count
+        if not groups or not count:
+            return [], 0
+        terms = sorted({term for group in groups for term in group})
+        phrases = [group for group in groups if len(group) > 1]
+        avg_length = self.total_length / count
+
+        base_postings = {}
+        if self.base is not None:
+            for term in terms:
+                postings = self.base.postings(term)
+                if postings is None:
+                    base_postings = {}
+                    break
+                base_postings[term] = postings
+
+        idf = {}
+        for term in terms:
+            df = len(self._delta_terms.get(term, ()))
+            postings = base_postings.get(term) or (self.base and self.base.postings(term))
+            if postings:
+                df += len(postings.docs) - sum(1 for doc in self._deleted if _find(postings.docs, doc) >= 0)
+            idf[term] = math.log(1 + (count - df + 0.5) / (df + 0.5))
+
+        # Cours du segment gardés par rang: les identifiants ne sont créés que pour la page
+        base_matches = self._match_base(base_postings, terms, phrases, idf, avg_length) if base_postings else []
+        delta_matches = self._match_delta(terms, phrases, idf, avg_length)
+        best = [(score, self.base.key(doc)) for score, doc in heapq.nlargest(offset + limit, base_matches)]
+        best.extend(heapq.nlargest(offset + limit, delta_matches))
+        best.sort(key=lambda match: match[0], reverse=True)
+        return [(key, score) for score, key in best[offset:offset + limit]], len(base_matches) + len(delta_matches)
+
+    def _match_base(self, postings, terms, phrases, idf, avg_length):
+        lengths, deleted = self.base.lengths, self._deleted
+        rarest = min(terms, key=lambda term: len(postings[term].docs))
+        others = [(term, postings[term].docs) for term in terms if term != rarest]
+        lists = [postings[term] for term in terms]
+        factors = [idf[term] * (K1 + 1) for term in terms]
+        norm = K1 * B / avg_length
+        base_norm = K1 * (1 - B)
+        matches = []
+        for i, doc in enumerate(postings[rarest].docs):
+            if deleted and doc in deleted:
+                continue
+            ranks = {rarest: i}
+            for term, docs in others:
+                j = _find(docs, doc)
+                if j < 0:
+                    break
+                ranks[term] = j
+            else:
+                if phrases and not all(
+                    _phrase_match([postings[t].positions_at(ranks[t]) for t in phrase]) for phrase in phrases
+                ):
+                    continue
+                doc_norm = base_norm + norm * lengths[doc]
+                score = 0.0
+                for term, term_postings, factor in zip(terms, lists, factors):
+                    weight = term_postings.weights[ranks[term]]
+                    score += factor * weight / (weight + doc_norm)
+                matches.append((score, doc))
+        return matches
+
+    def _match_delta(self, terms, phrases, idf, avg_length):
+        candidates = [self._delta_terms.get(term) for term in terms]
+        if not all(candidates):
+            return []
+        matches = []
+        for key in set.intersection(*candidates):
+            length, doc_terms = self._delta[key]
+            if all(_phrase_match([doc_terms[t][1:] for t in phrase]) for phrase in phrases):
+                score = sum(_bm25(doc_terms[term][0], length, idf[term], avg_length) for term in terms)
+                matches.append((score, key))
+        return matches
+
+
+# ----------------------------------------------------------------------
+# Fichier partagé entre processus
+# ----------------------------------------------------------------------
+
+@contextlib.contextmanager
+def _file_lock(path: str):
+    if fcntl is None:
+        yield
+        return
+    with open(path, 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _signature(path: str):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+class IndexFile:
+    """
+    Index d'un processus, tenu à jour depuis le fichier et son journal
+
+    ``load_documents(ids)`` renvoie ``{cours: champs}`` des cours à indexer
+    parmi ``ids`` (les autres sont retirés); ``iter_documents()`` parcourt
+    tous les cours à indexer, en ``(cours, champs)``.
+    """
+
+    def __init__(self, path: str, load_documents: Callable[[List[uuid.UUID]], Dict[uuid.UUID, Fields]],
+                 iter_documents: Callable[[], Iterable[Tuple[uuid.UUID, Fields]]]):
+        self.path = path
+        self.journal_path = f"{path}.journal"
+        self.lock_path = f"{path}.lock"
+        self._load_documents = load_documents
+        self._iter_documents = iter_documents
+        self._lock = threading.Lock()
+        self._index: Optional[InvertedIndex] = None
+        self._signature = None
+        self._journal_inode = None
+        self._journal_offset = 0
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def record(self, op: str, key: uuid.UUID) -> None:
+        """Note une modification (``u`` cours enregistré, ``d`` supprimé) pour tous les processus"""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with _file_lock(self.lock_path), open(self.journal_path, 'a', encoding='ascii') as journal:
+            journal.write(f"{op} {key}\n")
+
+    def search(self, query: str, limit: int = 20, offset: int = 0) -> Tuple[List[Tuple[uuid.UUID, float]], int]:
+        with self._lock:
+            self._refresh()
+            if self._index is None:
+                return [], 0
+            return self._index.search(query, limit, offset)
+
+    def build(self) -> int:
+        """Réécrit le segment depuis les documents et ne garde du journal que les lignes arrivées pendant la construction"""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with _file_lock(self.lock_path):
+            journal_start = os.path.getsize(self.journal_path) if os.path.exists(self.journal_path) else 0
+
+        builder = IndexBuilder()
+        for key, fields in self._iter_documents():
+            builder.add(key, fields)
+
+        tmp_journal = f"{self.journal_path}.tmp"
+        with _file_lock(self.lock_path):
+            builder.write(self.path)
+            tail = b''
+            if os.path.exists(self.journal_path):
+                with open(self.journal_path, 'rb') as journal:
+                    journal.seek(journal_start)
+                    tail = journal.read()
+            with open(tmp_journal, 'wb') as journal:
+                journal.write(tail)
+            os.replace(tmp_journal, self.journal_path)
+        return builder.doc_count
+
+    def _refresh(self) -> None:
+        """Recharge le segment s'il a été réécrit, puis rejoue la fin du journal"""
+        signature = _signature(self.path)
+        if signature != self._signature:
+            if self._index is not None:
+                self._index.close()
+            self._index = InvertedIndex(MappedSegment(self.path)) if signature else None
+            self._signature = signature
+            self._journal_inode = None
+        if self._index is None:
+            return
+
+        try:
+            journal = open(self.journal_path, 'rb')
+        except FileNotFoundError:
+            return
+        with journal:
+            inode = os.fstat(journal.fileno()).st_ino
+            if inode != self._journal_inode:
+                # Journal remplacé par un compactage: relu depuis le début (rejouer une ligne est sans effet)
+                self._journal_inode, self._journal_offset = inode, 0
+            journal.seek(self._journal_offset)
+            data = journal.read()
+        end = data.rfind(b'\n') + 1
+        if not end:
+            return
+        self._journal_offset += end
+
+        changes: Dict[uuid.UUID, str] = {}
+        for line in data[:end].decode('ascii').splitlines():
+            op, _, key = line.partition(' ')
+            try:
+                changes[uuid.UUID(key)] = op
+            except ValueError:
+                continue
+        documents = self._load_documents([key for key, op in changes.items() if op == 'u'])
+        for key in changes:
+            if key in documents:
+                self._index.upsert(key, documents[key])
+            else:
+                self._index.remove(key)
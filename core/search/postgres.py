@@ -0,0 +1,71 @@
+"""
+Recherche plein texte PostgreSQL: colonne tsvector générée + index GIN
+
+``search_vector`` est calculée par PostgreSQL à chaque écriture de
+``core_coursesearchdocument`` (titre A, description et mots-clés B, texte C)
+et indexée en GIN. Requêtes au format ``websearch_to_tsquery`` (guillemets,
+OR, -exclusion), classement ``ts_rank_cd``, extraits ``ts_headline`` calculés
+sur la seule page renvoyée; le total est compté dans la même requête.
+"""
+from __future__ import annotations
+
+from typing import List, Tuple
+
+DOCUMENT_TABLE = 'core_coursesearchdocument'
+INDEX_NAME = 'core_course_search_vector_gin'
+
+
+def install_statements(config: str) -> List[str]:
+    vector = ' || '.join(
+        f"setweight(to_tsvector('{config}'::regconfig, coalesce({column}, '')), '{weight}')"
+        for column, weight in (('title', 'A'), ('description', 'B'), ('tags', 'B'), ('body', 'C'))
+    )
+    return [
+        f"ALTER TABLE {DOCUMENT_TABLE} ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        f"GENERATED ALWAYS AS ({vector}) STORED",
+        f"CREATE INDEX IF NOT EXISTS {INDEX_NAME} ON {DOCUMENT_TABLE} USING GIN (search_vector)",
+    ]
+
+
+def uninstall_statements() -> List[str]:
+    return [
+        f"DROP INDEX IF EXISTS {INDEX_NAME}",
+        f"ALTER TABLE {DOCUMENT_TABLE} DROP COLUMN IF EXISTS search_vector",
+    ]
+
+
+def install(connection, config: str) -> None:
+    with connection.cursor() as cursor:
+        for statement in install_statements(config):
+            cursor.execute(statement)
+
+
+def rebuild(connection, config: str) -> None:
+    """Recrée la colonne générée (changement de configuration linguistique) et son index"""
+    with connection.cursor() as cursor:
+        for statement in uninstall_statements():
+            cursor.execute(statement)
+    install(connection, config)
+
+
+def search(connection, query: str, limit: int, offset: int, mark: Tuple[str, str], config: str) -> Tuple[List[Tuple[str, float, str]], int]:
+    """``([(course_id, score, extrait), ...], total)`` des cours publiés et publics"""
+    options = f"StartSel={mark[0]}, StopSel={mark[1]}, MaxFragments=2, MaxWords=20, MinWords=5, FragmentDelimiter=…"
+    sql = (
+        "SELECT page.course_id, page.rank, "
+        "ts_headline(%s::regconfig, page.description || ' ' || page.body, page.query, %s), page.total "
+        "FROM ("
+        "  SELECT s.course_id, s.description, s.body, q.query, "
+        "         ts_rank_cd(s.search_vector, q.query) AS rank, count(*) OVER () AS total "
+        f"  FROM {DOCUMENT_TABLE} s "
+        "  JOIN core_course c ON c.id = s.course_id "
+        "  CROSS JOIN websearch_to_tsquery(%s::regconfig, %s) AS q(query) "
+        "  WHERE s.search_vector @@ q.query AND c.status = 'published' AND c.is_public "
+        "  ORDER BY rank DESC LIMIT %s OFFSET %s"
+        ") AS page ORDER BY page.rank DESC"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [config, options, config, query, limit, offset])
+        rows = cursor.fetchall()
+    total = rows[0][3] if rows else 0
+    return [(course_id, float(rank), highlight) for course_id, rank, highlight, _ in rows], total
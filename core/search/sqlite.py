@@ -0,0 +1,129 @@
+"""
+Recherche plein texte SQLite: table virtuelle FTS5
+
+``core_course_fts`` indexe les colonnes de ``core_coursesearchdocument``
+(contenu externe: le texte n'est pas dupliqué) et reste synchronisée par des
+triggers. Le rowid FTS est la clé entière ``id`` des documents (alias
+stable du rowid SQLite, conservé par VACUUM). Classement BM25 (titre >
+description, mots-clés > texte) et extraits par ``snippet()``; le total est
+compté dans la même requête.
+"""
+from __future__ import annotations
+
+import re
+from typing import List, Optional, Tuple
+
+FTS_TABLE = 'core_course_fts'
+DOCUMENT_TABLE = 'core_coursesearchdocument'
+COLUMNS = ('title', 'description', 'tags', 'body')
+# Colonne entière des documents servant de rowid FTS
+ROWID_COLUMN = 'id'
+# Poids BM25 par colonne, dans l'ordre de COLUMNS
+WEIGHTS = (10.0, 4.0, 4.0, 1.0)
+
+_PHRASE_RE = re.compile(r'"([^"]+)"|(\w+)')
+
+
+def _columns(prefix: str = '') -> str:
+    return ', '.join(f"{prefix}{column}" for column in COLUMNS)
+
+
+def install_statements() -> List[str]:
+    """Table FTS5 et triggers de synchronisation (idempotent)"""
+    rowid = ROWID_COLUMN
+    statements = [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+        f"{_columns()}, content='{DOCUMENT_TABLE}', content_rowid='{rowid}', "
+        f"tokenize='unicode61 remove_diacritics 2')",
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {DOCUMENT_TABLE} BEGIN "
+        f"INSERT INTO {FTS_TABLE}(rowid, {_columns()}) VALUES (new.{rowid}, {_columns('new.')}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {DOCUMENT_TABLE} BEGIN "
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_columns()}) VALUES ('delete', old.{rowid}, {_columns('old.')}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE ON {DOCUMENT_TABLE} BEGIN "
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_columns()}) VALUES ('delete', old.{rowid}, {_columns('old.')}); "
+        f"INSERT INTO {FTS_TABLE}(rowid, {_columns()}) VALUES (new.{rowid}, {_columns('new.')}); END",
+    ]
+    return statements
+
+
+def uninstall_statements() -> List[str]:
+    return [f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}" for suffix in ('ai', 'ad', 'au')] + [
+        f"DROP TABLE IF EXISTS {FTS_TABLE}"
+    ]
+
+
+def fts5_available(connection) -> bool:
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        if cursor.fetchone()[0]:
+            return True
+        # Certaines compilations chargent FTS5 sans l'option: on essaie
+        try:
+            cursor.execute("CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(x)")
+            cursor.execute("DROP TABLE temp.fts5_probe")
+            return True
+        except Exception:
+            return False
+
+
+def is_installed(connection) -> bool:
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+        return cursor.fetchone() is not None
+
+
+def install(connection) -> None:
+    with connection.cursor() as cursor:
+        for statement in install_statements():
+            cursor.execute(statement)
+
+
+def rebuild(connection) -> None:
+    """Recrée table et triggers, puis réindexe tout le contenu de la table des documents"""
+    with connection.cursor() as cursor:
+        for statement in uninstall_statements():
+            cursor.execute(statement)
+    install(connection)
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def match_expression(query: str) -> str:
+    """Requête FTS5 sûre: expressions entre guillemets conservées, mots entre guillemets (ET implicite)"""
+    terms = []
+    for phrase, word in _PHRASE_RE.findall(query):
+        term = phrase or word
+        terms.append('"' + term.replace('"', '""') + '"')
+    return ' '.join(terms)
+
+
+def search(connection, query: str, limit: int, offset: int, mark: Tuple[str, str]) -> Tuple[List[Tuple[str, float, str]], int]:
+    """``([(course_id, score, extrait), ...], total)`` des cours publiés et publics"""
+    expression = match_expression(query)
+    if not expression:
+        return [], 0
+    # bm25() n'est pas utilisable à côté d'une fonction de fenêtre: le score est
+    # calculé dans ``matches``, la page et le total dans ``page``, et snippet()
+    # seulement pour les lignes de la page
+    sql = (
+        f"WITH matches AS ("
+        f"  SELECT rowid, bm25({FTS_TABLE}, {', '.join(map(str, WEIGHTS))}) AS rank "
+        f"  FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s"
+        f"), page AS ("
+        f"  SELECT m.rowid, m.rank, s.course_id, count(*) OVER () AS total "
+        f"  FROM matches m "
+        f"  JOIN {DOCUMENT_TABLE} s ON s.{ROWID_COLUMN} = m.rowid "
+        f"  JOIN core_course c ON c.id = s.course_id "
+        f"  WHERE c.status = 'published' AND c.is_public "
+        f"  ORDER BY m.rank LIMIT %s OFFSET %s"
+        f") "
+        f"SELECT page.course_id, page.rank, snippet({FTS_TABLE}, -1, %s, %s, '…', 16), page.total "
+        f"FROM page JOIN {FTS_TABLE} ON {FTS_TABLE}.rowid = page.rowid "
+        f"WHERE {FTS_TABLE} MATCH %s ORDER BY page.rank"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [expression, limit, offset, mark[0], mark[1], expression])
+        rows = cursor.fetchall()
+    total: Optional[int] = rows[0][3] if rows else 0
+    # bm25() est négatif (plus petit = plus pertinent)
+    return [(course_id, -rank, highlight) for course_id, rank, highlight, _ in rows], total
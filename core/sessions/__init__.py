@@ -0,0 +1,72 @@
+"""
+Moteur de sessions du projet (SESSION_ENGINE = 'core.sessions')
+
+Sessions ``cached_db`` (cache SESSION_CACHE_ALIAS + table des sessions) avec:
+
+- décodage unique: la session est décodée une seule fois, à la lecture en
+  base après un défaut de cache; une session indécodable (signature
+  invalide, ancien format) est supprimée du cache et de la base, et la
+  requête continue avec une session vide, remplacée par une nouvelle à
+  l'écriture (et le cookie est supprimé si rien n'y est enregistré);
+- écritures regroupées: avec SESSION_SAVE_EVERY_REQUEST, une session non
+  modifiée n'est réécrite (expiration glissante) qu'une fois par
+  SESSION_SAVE_INTERVAL secondes; toute modification est écrite aussitôt.
+  L'expiration en base peut donc précéder celle du cookie d'au plus cet
+  intervalle.
+
+Le cache doit être partagé entre les processus (Redis, Memcached) pour
+qu'une déconnexion soit vue de tous: les réglages ne choisissent ce moteur
+que si le cache de SESSION_CACHE_ALIAS est partagé (SESSION_CACHE_SHARED,
+REDIS_CACHE_URL), sinon ``core.sessions.db`` (base seulement, mêmes
+garanties).
+"""
+import time
+
+from django.conf import settings
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+from django.contrib.sessions.backends.db import SessionStore as DBStore
+
+from .db import decode_or_discard
+
+KEY_PREFIX = 'core.sessions'
+
+
+class SessionStore(CachedDBStore):
+    # Préfixe propre: les entrées du cache contiennent aussi la date de dernière écriture
+    cache_key_prefix = KEY_PREFIX
+
+    def __init__(self, session_key=None):
+        super().__init__(session_key)
+        self._saved_at = None
+
+    def load(self):
+        try:
+            cached = self._cache.get(self.cache_key)
+        except Exception:
+            # Clé refusée par le cache (memcache): session relue en base
+            cached = None
+        if cached is not None:
+            self._saved_at = cached['saved_at']
+            return cached['data']
+
+        s = self._get_session_from_db()
+        if s is None:
+            return {}
+        data = decode_or_discard(self, s)
+        if data is None:
+            return {}
+        self._cache_set(data, None, self.get_expiry_age(expiry=s.expire_date))
+        return data
+
+    def save(self, must_create=False):
+        if self.session_key is None:
+            return self.create()
+        interval = getattr(settings, 'SESSION_SAVE_INTERVAL', 60)
+        if not must_create and not self.modified and self._saved_at is not None and time.time() - self._saved_at < interval:
+            return
+        DBStore.save(self, must_create=must_create)
+        self._saved_at = time.time()
+        self._cache_set(self._session, self._saved_at, self.get_expiry_age())
+
+    def _cache_set(self, data, saved_at, timeout):
+        self._cache.set(self.cache_key, {'data': data, 'saved_at': saved_at}, timeout)
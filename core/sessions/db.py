@@ -0,0 +1,60 @@
+"""
+Sessions en base seulement (SESSION_ENGINE = 'core.sessions.db')
+
+Choisi par les réglages quand aucun cache partagé n'est configuré (cache
+mémoire propre à chaque processus). Mêmes garanties que ``core.sessions``,
+sans cache:
+
+- décodage unique: une session indécodable est supprimée de la base et la
+  requête continue avec une session vide;
+- écritures regroupées: une session non modifiée n'est réécrite qu'une fois
+  par SESSION_SAVE_INTERVAL secondes. L'intervalle est déduit de la date
+  d'expiration lue en base: tant qu'elle dépasse maintenant +
+  SESSION_COOKIE_AGE − SESSION_SAVE_INTERVAL, l'écriture est inutile.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.sessions.backends.db import SessionStore as DBStore
+from django.core import signing
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+def decode_or_discard(store, s):
+    """Données de la ligne de session ``s``; ``None`` si elle est indécodable (elle est alors supprimée)"""
+    try:
+        return signing.loads(s.session_data, salt=store.key_salt, serializer=store.serializer)
+    except Exception as e:
+        logger.warning(f"Session corrompue {s.session_key} supprimée: {e.__class__.__name__}")
+        store.delete(s.session_key)
+        store._session_key = None
+        return None
+
+
+class SessionStore(DBStore):
+    def __init__(self, session_key=None):
+        super().__init__(session_key)
+        self._stored_expiry = None
+
+    def load(self):
+        s = self._get_session_from_db()
+        if s is None:
+            return {}
+        data = decode_or_discard(self, s)
+        if data is None:
+            return {}
+        self._stored_expiry = s.expire_date
+        return data
+
+    def save(self, must_create=False):
+        if self.session_key is None:
+            return self.create()
+        if not must_create and not self.modified and self._stored_expiry is not None:
+            interval = getattr(settings, 'SESSION_SAVE_INTERVAL', 60)
+            if self._stored_expiry > timezone.now() + timedelta(seconds=self.get_expiry_age() - interval):
+                return
+        super().save(must_create=must_create)
+        self._stored_expiry = self.get_expiry_date()
@@ -3,6 +3,12 @@ from __future__ import annotations
 from django.contrib.auth.signals import user_logged_in
 from django.dispatch import receiver
 from django.contrib.sessions.models import Session
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+from .models import Course, Question, Quiz, QuizAttempt
+from .quiz_payload import invalidate_quiz_payload
+from .search import index_course, unindex_course
 
 
 @receiver(user_logged_in)
@@ -23,19 +29,78 @@ def enforce_single_session(sender, request, user, **kwargs):
 
     # Iterate over all sessions and remove other sessions for this user
     # Also delete corrupted sessions (can't be decoded)
+    # Deletion goes through the session store so cached copies are dropped too
+    store = request.session.__class__()
     for session in Session.objects.all():
         try:
             data = session.get_decoded()
             # If session is for this user and not the current one, delete it
-            if data.get("_auth_user_id") == str(user.id) and session.session_key != current_key:
-                try:
-                    session.delete()
-                except Exception:
-                    # Never block login because of a deletion error
-                    pass
+            delete = data.get("_auth_user_id") == str(user.id) and session.session_key != current_key
         except Exception:
             # Session is corrupted (can't decode), delete it
+            delete = True
+        if delete:
             try:
-                session.delete()
+                store.delete(session.session_key)
             except Exception:
+                # Never block login because of a deletion error
                 pass
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def invalidate_quiz_payload_on_question_change(sender, instance, **kwargs):
+    """Recompile les données de jeu du quiz quand une de ses questions change
+
+    (un enregistrement du quiz lui-même change déjà ``updated_at`` ou
+    ``shuffle_questions``, qui font partie de la clé du cache)
+    """
+    invalidate_quiz_payload(instance.quiz_id)
+
+
+@receiver(post_save, sender=Question)
+def regrade_attempts_on_question_edit(sender, instance, created, **kwargs):
+    """Recorrige les tentatives déjà enregistrées quand une question existante est modifiée"""
+    if created:
+        return
+    from .tasks import enqueue_quiz_regrade
+
+    quiz_id = instance.quiz_id
+    if QuizAttempt.objects.filter(quiz_id=quiz_id).exclude(shuffle_seed=None).exists():
+        transaction.on_commit(lambda: enqueue_quiz_regrade(quiz_id))
+
+
+@receiver(post_delete, sender=QuizAttempt)
+def remove_attempt_from_quiz_statistics(sender, instance, **kwargs):
+    """Retire des statistiques du quiz une tentative terminée supprimée"""
+    state = instance._current_stats_state()
+    if state and state[0]:
+        Quiz.add_attempt_stats(instance.quiz_id, -1, -state[1], -int(state[2]))
+
+
+# Champs du cours repris dans son document de recherche (le texte extrait est
+# enregistré avec ses métriques, voir Course.TEXT_STATS_FIELDS) ou qui le
+# font entrer ou sortir de l'index inversé
+SEARCH_INDEXED_FIELDS = frozenset((
+    'title', 'short_description', 'description', 'status', 'is_public', *Course.TEXT_STATS_FIELDS,
+))
+
+
+@receiver(post_save, sender=Course)
+def index_course_on_save(sender, instance, update_fields=None, raw=False, **kwargs):
+    """Met à jour le document de recherche du cours après la transaction"""
+    if raw or (update_fields is not None and not SEARCH_INDEXED_FIELDS & set(update_fields)):
+        return
+    transaction.on_commit(lambda: index_course(instance))
+
+
+@receiver(m2m_changed, sender=Course.tags.through)
+def index_course_on_tags_change(sender, instance, action, reverse, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear') and not reverse:
+        transaction.on_commit(lambda: index_course(instance))
+
+
+@receiver(post_delete, sender=Course)
+def unindex_course_on_delete(sender, instance, **kwargs):
+    course_id = instance.pk
+    transaction.on_commit(lambda: unindex_course(course_id))
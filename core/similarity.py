@@ -0,0 +1,158 @@
+"""
+Similarité textuelle locale (CPU, sans réseau)
+
+- ``extract_key_concepts``: termes (mots et bigrammes) les mieux classés
+  par TF-IDF sur les sections du cours, calcul vectorisé NumPy.
+- ``evaluate_quiz_answer`` / ``evaluate_quiz_answers``: correction des
+  réponses libres (``fill_blank``) par similarité cosinus de vecteurs de
+  trigrammes de caractères (hachés sur ``VECTOR_DIM`` dimensions). Les
+  vecteurs des réponses attendues, qui reviennent d'une tentative à
+  l'autre, sont gardés en cache.
+"""
+from __future__ import annotations
+
+import unicodedata
+import zlib
+from functools import lru_cache
+from typing import Dict, Iterable, List, Sequence, Tuple, Union
+
+import numpy as np
+from django.conf import settings
+
+from .chunking import split_into_chunks
+from .retrieval import tokenize
+
+VECTOR_DIM = 2048
+NGRAM = 3
+
+
+# ----------------------------------------------------------------------
+# Concepts clés (TF-IDF)
+# ----------------------------------------------------------------------
+
+def _chunk_terms(chunk: str) -> List[str]:
+    """Mots normalisés (sans mots vides) et bigrammes de mots consécutifs"""
+    words = [word for word in tokenize(chunk) if not word.isdigit()]
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def extract_key_concepts(text: Union[str, Sequence[str]], top_n: int = 15) -> List[Dict[str, object]]:
+    """Concepts clés d'un cours: ``[{'concept': terme, 'score': score}, ...]``.
+
+    ``text`` est le texte du cours ou la liste de ses sections. Le score
+    d'un terme est la somme, sur les sections, de sa fréquence relative
+    multipliée par son IDF: un terme fréquent dans quelques sections
+    l'emporte sur un terme présent partout.
+    """
+    chunks = split_into_chunks(text, getattr(settings, "AI_RETRIEVAL_CHUNK_TOKENS", 300)) if isinstance(text, str) else list(text)
+    vocabulary: Dict[str, int] = {}
+    term_ids: List[int] = []
+    chunk_ids: List[int] = []
+    for chunk_id, chunk in enumerate(chunks):
+        for term in _chunk_terms(chunk):
+            term_ids.append(vocabulary.setdefault(term, len(vocabulary)))
+            chunk_ids.append(chunk_id)
+    if not term_ids:
+        return []
+
+    terms = np.asarray(term_ids, dtype=np.int64)
+    docs = np.asarray(chunk_ids, dtype=np.int64)
+    num_terms, num_chunks = len(vocabulary), len(chunks)
+
+    # Occurrences (section, terme) agrégées sans matrice dense
+    pairs, counts = np.unique(docs * num_terms + terms, return_counts=True)
+    pair_docs, pair_terms = pairs // num_terms, pairs % num_terms
+    chunk_lengths = np.bincount(docs, minlength=num_chunks).astype(np.float64)
+
+    df = np.bincount(pair_terms, minlength=num_terms).astype(np.float64)
+    idf = np.log((1 + num_chunks) / (1 + df)) + 1.0
+    tf = counts / chunk_lengths[pair_docs]
+    scores = np.bincount(pair_terms, weights=tf * idf[pair_terms], minlength=num_terms)
+
+    # Un mot isolé n'est pas un concept s'il n'apparaît qu'une fois
+    frequency = np.bincount(terms, minlength=num_terms)
+    scores[frequency < 2] = 0.0
+
+    top_n = min(top_n, int(np.count_nonzero(scores)))
+    if top_n <= 0:
+        return []
+    best = np.argpartition(-scores, top_n - 1)[:top_n]
+    best = best[np.argsort(-scores[best], kind="stable")]
+    names = list(vocabulary)
+    return [{"concept": names[i], "score": round(float(scores[i]), 4)} for i in best]
+
+
+# ----------------------------------------------------------------------
+# Correction des réponses libres
+# ----------------------------------------------------------------------
+
+def normalize_answer(text: str) -> str:
+    """Minuscules, sans accents ni ponctuation, espaces normalisés"""
+    normalized = unicodedata.normalize("NFKD", str(text or "").lower())
+    normalized = "".join(c if c.isalnum() else " " for c in normalized if not unicodedata.combining(c))
+    return " ".join(normalized.split())
+
+
+def _ngram_vector(normalized: str) -> np.ndarray:
+    vector = np.zeros(VECTOR_DIM, dtype=np.float32)
+    padded = f" {normalized} "
+    if len(padded) < NGRAM:
+        return vector
+    grams = [padded[i:i + NGRAM] for i in range(len(padded) - NGRAM + 1)]
+    buckets = np.fromiter((zlib.crc32(g.encode("utf-8")) % VECTOR_DIM for g in grams), dtype=np.int64, count=len(grams))
+    np.add.at(vector, buckets, 1.0)
+    norm = np.linalg.norm(vector)
+    if norm:
+        vector /= norm
+    return vector
+
+
+@lru_cache(maxsize=4096)
+def _cached_vector(normalized: str) -> np.ndarray:
+    vector = _ngram_vector(normalized)
+    vector.setflags(write=False)
+    return vector
+
+
+def _threshold() -> float:
+    return getattr(settings, "AI_ANSWER_SIMILARITY_THRESHOLD", 0.8)
+
+
+def _evaluation(score: float, method: str, threshold: float) -> Dict[str, object]:
+    # Confiance: distance au seuil, rapportée à l'écart maximal possible de ce côté
+    span = (1.0 - threshold) if score >= threshold else threshold
+    return {
+        "is_correct": score >= threshold,
+        "similarity_score": round(score, 4),
+        "evaluation_method": method,
+        "confidence": round(min(1.0, abs(score - threshold) / span) if span else 1.0, 4),
+    }
+
+
+def evaluate_quiz_answers(pairs: Iterable[Tuple[str, str]]) -> List[Dict[str, object]]:
+    """Évalue en un seul calcul matriciel une liste de ``(réponse, réponse attendue)``"""
+    pairs = list(pairs)
+    if not pairs:
+        return []
+    threshold = _threshold()
+    answers = [normalize_answer(answer) for answer, _ in pairs]
+    expected = [normalize_answer(reference) for _, reference in pairs]
+
+    answer_matrix = np.stack([_ngram_vector(a) for a in answers])
+    expected_matrix = np.stack([_cached_vector(e) for e in expected])
+    scores = np.einsum("ij,ij->i", answer_matrix, expected_matrix)
+
+    results = []
+    for answer, reference, score in zip(answers, expected, scores.tolist()):
+        if not answer:
+            results.append(_evaluation(0.0, "empty", threshold))
+        elif answer == reference:
+            results.append(_evaluation(1.0, "exact_match", threshold))
+        else:
+            results.append(_evaluation(min(1.0, max(0.0, score)), "char_ngram_cosine", threshold))
+    return results
+
+
+def evaluate_quiz_answer(user_answer: str, correct_answer: str) -> Dict[str, object]:
+    """Évalue une réponse libre: ``is_correct``, ``similarity_score``, ``evaluation_method``, ``confidence``"""
+    return evaluate_quiz_answers([(user_answer, correct_answer)])[0]
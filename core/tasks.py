@@ -2,108 +2,336 @@
 Tâches Celery pour le traitement asynchrone des cours
 """
 
-from celery import shared_task
+from celery import chain, chord, group, shared_task
+from celery.signals import worker_process_init
 from django.core.files.base import ContentFile
+from django.db.models import Q
 from django.utils import timezone
-from .models import Course, Quiz, Question
+from .models import Course, CourseDocument, Quiz, Question
 from .ai_enhanced import get_ai_summary, get_ai_quiz
+from .quiz_service import materialize_quiz
+from .preprocessing import get_engine
 from ai_engine.models import AIProcessingJob
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Étapes parallèles du traitement d'un cours: (nom, type de job enfant)
+PIPELINE_STEPS = (
+    ('summary', 'summarization'),
+    ('concepts', 'concept_extraction'),
+    ('quiz', 'quiz_generation'),
+)
+
+
 @shared_task(bind=True)
 def process_course_async(self, course_id):
     """
-    Tâche asynchrone pour traiter un cours uploadé
+    Traitement IA complet d'un cours uploadé (canvas Celery)
+
+    prepare_course_context -> [résumé | concepts clés | quiz] -> finalize_course_processing
+
+    Le prétraitement charge le cours une seule fois et condense le texte;
+    les trois étapes reçoivent ce contexte, s'exécutent en parallèle (chord)
+    et renvoient leurs résultats sans écrire le cours. Le callback enregistre
+    tous les champs en un seul ``save(update_fields=...)``. Un job parent
+    suit l'avancement, avec un job enfant par étape.
     """
+    course = Course.objects.only('id', 'user').get(id=course_id)
+    job = AIProcessingJob.objects.create(
+        job_type='course_processing',
+        course=course,
+        user=course.user,
+        status='processing'
+    )
+    job.start_processing()
+    steps = {
+        step: str(AIProcessingJob.objects.create(
+            job_type=job_type, course=course, user=course.user, parent=job
+        ).id)
+        for step, job_type in PIPELINE_STEPS
+    }
+    Course.objects.filter(id=course_id).update(processing_status='processing')
+
+    workflow = chain(
+        prepare_course_context.s(str(course_id), str(job.id), steps),
+        chord(
+            group(summarize_course_step.s(), extract_concepts_step.s(), generate_quiz_step.s()),
+            finalize_course_processing.s(str(course_id), str(job.id)),
+        ),
+    )
+    workflow.on_error(fail_course_processing.si(str(course_id), str(job.id))).apply_async()
+
+    logger.info(f"Traitement du cours {course_id} lancé (job {job.id})")
+    return str(job.id)
+
+
+@shared_task
+def prepare_course_context(course_id, job_id, steps):
+    """Première étape: texte prétraité, sections et texte condensé partagés par les étapes suivantes"""
+    from django.conf import settings
+    from .chunking import split_into_chunks
+    from .phi3_ai import phi3_ai
+
+    text = Course.objects.get(id=course_id).extracted_text or ''
+    stats = preprocess_text(text)
+    source, num_chunks = phi3_ai.condense(text)
+    AIProcessingJob.objects.get(id=job_id).update_progress(10)
+    return {
+        'course_id': course_id,
+        'job_id': job_id,
+        'steps': steps,
+        'source': source,
+        'num_chunks': num_chunks,
+        'chunks': split_into_chunks(text, getattr(settings, 'AI_RETRIEVAL_CHUNK_TOKENS', 300)),
+        'preprocessing': {key: stats[key] for key in ('key_words', 'word_count', 'sentence_count') if key in stats},
+    }
+
+
+def _run_step(context, step, func):
+    """Exécute une étape sur son job enfant; une erreur n'interrompt pas le chord"""
+    job = AIProcessingJob.objects.get(id=context['steps'][step])
+    job.start_processing()
     try:
-        course = Course.objects.get(id=course_id)
-        
-        # Créer un job de traitement IA
-        job = AIProcessingJob.objects.create(
-            job_type='text_extraction',
-            course=course,
-            user=course.user,
-            status='processing'
-        )
-        job.start_processing()
-        
-        # 1. Prétraitement du texte
-        processed_text = preprocess_text(course.extracted_text)
-        course.extracted_text = processed_text
-        
-        # 2. Génération du résumé
-        summary_job = generate_summary_async.delay(course_id)
-        
-        # 3. Génération des concepts clés
-        concepts_job = extract_key_concepts_async.delay(course_id)
-        
-        # 4. Génération du quiz
-        quiz_job = generate_quiz_async.delay(course_id)
-        
-        # Marquer le cours comme traité
-        course.ai_processed = True
-        course.processing_status = 'completed'
-        course.last_ai_update = timezone.now()
-        course.save()
-        
-        # Marquer le job comme terminé
-        job.complete_job({
-            'summary_job_id': summary_job.id,
-            'concepts_job_id': concepts_job.id,
-            'quiz_job_id': quiz_job.id
-        })
-        
-        logger.info(f"Cours {course_id} traité avec succès")
-        return f"Cours {course_id} traité avec succès"
-        
+        data = func()
+        job.complete_job(data)
+        return {'step': step, 'success': True, **data}
     except Exception as e:
-        logger.error(f"Erreur lors du traitement du cours {course_id}: {str(e)}")
-        if 'job' in locals():
-            job.fail_job(str(e))
+        logger.error(f"Étape {step} du cours {context['course_id']} en échec: {str(e)}")
+        job.fail_job(str(e))
+        return {'step': step, 'success': False, 'error': str(e)}
+    finally:
+        AIProcessingJob.objects.get(id=context['job_id']).sync_progress_with_children()
+
+
+@shared_task
+def summarize_course_step(context):
+    def summarize():
+        result = get_ai_summary(context['source'], level='intermediate', num_chunks=context['num_chunks'])
+        if not result.get('success'):
+            raise RuntimeError(result.get('error', 'Erreur inconnue'))
+        return {'summary': result['summary'], 'summary_data': result.get('summary_data', {})}
+
+    return _run_step(context, 'summary', summarize)
+
+
+@shared_task
+def extract_concepts_step(context):
+    def extract():
+        from .similarity import extract_key_concepts
+
+        return {'concepts': extract_key_concepts(context['chunks'])}
+
+    return _run_step(context, 'concepts', extract)
+
+
+@shared_task
+def generate_quiz_step(context, num_questions=5, difficulty='medium'):
+    def generate():
+        result = get_ai_quiz(context['source'], num_questions, difficulty, num_chunks=context['num_chunks'])
+        if not result.get('success'):
+            raise RuntimeError(result.get('error', 'Erreur inconnue'))
+        course = Course.objects.only('id').get(id=context['course_id'])
+        quiz = materialize_quiz(course, result['questions'], difficulty,
+                                description=f"Quiz généré par IA ({difficulty})")
+        return {'quiz_id': str(quiz.id), 'questions_count': len(result['questions'])}
+
+    return _run_step(context, 'quiz', generate)
+
+
+@shared_task
+def finalize_course_processing(results, course_id, job_id):
+    """Callback du chord: écrit tous les résultats sur le cours en une seule requête"""
+    from .documents import store_shared_summary
+
+    by_step = {result['step']: result for result in results}
+    course = Course.objects.only('id', 'slug', 'status', 'published_at', 'document').get(id=course_id)
+    fields = ['ai_processed', 'processing_status', 'last_ai_update', 'updated_at']
+
+    summary = by_step.get('summary', {})
+    if summary.get('success'):
+        course.summary = summary['summary']
+        course.ai_summary = summary['summary_data']
+        fields += ['summary', 'ai_summary']
+        store_shared_summary(course, 'intermediate', 'french', summary['summary'])
+    concepts = by_step.get('concepts', {})
+    if concepts.get('success'):
+        course.key_concepts = concepts['concepts']
+        fields.append('key_concepts')
+
+    succeeded = [step for step, result in by_step.items() if result['success']]
+    course.ai_processed = bool(succeeded)
+    course.processing_status = 'completed' if len(succeeded) == len(by_step) else ('partial' if succeeded else 'failed')
+    course.last_ai_update = timezone.now()
+    course.save(update_fields=fields)
+
+    job = AIProcessingJob.objects.get(id=job_id)
+    output = {step: {'success': result['success'], 'error': result.get('error', '')} for step, result in by_step.items()}
+    if 'quiz_id' in by_step.get('quiz', {}):
+        output['quiz_id'] = by_step['quiz']['quiz_id']
+    if succeeded:
+        job.complete_job(output)
+    else:
+        job.fail_job('Toutes les étapes du traitement ont échoué')
+    logger.info(f"Cours {course_id} traité: {course.processing_status} ({', '.join(succeeded) or 'aucune étape réussie'})")
+    return course.processing_status
+
+
+@shared_task
+def fail_course_processing(course_id, job_id):
+    """Erreur du prétraitement ou du callback: le cours et le job ne restent pas « en cours »"""
+    Course.objects.filter(id=course_id).update(processing_status='failed')
+    job = AIProcessingJob.objects.get(id=job_id)
+    if job.status == 'processing':
+        job.fail_job('Le traitement du cours a échoué')
+
+@shared_task(bind=True)
+def extract_course_text_async(self, course_id, job_id):
+    """
+    Extraction asynchrone du texte d'un cours uploadé
+
+    Le fichier est relu depuis le stockage; l'avancement est enregistré sur
+    le job (``AIProcessingJob.progress``) et consultable depuis la page du cours.
+    Le texte d'un cours rattaché à un ``CourseDocument`` est enregistré sur le
+    document, et réutilisé tel quel s'il a déjà été extrait. Les autres cours
+    du document qui attendaient cette extraction (``claim_extraction``) sont
+    mis à jour en même temps.
+    """
+    from .extraction import extract_document, guess_content_type, stats_from_extraction
+    from .search import index_courses
+    from .retrieval import build_course_index
+
+    job = AIProcessingJob.objects.select_related('course__document').get(id=job_id)
+    course = job.course
+    job.start_processing()
+
+    last_reported = [0]
+
+    def report(done, total):
+        # Une écriture par tranche de 5% au plus
+        percent = int(done * 100 / total) if total else 100
+        if percent >= last_reported[0] + 5 or done == total:
+            last_reported[0] = percent
+            job.update_progress(min(percent, 99))
+
+    document = course.document
+    try:
+        if document is not None and document.extraction_status == 'completed':
+            # Document partagé déjà extrait (upload identique): rien à refaire
+            text = document.extracted_text
+            Course.objects.filter(id=course_id).update(
+                processing_status='pending',
+                updated_at=timezone.now(),
+                **stats_from_extraction(document.extraction_stats, text),
+            )
+            index_courses(Course.objects.filter(id=course_id))
+            job.complete_job({**document.extraction_stats, 'shared_document': True})
+            return f"Texte partagé réutilisé pour le cours {course_id}"
+
+        if document is not None:
+            document.extraction_status = 'extracting'
+            document.save(update_fields=['extraction_status'])
+
+        content_type = job.input_data.get('content_type') or guess_content_type(course.file.name)
+        try:
+            # Chemin local: permet l'extraction PDF parallèle (workers qui rouvrent le fichier)
+            path = course.file.path
+        except NotImplementedError:
+            path = None
+        with course.file.open('rb') as fh:
+            result = extract_document(fh, content_type, progress=report, path=path)
+        text = result.text
+
+        if document is not None:
+            document.extracted_text = text
+            document.extraction_status = 'completed'
+            document.extraction_stats = result.as_dict()
+            document.extracted_at = timezone.now()
+            document.save(update_fields=['extracted_text', 'extraction_status', 'extraction_stats', 'extracted_at'])
+            # Tous les cours du document ont les mêmes métriques de texte; ceux qui
+            # attendaient cette extraction (uploads du même fichier) sont terminés aussi
+            Course.objects.filter(document=document).update(**stats_from_extraction(document.extraction_stats))
+            Course.objects.filter(Q(id=course_id) | Q(document=document, processing_status='extracting')).update(
+                processing_status='pending', updated_at=timezone.now()
+            )
+            index_courses(Course.objects.filter(document=document))
+        else:
+            course.page_count = result.pages
+            course.extracted_text = text
+            course.processing_status = 'pending'
+            course.save(update_fields=['extracted_text', 'processing_status', 'updated_at'])
+
+        # Index des sections pour le chat (reconstruit à la demande en cas d'échec)
+        try:
+            build_course_index(course)
+        except Exception as e:
+            logger.warning(f"Indexation du cours {course_id} impossible: {e}")
+
+        job.complete_job(result.as_dict())
+        logger.info(f"Texte extrait pour le cours {course_id}: {len(text)} caractères")
+        return f"Texte extrait pour le cours {course_id}"
+
+    except Exception as e:
+        logger.error(f"Erreur lors de l'extraction du cours {course_id}: {str(e)}")
+        Course.objects.filter(id=course_id).update(processing_status='extraction_failed')
+        if document is not None:
+            CourseDocument.objects.filter(pk=document.pk).update(extraction_status='failed')
+            Course.objects.filter(document=document, processing_status='extracting').update(processing_status='extraction_failed')
+        job.fail_job(str(e))
         raise
 
+
+def enqueue_text_extraction(course, job):
+    """
+    Lance l'extraction en tâche de fond
+
+    Broker injoignable: l'extraction (PDF volumineux) n'est pas exécutée
+    dans la requête; le job reste en attente, avec l'erreur, et sera relancé
+    par retry_pending_extractions_async. Retourne False dans ce cas.
+    """
+    try:
+        extract_course_text_async.delay(str(course.id), str(job.id))
+        return True
+    except Exception as e:
+        logger.warning(f"Broker Celery indisponible ({e}), extraction du cours {course.id} à relancer")
+        job.error_message = f"Broker Celery indisponible: {e}"
+        job.save(update_fields=['error_message'])
+        return False
+
+
+@shared_task
+def retry_pending_extractions_async():
+    """
+    Relance les extractions que le broker n'a pas pu recevoir (CELERY_BEAT_SCHEDULE)
+
+    Jobs en attente marqués par enqueue_text_extraction (message d'erreur);
+    un job mis en file normalement n'en a pas.
+    """
+    jobs = AIProcessingJob.objects.filter(job_type='text_extraction', status='pending').exclude(error_message='')
+    retried = 0
+    for job in jobs:
+        extract_course_text_async.delay(str(job.course_id), str(job.id))
+        AIProcessingJob.objects.filter(pk=job.pk).update(error_message='')
+        retried += 1
+    if retried:
+        logger.info(f"{retried} extraction(s) relancée(s)")
+    return retried
+
+@worker_process_init.connect
+def load_preprocessing_engine(**kwargs):
+    """Charge les ressources de prétraitement une fois par processus worker"""
+    get_engine().load()
+
+
 @shared_task
 def preprocess_text(text):
     """
     Prétraitement du texte : nettoyage, segmentation, extraction de phrases clés
+
+    Délègue au moteur du processus (core/preprocessing.py), déjà chargé.
     """
-    import re
-    import nltk
-    from nltk.tokenize import sent_tokenize, word_tokenize
-    from nltk.corpus import stopwords
-    
     try:
-        # Télécharger les ressources NLTK si nécessaire
-        nltk.download('punkt', quiet=True)
-        nltk.download('stopwords', quiet=True)
-        
-        # Nettoyage du texte
-        text = re.sub(r'\s+', ' ', text)  # Normaliser les espaces
-        text = re.sub(r'[^\w\s\.\,\!\?]', '', text)  # Supprimer caractères spéciaux
-        
-        # Segmentation en phrases
-        sentences = sent_tokenize(text)
-        
-        # Extraction des mots clés (mots les plus fréquents)
-        words = word_tokenize(text.lower())
-        stop_words = set(stopwords.words('french'))
-        filtered_words = [word for word in words if word not in stop_words and len(word) > 3]
-        
-        # Compter les fréquences
-        from collections import Counter
-        word_freq = Counter(filtered_words)
-        key_words = [word for word, freq in word_freq.most_common(20)]
-        
-        return {
-            'cleaned_text': text,
-            'sentences': sentences,
-            'key_words': key_words,
-            'word_count': len(words),
-            'sentence_count': len(sentences)
-        }
-        
+        return get_engine().preprocess(text)
     except Exception as e:
         logger.error(f"Erreur lors du prétraitement: {str(e)}")
         return {'cleaned_text': text, 'error': str(e)}
@@ -131,7 +359,7 @@ def generate_summary_async(course_id):
         if result.get('success'):
             course.summary = result['summary']
             course.ai_summary = result.get('summary_data', {})
-            course.save()
+            course.save(update_fields=['summary', 'ai_summary', 'updated_at'])
             
             job.complete_job(result)
             logger.info(f"Résumé généré pour le cours {course_id}")
@@ -170,7 +398,7 @@ def extract_key_concepts_async(course_id):
         concepts = extract_key_concepts(course.extracted_text)
         
         course.key_concepts = concepts
-        course.save()
+        course.save(update_fields=['key_concepts', 'updated_at'])
         
         job.complete_job({'concepts': concepts})
         logger.info(f"Concepts clés extraits pour le cours {course_id}")
@@ -204,26 +432,14 @@ def generate_quiz_async(course_id, num_questions=5, difficulty='medium'):
         result = get_ai_quiz(course.extracted_text, num_questions, difficulty)
         
         if result.get('success'):
-            # Créer le quiz dans la base de données
-            quiz = Quiz.objects.create(
-                title=f"Quiz IA - {course.title}",
-                description=f"Quiz généré par IA ({difficulty})",
-                course=course,
-                difficulty=difficulty
+            # Créer le quiz et ses questions (une transaction, un seul INSERT)
+            quiz = materialize_quiz(
+                course,
+                result['questions'],
+                difficulty,
+                description=f"Quiz généré par IA ({difficulty})"
             )
             
-            # Créer les questions
-            for i, q_data in enumerate(result['questions']):
-                question = Question.objects.create(
-                    quiz=quiz,
-                    question_text=q_data.get('question_text', q_data.get('question', '')),
-                    question_type=q_data.get('question_type', 'multiple_choice'),
-                    correct_answer=q_data.get('correct_answer', ''),
-                    explanation=q_data.get('explanation', ''),
-                    options=q_data.get('options', []),
-                    order=i + 1
-                )
-            
             job.complete_job({
                 'quiz_id': str(quiz.id),
                 'questions_count': len(result['questions'])
@@ -242,39 +458,139 @@ def generate_quiz_async(course_id, num_questions=5, difficulty='medium'):
             job.fail_job(str(e))
         raise
 
+@shared_task
+def evaluate_attempt_answers_async(attempt_id, answers=None):
+    """
+    Évaluation en un seul passage des réponses libres (fill_blank) d'une tentative
+
+    Toutes les réponses sont comparées aux réponses attendues en un seul
+    calcul de similarité (``evaluate_quiz_answers``); la tentative est lue
+    verrouillée et réécrite une seule fois. Les évaluations (is_correct,
+    similarity_score, evaluation_method, confidence) sont écrites dans
+    ``question_results`` avec le score; ``attempt.answers`` garde les
+    réponses brutes. ``answers`` ({question_id: réponse}) désigne les
+    réponses à évaluer; sinon, seules les réponses libres pas encore
+    évaluées le sont. Renvoie les évaluations par question.
+    """
+    from django.db import transaction
+    from core.models import QuizAttempt
+    from .similarity import evaluate_quiz_answers
+
+    try:
+        with transaction.atomic():
+            attempt = QuizAttempt.objects.select_for_update().get(id=attempt_id)
+            expected = dict(
+                Question.objects.filter(quiz_id=attempt.quiz_id, question_type='fill_blank')
+                .values_list('id', 'correct_answer')
+            )
+            expected = {str(question_id): answer for question_id, answer in expected.items()}
+
+            records = {record['question_id']: record for record in attempt.question_results or []}
+            if answers is None:
+                if records:
+                    answers = {qid: record['answer'] for qid, record in records.items() if 'evaluation_method' not in record}
+                else:
+                    # Tentative antérieure à question_results: évaluée sans être enregistrée
+                    answers = attempt.answers or {}
+            pending = {str(qid): answer for qid, answer in answers.items() if str(qid) in expected and answer}
+            if not pending:
+                return {}
+
+            question_ids = list(pending)
+            evaluations = evaluate_quiz_answers([(pending[qid], expected[qid]) for qid in question_ids])
+            results = dict(zip(question_ids, evaluations))
+
+            evaluated = [qid for qid in results if qid in records]
+            for qid in evaluated:
+                records[qid].update(results[qid])
+            if evaluated:
+                # Révise la correction enregistrée et le score de la tentative
+                attempt.score = sum(1 for record in attempt.question_results if record['is_correct'])
+                attempt.save(update_fields=['question_results', 'score', 'score_percentage', 'passed'])
+
+        correct = sum(1 for evaluation in results.values() if evaluation['is_correct'])
+        logger.info(f"Tentative {attempt_id}: {len(results)} réponses libres évaluées, {correct} correctes")
+        return results
+
+    except Exception as e:
+        logger.error(f"Erreur lors de l'évaluation des réponses de la tentative {attempt_id}: {str(e)}")
+        raise
+
+
 @shared_task
 def evaluate_quiz_answer_async(attempt_id, question_id, user_answer):
     """
     Évaluation asynchrone d'une réponse de quiz avec similarité sémantique
+
+    Conservée pour les appels existants: délègue à l'évaluation groupée.
     """
+    results = evaluate_attempt_answers_async(attempt_id, {str(question_id): user_answer})
+    return results.get(str(question_id))
+
+
+def enqueue_answer_evaluation(attempt):
+    """Lance l'évaluation des réponses libres; l'exécute sur place si le broker est injoignable"""
     try:
-        from core.models import QuizAttempt
-        from .similarity import evaluate_quiz_answer
-        
-        attempt = QuizAttempt.objects.get(id=attempt_id)
-        question = Question.objects.get(id=question_id)
-        
-        # Évaluer la réponse avec similarité sémantique
-        evaluation = evaluate_quiz_answer(user_answer, question.correct_answer)
-        
-        # Mettre à jour la tentative
-        answers = attempt.answers.copy()
-        answers[str(question_id)] = {
-            'answer': user_answer,
-            'is_correct': evaluation['is_correct'],
-            'similarity_score': evaluation['similarity_score'],
-            'evaluation_method': evaluation['evaluation_method'],
-            'confidence': evaluation['confidence']
-        }
-        attempt.answers = answers
-        attempt.save()
-        
-        logger.info(f"Réponse évaluée pour la tentative {attempt_id}: {evaluation['is_correct']}")
-        return evaluation
-        
+        evaluate_attempt_answers_async.delay(str(attempt.id))
     except Exception as e:
-        logger.error(f"Erreur lors de l'évaluation de la réponse {attempt_id}: {str(e)}")
-        raise
+        logger.warning(f"Broker Celery indisponible ({e}), évaluation de la tentative {attempt.id} exécutée sur place")
+        evaluate_attempt_answers_async.apply(args=(str(attempt.id),))
+
+
+@shared_task
+def regrade_quiz_attempts_async(quiz_id):
+    """
+    Recorrection des tentatives d'un quiz après la modification d'une question
+    """
+    from .grading import regrade_quiz_attempts
+
+    try:
+        quiz = Quiz.objects.get(id=quiz_id)
+    except Quiz.DoesNotExist:
+        return 0
+    return regrade_quiz_attempts(quiz)
+
+
+def enqueue_quiz_regrade(quiz_id):
+    """Lance la recorrection des tentatives d'un quiz; l'exécute sur place si le broker est injoignable"""
+    try:
+        regrade_quiz_attempts_async.delay(str(quiz_id))
+    except Exception as e:
+        logger.warning(f"Broker Celery indisponible ({e}), recorrection du quiz {quiz_id} exécutée sur place")
+        regrade_quiz_attempts_async.apply(args=(str(quiz_id),))
+
+
+@shared_task
+def repair_quiz_statistics_async():
+    """
+    Réparation périodique des statistiques des quiz (CELERY_BEAT_SCHEDULE)
+
+    Les statistiques sont tenues à jour à chaque tentative; ce recalcul
+    complet corrige les éventuels écarts (suppressions en masse, etc.).
+    """
+    repaired = 0
+    for quiz in Quiz.objects.filter(attempts__isnull=False).distinct().only('id', 'passing_score').iterator():
+        quiz.update_statistics()
+        repaired += 1
+    logger.info(f"Statistiques de {repaired} quiz recalculées")
+    return repaired
+
+
+@shared_task
+def compact_search_index_async():
+    """
+    Compactage périodique de l'index inversé de recherche (CELERY_BEAT_SCHEDULE)
+
+    Réécrit le segment projeté en mémoire avec les cours modifiés depuis le
+    dernier compactage; les processus le rechargent à leur recherche suivante.
+    Sans effet si SEARCH_BACKEND n'est pas 'inverted'.
+    """
+    from .search import _inverted_enabled, rebuild_index
+
+    if not _inverted_enabled():
+        return None
+    return rebuild_index()
+
 
 @shared_task
 def update_analytics_async(user_id, activity_type, metadata=None):
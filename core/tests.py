@@ -1,3 +1,1074 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+import logging
+import shutil
+import tempfile
+import threading
+import unittest
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
 
-# Create your tests here.
+import httpx
+import requests
+from django.contrib.auth.models import User
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.handlers.asgi import ASGIHandler
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from ai_engine.models import AIProcessingJob, LLMResponseCache
+from core.llm_cache import llm_cache
+from core.models import Course, CourseChunkIndex, CourseContent, CourseDocument, Question, Quiz, QuizAttempt
+from core.chunking import estimate_tokens, split_into_chunks
+from core import extraction
+from core.documents import attach_document, shared_summary, store_shared_summary
+from core.fields import compress_text, decompress_text
+from core.http_pool import close_http_session, get_http_session, get_pool_stats
+from core.grading import GradingEngine, regrade_quiz_attempts
+from core.phi3_ai import async_phi3_ai, phi3_ai
+from core.preprocessing import PreprocessingEngine
+from core.quiz_parsing import QuizParseError, parse_quiz, parse_quiz_json
+from core.quiz_payload import attempt_results, build_quiz_data, get_quiz_payload
+from core.quiz_service import materialize_quiz
+from core import retrieval
+from core.sessions import SessionStore
+from core.sessions.db import SessionStore as DBSessionStore
+from core.similarity import evaluate_quiz_answers, extract_key_concepts
+from core.tasks import (
+    enqueue_text_extraction, evaluate_attempt_answers_async, extract_course_text_async, process_course_async,
+    repair_quiz_statistics_async, retry_pending_extractions_async,
+)
+from fiches_revision.celery import app as celery_app
+
+
+def fake_stream(*deltas):
+    """Remplace un flux du client LLM asynchrone"""
+    async def stream(*args, **kwargs):
+        for delta in deltas:
+            yield delta
+    return mock.Mock(side_effect=stream)
+
+
+async def read_events(response):
+    """Événements SSE d'une réponse en streaming: [(événement, données), ...]"""
+    body = b''.join([chunk async for chunk in response.streaming_content]).decode('utf-8')
+    events = []
+    for block in body.strip().split('\n\n'):
+        event, data = 'message', None
+        for line in block.splitlines():
+            if line.startswith('event: '):
+                event = line[len('event: '):]
+            elif line.startswith('data: '):
+                data = json.loads(line[len('data: '):])
+        events.append((event, data))
+    return events
+
+
+class StreamViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('etudiant', password='pw')
+        self.course = Course.objects.create(
+            title='Probabilités', user=self.user, status='published', is_public=True,
+            extracted_text="La formule de Bayes relie les probabilités conditionnelles.",
+        )
+        self.async_client.force_login(self.user)
+
+    async def post_stream(self, name, data):
+        url = reverse(name, args=[self.course.id])
+        return await self.async_client.post(url, json.dumps(data), content_type='application/json', secure=True)
+
+    async def test_chat_stream_sends_answer_then_serves_it_from_cache(self):
+        with mock.patch.object(async_phi3_ai, 'stream_chat_with_course', fake_stream('La formule ', 'de Bayes.')) as stream:
+            response = await self.post_stream('ai_chat_stream', {'question': 'Quelle formule ?'})
+            self.assertEqual(response.status_code, 200)
+            events = await read_events(response)
+
+            self.assertEqual([data['delta'] for event, data in events if event == 'message'], ['La formule ', 'de Bayes.'])
+            self.assertEqual(events[-1][0], 'done')
+
+            events = await read_events(await self.post_stream('ai_chat_stream', {'question': 'quelle formule ?'}))
+            self.assertEqual(events[0][1], {'delta': 'La formule de Bayes.'})
+            self.assertTrue(events[-1][1]['cached'])
+            self.assertEqual(stream.call_count, 1)
+
+    async def test_chat_stream_reports_llm_errors_as_event(self):
+        with mock.patch.object(async_phi3_ai, 'stream_chat_with_course', mock.Mock(side_effect=RuntimeError('quota'))):
+            events = await read_events(await self.post_stream('ai_chat_stream', {'question': 'Bayes ?'}))
+        self.assertEqual(events[-1][0], 'error')
+        self.assertIn('quota', events[-1][1]['error'])
+
+    async def test_summary_stream_stores_summary_on_course(self):
+        with mock.patch.object(async_phi3_ai, 'stream_summary', fake_stream('Résumé ', 'du cours.')):
+            events = await read_events(await self.post_stream('ai_summary_stream', {'level': 'beginner'}))
+
+        self.assertEqual(''.join(data['delta'] for event, data in events if event == 'message'), 'Résumé du cours.')
+        summary = await Course.objects.filter(pk=self.course.pk).values_list('ai_summary', flat=True).aget()
+        self.assertEqual(summary, 'Résumé du cours.')
+
+    async def test_summary_stream_regenerate_ignores_cached_summary(self):
+        with mock.patch.object(async_phi3_ai, 'stream_summary', fake_stream('Premier.')):
+            await read_events(await self.post_stream('ai_summary_stream', {'level': 'beginner'}))
+        with mock.patch.object(async_phi3_ai, 'stream_summary', fake_stream('Second.')) as stream:
+            events = await read_events(await self.post_stream('ai_summary_stream', {'level': 'beginner', 'regenerate': True}))
+
+        self.assertEqual(events[0][1], {'delta': 'Second.'})
+        self.assertTrue(stream.call_args.kwargs['regenerate'])
+        summary = await Course.objects.filter(pk=self.course.pk).values_list('ai_summary', flat=True).aget()
+        self.assertEqual(summary, 'Second.')
+
+
+class Phi3StreamTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def sse_response(self, *deltas):
+        lines = [f"data: {json.dumps({'choices': [{'delta': {'content': delta}}]})}" for delta in deltas]
+        response = requests.Response()
+        response.status_code = 200
+        response.headers['Content-Type'] = 'text/event-stream'  # sans charset
+        response.raw = io.BytesIO('\n\n'.join(lines + ['data: [DONE]']).encode('utf-8'))
+        return response
+
+    def test_stream_is_decoded_as_utf8(self):
+        session = mock.Mock()
+        session.post.return_value = self.sse_response('Théorème ', 'à démontrer')
+        with mock.patch('core.phi3_ai.get_http_session', return_value=session), \
+                mock.patch.object(phi3_ai, 'api_key', 'sk-test'):
+            deltas = list(phi3_ai._stream_chat_completion([{'role': 'user', 'content': 'Énoncé ?'}]))
+        self.assertEqual(deltas, ['Théorème ', 'à démontrer'])
+
+
+class AsyncPhi3ClientTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.requests = []
+        patcher = mock.patch.object(async_phi3_ai, 'api_key', 'sk-test')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def use_transport(self, handler):
+        def record(request):
+            self.requests.append(json.loads(request.content))
+            return handler(request)
+
+        client = httpx.AsyncClient(transport=httpx.MockTransport(record))
+        patcher = mock.patch.object(async_phi3_ai, '_get_client', return_value=client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_completion_is_requested_once_then_cached(self):
+        self.use_transport(lambda request: httpx.Response(200, json={'choices': [{'message': {'content': 'Réponse'}}]}))
+        messages = [{'role': 'user', 'content': 'Question ?'}]
+
+        self.assertEqual(await async_phi3_ai._chat_completion(messages), 'Réponse')
+        self.assertEqual(await async_phi3_ai._chat_completion(messages), 'Réponse')
+        self.assertEqual(len(self.requests), 1)
+        self.assertEqual(self.requests[0]['messages'], messages)
+
+    async def test_stream_yields_deltas_until_done(self):
+        lines = [f"data: {json.dumps({'choices': [{'delta': {'content': delta}}]})}" for delta in ('Théorème ', 'de Pythagore')]
+        body = '\n\n'.join(lines + ['data: [DONE]', 'data: ignoré']).encode('utf-8')
+        self.use_transport(lambda request: httpx.Response(200, content=body, headers={'Content-Type': 'text/event-stream'}))
+
+        deltas = [delta async for delta in async_phi3_ai._stream_chat_completion([{'role': 'user', 'content': 'Énoncé ?'}])]
+        self.assertEqual(deltas, ['Théorème ', 'de Pythagore'])
+        self.assertTrue(self.requests[0]['stream'])
+
+    async def test_api_error_is_raised(self):
+        self.use_transport(lambda request: httpx.Response(429, json={'error': 'quota'}))
+        with self.assertRaisesMessage(RuntimeError, 'OpenAI API error 429'):
+            await async_phi3_ai._chat_completion([{'role': 'user', 'content': 'Question ?'}])
+
+        result = await async_phi3_ai.generate_summary('Texte court.')
+        self.assertEqual(result['success'], False)
+
+    def test_one_client_per_event_loop(self):
+        async def clients():
+            first, second = async_phi3_ai._get_client(), async_phi3_ai._get_client()
+            await async_phi3_ai.aclose()
+            return first, second
+
+        first, same = asyncio.run(clients())
+        other, _ = asyncio.run(clients())
+        self.assertIs(first, same)
+        self.assertIsNot(first, other)
+        self.assertTrue(first.is_closed)
+
+
+class PreprocessingEngineTests(TestCase):
+    def test_resources_are_checked_once_per_engine(self):
+        engine = PreprocessingEngine()
+        with mock.patch.object(PreprocessingEngine, '_ensure_nltk_resources', return_value=False) as ensure:
+            for _ in range(3):
+                result = engine.preprocess("Les matrices carrées. Les matrices inversibles ont un déterminant non nul.")
+        self.assertLessEqual(ensure.call_count, 1)
+        self.assertEqual(result['sentence_count'], 2)
+        self.assertEqual(result['key_words'][0], 'matrices')
+
+    def test_windows_are_cut_at_sentence_ends(self):
+        engine = PreprocessingEngine(window_chars=30)
+        text = "Première phrase courte. Deuxième phrase un peu plus longue. Fin."
+        windows = list(engine.iter_windows(text))
+        self.assertEqual(''.join(windows), text)
+        self.assertTrue(all(len(window) <= 30 for window in windows))
+        self.assertEqual(windows[0], 'Première phrase courte.')
+
+
+class SimilarityTests(TestCase):
+    def test_answers_are_evaluated_in_one_batch(self):
+        results = evaluate_quiz_answers([
+            ('Théorème de PYTHAGORE', 'théorème de Pythagore'),
+            ('theoreme de pythagor', 'Théorème de Pythagore'),
+            ('la photosynthèse', 'Théorème de Pythagore'),
+            ('', 'Théorème de Pythagore'),
+        ])
+        self.assertEqual([r['evaluation_method'] for r in results], ['exact_match', 'char_ngram_cosine', 'char_ngram_cosine', 'empty'])
+        self.assertEqual([r['is_correct'] for r in results], [True, True, False, False])
+
+    def test_key_concepts_are_repeated_normalised_terms(self):
+        sections = [
+            "La matrice inverse existe si le déterminant est non nul. Le déterminant se calcule.",
+            "Le déterminant d'une matrice triangulaire est le produit de la diagonale.",
+            "Une matrice symétrique est diagonalisable. Une matrice orthogonale conserve la norme.",
+        ]
+        concepts = [c['concept'] for c in extract_key_concepts(sections, top_n=3)]
+        self.assertEqual(concepts, ['matrice', 'determinant'])  # mots vides et termes isolés exclus
+
+
+class MapReduceSummaryTests(TestCase):
+    text = '\n\n'.join(f'Section {i}. ' + ' '.join(['Le cours décrit une notion importante.'] * 10) for i in range(1, 7))
+
+    def setUp(self):
+        for name, value in (('single_pass_tokens', 200), ('chunk_tokens', 150)):
+            patcher = mock.patch.object(phi3_ai, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    @staticmethod
+    def summarize_sections(messages, **kwargs):
+        """Résumé d'une section: les numéros de section qu'elle contient"""
+        content = messages[-1]['content']
+        return 'Résumé ' + ','.join(word for word in content.replace('.', ' ').split() if word.isdigit())
+
+    def test_chunks_are_bounded_and_keep_the_text_order(self):
+        chunks = split_into_chunks(self.text, 150)
+
+        self.assertGreater(len(chunks), 1)
+        self.assertTrue(all(estimate_tokens(chunk) <= 150 for chunk in chunks))
+        self.assertEqual('\n\n'.join(chunks), self.text)
+
+    def test_sections_are_summarized_then_reduced_in_one_call(self):
+        for concurrency in (1, 4):
+            with self.subTest(map_concurrency=concurrency), \
+                    mock.patch.object(phi3_ai, 'map_concurrency', concurrency), \
+                    mock.patch.object(phi3_ai, '_chat_completion', side_effect=self.summarize_sections) as chat:
+                result = phi3_ai.generate_summary(self.text)
+
+            num_chunks = len(split_into_chunks(self.text, 150))
+            self.assertEqual((result['success'], result['chunks']), (True, num_chunks))
+            self.assertEqual(chat.call_count, num_chunks + 1)
+            reduce_prompt = chat.call_args.args[0][-1]['content']
+            self.assertIn('résumés successifs', reduce_prompt)
+            # Résumés des sections concaténés dans l'ordre du cours
+            self.assertLess(reduce_prompt.index('1'), reduce_prompt.index('6'))
+
+    def test_text_under_the_single_pass_limit_is_sent_whole(self):
+        text = 'Le cours décrit une notion importante. ' * 600  # ~24 000 caractères
+        with mock.patch.object(phi3_ai, 'single_pass_tokens', 8000), \
+                mock.patch.object(phi3_ai, '_chat_completion', return_value='Réponse') as chat:
+            phi3_ai.generate_summary(text)
+            phi3_ai.generate_quiz(text)
+        for call in chat.call_args_list:
+            self.assertIn(text.strip(), call.args[0][-1]['content'])
+        self.assertIn(text, phi3_ai._chat_messages(text, 'Question ?', 'french')[-1]['content'])
+
+    def test_short_text_is_summarized_in_a_single_pass(self):
+        with mock.patch.object(phi3_ai, '_chat_completion', return_value='Résumé') as chat:
+            self.assertEqual(phi3_ai.condense('Texte court.'), ('Texte court.', 1))
+            result = phi3_ai.generate_summary('Texte court.')
+        self.assertEqual((result['chunks'], chat.call_count), (1, 1))
+
+
+@override_settings(AI_RETRIEVAL_CHUNK_TOKENS=60, AI_RETRIEVAL_MAX_CHARS=600, AI_RETRIEVAL_TOP_K=2)
+class RetrievalTests(TestCase):
+    topics = {
+        'photosynthèse': 'La photosynthèse transforme la lumière en énergie chimique dans les chloroplastes.',
+        'mitose': 'La mitose divise une cellule en deux cellules filles identiques.',
+        'enzymes': 'Les enzymes accélèrent les réactions chimiques sans être consommées.',
+        'respiration': 'La respiration cellulaire libère l\'énergie du glucose dans les mitochondries.',
+    }
+
+    def setUp(self):
+        user = User.objects.create_user('auteur', password='pw')
+        text = '\n\n'.join(' '.join([sentence] * 3) for sentence in self.topics.values())
+        self.course = Course.objects.create(title='Biologie', user=user, extracted_text=text)
+        self.twin = Course.objects.create(title='Biologie (copie)', user=user, extracted_text=text)
+        retrieval._loaded.clear()
+        self.addCleanup(retrieval._loaded.clear)
+
+    def test_best_sections_are_returned_in_course_order(self):
+        context = retrieval.retrieve_context(self.course, "Où a lieu la respiration, et qu'est-ce que la photosynthèse ?")
+
+        self.assertIn(self.topics['photosynthèse'], context)
+        self.assertIn(self.topics['respiration'], context)
+        self.assertNotIn(self.topics['mitose'], context)
+        self.assertLess(context.index('photosynthèse'), context.index('respiration'))
+
+    def test_index_is_built_once_per_text_and_reloaded_from_the_database(self):
+        built = retrieval.get_course_index(self.course)
+        retrieval._loaded.clear()
+        with mock.patch.object(retrieval.ChunkIndex, 'build') as build:
+            loaded = retrieval.get_course_index(self.twin)
+        build.assert_not_called()
+
+        self.assertEqual(CourseChunkIndex.objects.count(), 1)
+        self.assertEqual(loaded.chunks, built.chunks)
+        self.assertEqual(loaded.top_k('mitose cellule', 2), built.top_k('mitose cellule', 2))
+
+    def test_short_course_and_unrelated_question(self):
+        short = Course.objects.create(title='Court', user=self.course.user, extracted_text='Texte bref.')
+        self.assertEqual(retrieval.retrieve_context(short, 'mitose'), 'Texte bref.')
+        # Aucun terme en commun: début du cours
+        self.assertTrue(retrieval.retrieve_context(self.course, 'quantique').startswith(self.topics['photosynthèse']))
+
+
+class LLMCacheTests(TestCase):
+    messages = [{'role': 'user', 'content': 'Résume le cours.'}]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_l1_hit_refreshes_the_persistent_entry(self):
+        llm_cache.set('cle', 'réponse', 'modele')
+        old = timezone.now() - timezone.timedelta(days=10)
+        LLMResponseCache.objects.filter(key='cle').update(last_accessed_at=old)
+
+        with override_settings(AI_CACHE_TOUCH_INTERVAL=300):
+            self.assertEqual(llm_cache.get('cle'), 'réponse')  # L1 écrit à l'instant: pas de rafraîchissement
+        self.assertEqual(LLMResponseCache.objects.get(key='cle').last_accessed_at, old)
+
+        with override_settings(AI_CACHE_TOUCH_INTERVAL=0):
+            self.assertEqual(llm_cache.get('cle'), 'réponse')
+        entry = LLMResponseCache.objects.get(key='cle')
+        self.assertGreater(entry.last_accessed_at, old)
+        self.assertEqual(entry.hit_count, 1)
+
+    def test_regenerate_skips_cached_response_and_replaces_it(self):
+        with mock.patch.object(phi3_ai, '_request_completion', side_effect=['premier', 'second']) as request:
+            self.assertEqual(phi3_ai._chat_completion(self.messages), 'premier')
+            self.assertEqual(phi3_ai._chat_completion(self.messages), 'premier')
+            self.assertEqual(phi3_ai._chat_completion(self.messages, regenerate=True), 'second')
+            self.assertEqual(phi3_ai._chat_completion(self.messages), 'second')
+        self.assertEqual(request.call_count, 2)
+
+
+class QuizParsingTests(TestCase):
+    def test_json_quiz_skips_invalid_questions(self):
+        raw = """```json
+        {"questions": [
+            {"type": "multiple_choice", "question": "2 + 2 ?", "options": ["A) 3", "B) 4"], "answer": "B", "explanation": "Calcul."},
+            {"type": "multiple_choice", "question": "Capitale ?", "options": ["Paris", "Lyon"], "answer": "Marseille", "explanation": ""},
+            {"type": "true_false", "question": "La Terre est ronde.", "options": [], "answer": "true", "explanation": ""}
+        ]}
+        ```"""
+        questions = parse_quiz_json(raw)
+        self.assertEqual([q['correct_answer'] for q in questions], ['4', 'Vrai'])
+        self.assertEqual(questions[0]['options'], ['3', '4'])
+        self.assertEqual(questions[1]['options'], ['Vrai', 'Faux'])
+
+    def test_json_without_valid_question_is_rejected(self):
+        for raw in ('pas du json', '{"quiz": []}', '{"questions": [{"question": "?"}]}'):
+            with self.subTest(raw=raw), self.assertRaises(QuizParseError):
+                parse_quiz_json(raw)
+
+    def test_text_fallback_keeps_only_questions_with_a_known_answer(self):
+        raw = """1. Combien font 2 + 2 ?
+        A) 3
+        B) 4
+        Réponse correcte: B
+        Explication: Calcul.
+
+        2. Quelle est la capitale ?
+        A) Paris
+        B) Lyon
+
+        3. Le soleil est une étoile.
+        Vrai
+        Faux
+        Réponse correcte: Vrai
+
+        4. La lune est une planète.
+        Vrai
+        Faux
+        """
+        questions = parse_quiz(raw)
+        self.assertEqual(
+            [(q['question_text'], q['correct_answer']) for q in questions],
+            [('Combien font 2 + 2 ?', '4'), ('Le soleil est une étoile.', 'Vrai')],
+        )
+        self.assertEqual(questions[0]['explanation'], 'Calcul.')
+
+    def test_unrecognised_text_gives_no_question(self):
+        self.assertEqual(parse_quiz("Je ne peux pas générer de quiz."), [])
+
+    def test_generate_quiz_fails_without_usable_question(self):
+        with mock.patch.object(phi3_ai, '_chat_completion', return_value="Je ne peux pas générer de quiz."):
+            result = phi3_ai.generate_quiz('Texte du cours', num_chunks=1)
+        self.assertFalse(result['success'])
+        self.assertIn('Aucune question', result['error'])
+
+
+class CourseTextTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('auteur', password='pw')
+
+    def test_text_without_document_is_saved_in_course_content(self):
+        course = Course.objects.create(title='Cours', user=self.user, extracted_text='un deux trois')
+        course.extracted_text = 'un deux trois quatre'
+        course.save(update_fields=['extracted_text'])
+
+        course = Course.objects.get(pk=course.pk)
+        self.assertEqual(course.extracted_text, 'un deux trois quatre')
+        self.assertEqual(course.word_count, 4)
+
+    def test_text_of_shared_document_cannot_be_written_through_a_course(self):
+        document = CourseDocument.objects.create(sha256='0' * 64, file='documents/poly.pdf', extracted_text='Texte partagé')
+        course = Course.objects.create(title='Cours', user=self.user, document=document)
+
+        with self.assertRaises(ValueError):
+            course.extracted_text = 'Texte modifié'
+        self.assertEqual(Course.objects.get(pk=course.pk).extracted_text, 'Texte partagé')
+
+    def test_text_is_stored_compressed(self):
+        text = "Le déterminant d'une matrice carrée. " * 200
+        course = Course.objects.create(title='Cours', user=self.user, extracted_text=text)
+
+        stored = CourseContent.objects.filter(pk=course.pk).values_list('extracted_text', flat=True)
+        course_id = CourseContent._meta.pk.get_db_prep_value(course.pk, connection)
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT extracted_text FROM {CourseContent._meta.db_table} WHERE course_id = %s', [course_id])
+            raw = bytes(cursor.fetchone()[0])
+        self.assertEqual(stored.get(), text)
+        self.assertLess(len(raw), len(text.encode('utf-8')) // 10)
+        self.assertEqual(zlib.decompress(raw).decode('utf-8'), text)
+
+    def test_codec_is_read_from_the_payload(self):
+        self.assertEqual((compress_text(''), decompress_text(b'')), (b'', ''))
+        self.assertEqual(decompress_text(zlib.compress('é'.encode('utf-8'), 9)), 'é')
+        with self.assertRaises(RuntimeError), mock.patch('core.fields.zstandard', None):
+            decompress_text(b'\x28\xb5\x2f\xfd' + b'\x00' * 8)
+
+
+class ExtractionEnqueueTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user('auteur', password='pw')
+        self.course = Course.objects.create(title='Cours', user=user, processing_status='extracting')
+        self.job = AIProcessingJob.objects.create(job_type='text_extraction', course=self.course, user=user)
+
+    def test_broker_down_leaves_job_pending_instead_of_extracting_inline(self):
+        with mock.patch.object(extract_course_text_async, 'delay', side_effect=ConnectionError('broker')), \
+                mock.patch.object(extract_course_text_async, 'apply') as apply:
+            self.assertFalse(enqueue_text_extraction(self.course, self.job))
+        apply.assert_not_called()
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, 'pending')
+        self.assertIn('broker', self.job.error_message)
+
+        with mock.patch.object(extract_course_text_async, 'delay') as delay:
+            self.assertEqual(retry_pending_extractions_async(), 1)
+            self.assertEqual(retry_pending_extractions_async(), 0)
+        delay.assert_called_once_with(str(self.course.id), str(self.job.id))
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.error_message, '')
+
+
+class AnswerEvaluationTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user('auteur', password='pw')
+        quiz = Quiz.objects.create(course=Course.objects.create(title='Cours', user=user), title='Quiz')
+        question = Question.objects.create(
+            quiz=quiz, question_type='fill_blank', question_text='Auteur du théorème ?', correct_answer='Thomas Bayes',
+        )
+        self.qid = str(question.id)
+        self.attempt = QuizAttempt.objects.create(
+            quiz=quiz, answers={self.qid: 'thomas baye'}, total_questions=1, is_completed=True,
+            question_results=[{
+                'question_id': self.qid, 'options': [], 'correct_answer_index': None, 'correct_answer': 'Thomas Bayes',
+                'answer': 'thomas baye', 'selected_index': None, 'is_correct': False,
+            }],
+        )
+
+    def test_verdicts_go_to_question_results_and_answers_stay_raw(self):
+        results = evaluate_attempt_answers_async(str(self.attempt.id))
+        self.assertTrue(results[self.qid]['is_correct'])
+
+        attempt = QuizAttempt.objects.get(pk=self.attempt.pk)
+        self.assertEqual(attempt.answers, {self.qid: 'thomas baye'})
+        record = attempt.question_results[0]
+        self.assertEqual(record['answer'], 'thomas baye')
+        self.assertTrue(record['is_correct'])
+        self.assertEqual(record['evaluation_method'], 'char_ngram_cosine')
+        self.assertEqual(attempt.score, 1)
+        self.assertTrue(attempt.passed)
+
+        # Réponses déjà évaluées: rien à refaire
+        self.assertEqual(evaluate_attempt_answers_async(str(self.attempt.id)), {})
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'ok')
+
+    def log_message(self, *args):
+        pass
+
+
+class HTTPPoolTests(SimpleTestCase):
+    def setUp(self):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.host = f'http://127.0.0.1:{server.server_port}'
+        self.url = f'{self.host}/'
+        close_http_session()
+        self.addCleanup(close_http_session)
+
+    def test_connections_are_reused_across_calls(self):
+        for _ in range(3):
+            self.assertEqual(get_http_session().get(self.url, timeout=5).text, 'ok')
+
+        stats = get_pool_stats()
+        self.assertEqual(stats['requests_sent'], 3)
+        self.assertEqual((stats['connections_opened'], stats['connections_reused']), (1, 2))
+        self.assertEqual(stats['hosts'][self.host]['idle_connections'], 1)
+
+    def test_session_is_rebuilt_after_fork(self):
+        session = get_http_session()
+        self.assertIs(get_http_session(), session)
+        with mock.patch('core.http_pool.os.getpid', return_value=-1):
+            self.assertIsNot(get_http_session(), session)
+
+
+def make_pdf(page_texts):
+    """PDF minimal, une ligne de texte par page"""
+    objects = {1: b'<< /Type /Catalog /Pages 2 0 R >>', 3: b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>'}
+    kids = []
+    for number, text in enumerate(page_texts):
+        page_id, content_id = 4 + 2 * number, 5 + 2 * number
+        stream = f'BT /F1 12 Tf 72 720 Td ({text}) Tj ET'.encode('latin-1')
+        objects[page_id] = (f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {content_id} 0 R '
+                            f'/Resources << /Font << /F1 3 0 R >> >> >>').encode()
+        objects[content_id] = b'<< /Length %d >>\nstream\n%s\nendstream' % (len(stream), stream)
+        kids.append(f'{page_id} 0 R')
+    objects[2] = f'<< /Type /Pages /Kids [{" ".join(kids)}] /Count {len(kids)} >>'.encode()
+
+    body, offsets = io.BytesIO(b'%PDF-1.4\n'), {}
+    body.seek(0, io.SEEK_END)
+    for object_id in sorted(objects):
+        offsets[object_id] = body.tell()
+        body.write(b'%d 0 obj\n%s\nendobj\n' % (object_id, objects[object_id]))
+    xref = body.tell()
+    body.write(b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1))
+    for object_id in sorted(objects):
+        body.write(b'%010d 00000 n \n' % offsets[object_id])
+    body.write(b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref))
+    return body.getvalue()
+
+
+class ExtractionTests(SimpleTestCase):
+    def test_text_file_and_unsupported_format(self):
+        progress = mock.Mock()
+        result = extraction.extract_document(io.BytesIO('  Cours de chimie\n'.encode('utf-8')), 'text/plain', progress)
+
+        self.assertEqual(result.text, 'Cours de chimie')
+        self.assertEqual(result.as_dict()['word_count'], 3)
+        progress.assert_called_once_with(1, 1)
+        with self.assertRaises(extraction.ExtractionError):
+            extraction.extract_document(io.BytesIO(b''), 'image/png')
+
+    @override_settings(PDF_PARALLEL_MIN_PAGES=20, PDF_EXTRACTION_WORKERS=0)
+    def test_short_pdfs_and_daemon_workers_are_extracted_sequentially(self):
+        self.assertEqual(extraction._pdf_workers(19), 1)
+        with mock.patch('core.extraction.os.cpu_count', return_value=8):
+            self.assertEqual(extraction._pdf_workers(200), 4)
+            self.assertEqual(extraction._pdf_workers(20), 4)
+            self.assertEqual(extraction._pdf_workers(12), 1)
+            with mock.patch('core.extraction.multiprocessing.current_process') as current_process:
+                current_process.return_value.daemon = True
+                self.assertEqual(extraction._pdf_workers(200), 1)
+
+    @unittest.skipUnless(extraction.PyPDF2, 'PyPDF2 non installé')
+    @override_settings(PDF_PARALLEL_MIN_PAGES=4, PDF_EXTRACTION_WORKERS=2)
+    def test_parallel_pdf_extraction_keeps_page_order(self):
+        pages = [f'Page {number}' for number in range(1, 13)]
+        with tempfile.NamedTemporaryFile(suffix='.pdf') as pdf:
+            pdf.write(make_pdf(pages))
+            pdf.flush()
+            progress = mock.Mock()
+            with open(pdf.name, 'rb') as file:
+                parallel = extraction.extract_document(file, 'application/pdf', progress, path=pdf.name)
+                sequential = extraction.extract_document(file, 'application/pdf')
+
+        self.assertEqual(parallel.workers, 2)
+        self.assertEqual(parallel.text.split('\n\n'), pages)
+        self.assertEqual((parallel.text, parallel.pages), (sequential.text, sequential.pages))
+        progress.assert_called_with(12, 12)
+
+    @unittest.skipUnless(extraction.PyPDF2, 'PyPDF2 non installé')
+    @override_settings(PDF_PARALLEL_MIN_PAGES=4, PDF_EXTRACTION_WORKERS=2)
+    def test_broken_pool_falls_back_to_sequential_extraction(self):
+        with tempfile.NamedTemporaryFile(suffix='.pdf') as pdf:
+            pdf.write(make_pdf([f'Page {number}' for number in range(1, 9)]))
+            pdf.flush()
+            with mock.patch('core.extraction._extract_pages_parallel', side_effect=AssertionError('daemonic')), \
+                    open(pdf.name, 'rb') as file:
+                result = extraction.extract_document(file, 'application/pdf', path=pdf.name)
+
+        self.assertEqual((result.workers, result.pages), (1, 8))
+        self.assertTrue(result.text.startswith('Page 1'))
+
+
+class DocumentDeduplicationTests(TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        settings_override = override_settings(MEDIA_ROOT=directory)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = User.objects.create_user('auteur', password='pw')
+
+    def upload(self, content=b'%PDF-1.4 contenu du cours', name='cours.pdf'):
+        course = Course(title='Cours', user=self.user)
+        extracted = attach_document(course, SimpleUploadedFile(name, content, extraction.guess_content_type(name)))
+        course.save()
+        return course, extracted
+
+    def test_same_content_shares_one_document_and_file(self):
+        first, extracted = self.upload()
+        self.assertFalse(extracted)
+        CourseDocument.objects.filter(pk=first.document_id).update(
+            extraction_status='completed', extraction_stats={'word_count': 4, 'char_count': 20, 'pages': 2},
+        )
+
+        second, extracted = self.upload()
+        self.assertTrue(extracted)
+        self.assertEqual(CourseDocument.objects.count(), 1)
+        self.assertEqual((second.document_id, second.file.name), (first.document_id, first.file.name))
+        self.assertEqual((second.word_count, second.page_count), (4, 2))
+
+    def test_extraction_stores_text_stats_on_every_course_of_the_document(self):
+        content = ' '.join(['mot'] * 1200).encode('utf-8')
+        first, _ = self.upload(content, 'cours.txt')
+        self.upload(content, 'copie.txt')
+        job = AIProcessingJob.objects.create(job_type='text_extraction', course=first, user=self.user)
+
+        extract_course_text_async.apply(args=(str(first.id), str(job.id)))
+
+        stats = Course.objects.filter(document=first.document_id).values_list(*Course.TEXT_STATS_FIELDS)
+        self.assertEqual(list(stats), [(1200, 4799, 0, 6)] * 2)
+        third, extracted = self.upload(content, 'cours.txt')
+        self.assertTrue(extracted)
+        self.assertEqual((third.word_count, third.estimated_duration), (1200, 6))
+
+    def test_second_upload_during_extraction_waits_for_the_running_task(self):
+        self.client.force_login(self.user)
+        content = ' '.join(['mot'] * 300).encode('utf-8')
+
+        def create(title):
+            upload = SimpleUploadedFile('cours.txt', content, 'text/plain')
+            self.client.post(reverse('create_course'), {'title': title, 'file': upload}, secure=True)
+            return Course.objects.get(title=title)
+
+        with mock.patch.object(extract_course_text_async, 'delay') as delay:
+            first = create('Premier')
+            second = create('Second')
+        delay.assert_called_once()
+        self.assertEqual(AIProcessingJob.objects.filter(job_type='text_extraction').count(), 1)
+        self.assertEqual(second.processing_status, 'extracting')
+        status = self.client.get(reverse('course_processing_status', args=[second.id]), secure=True).json()
+        self.assertEqual(status['job_status'], 'pending')
+
+        extract_course_text_async.apply(args=delay.call_args.args)
+        self.assertEqual(
+            list(Course.objects.filter(document=first.document_id).values_list('processing_status', 'word_count')),
+            [('pending', 300)] * 2,
+        )
+
+    def test_storing_a_shared_summary_does_not_load_the_document(self):
+        course, _ = self.upload()
+        course = Course.objects.only('id', 'document').get(pk=course.pk)
+        with CaptureQueriesContext(connection) as queries:
+            store_shared_summary(course, 'intermediate', 'french', 'Résumé partagé.')
+        document_reads = [query for query in queries.captured_queries
+                          if query['sql'].startswith('SELECT') and 'core_coursedocument' in query['sql']]
+        self.assertEqual(len(document_reads), 1)
+
+        other, _ = self.upload()
+        self.assertEqual(shared_summary(other, 'intermediate', 'french'), 'Résumé partagé.')
+
+    def test_different_content_gets_its_own_document(self):
+        first, _ = self.upload()
+        second, _ = self.upload(b'%PDF-1.4 un autre cours')
+        self.assertNotEqual(first.file.name, second.file.name)
+        self.assertEqual(CourseDocument.objects.count(), 2)
+
+
+class MaterializeQuizTests(TestCase):
+    def setUp(self):
+        self.course = Course.objects.create(title='Cours', user=User.objects.create_user('auteur', password='pw'))
+        self.questions = [
+            {'question_text': f'Question {i} ?', 'question_type': 'multiple_choice', 'options': ['a', 'b'],
+             'correct_answer': 'a', 'explanation': ''}
+            for i in range(1, 6)
+        ]
+
+    def test_questions_are_inserted_at_once_in_order(self):
+        with CaptureQueriesContext(connection) as queries:
+            quiz = materialize_quiz(self.course, self.questions, 'hard')
+        inserts = [query['sql'] for query in queries.captured_queries if query['sql'].startswith('INSERT')]
+
+        self.assertEqual(len(inserts), 2)
+        self.assertEqual(quiz.difficulty, 'hard')
+        self.assertEqual(
+            list(quiz.questions.order_by('order').values_list('order', 'question_text')),
+            [(i, f'Question {i} ?') for i in range(1, 6)],
+        )
+
+    def test_failed_insert_leaves_no_empty_quiz(self):
+        with mock.patch.object(Question.objects, 'bulk_create', side_effect=RuntimeError('base indisponible')):
+            with self.assertRaises(RuntimeError):
+                materialize_quiz(self.course, self.questions)
+        self.assertFalse(Quiz.objects.filter(course=self.course).exists())
+
+
+class CourseProcessingPipelineTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user('auteur', password='pw')
+        self.course = Course.objects.create(
+            title='Cours', user=user, extracted_text="Le déterminant d'une matrice. La matrice inverse. " * 5,
+        )
+        # Canvas exécuté dans le processus, sans broker
+        celery_app.conf.task_always_eager = True
+        self.addCleanup(setattr, celery_app.conf, 'task_always_eager', False)
+
+    def run_pipeline(self, quiz_result):
+        summary = {'success': True, 'summary': 'Résumé.', 'summary_data': {'level': 'intermediate'}}
+        with mock.patch('core.tasks.get_ai_summary', return_value=summary) as get_summary, \
+                mock.patch('core.tasks.get_ai_quiz', return_value=quiz_result), \
+                mock.patch.object(phi3_ai, 'condense', return_value=('texte condensé', 1)) as condense:
+            job_id = process_course_async(str(self.course.id))
+        # Texte lu et condensé une seule fois pour les trois étapes
+        condense.assert_called_once()
+        self.assertEqual(get_summary.call_args.args[0], 'texte condensé')
+        return AIProcessingJob.objects.get(id=job_id), Course.objects.with_content().get(pk=self.course.pk)
+
+    def test_steps_share_the_context_and_results_are_saved_once(self):
+        quiz = {'success': True, 'questions': [{
+            'question_text': '2 + 2 ?', 'question_type': 'multiple_choice', 'options': ['3', '4'],
+            'correct_answer': '4', 'explanation': '',
+        }]}
+        job, course = self.run_pipeline(quiz)
+
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(job.children.filter(status='completed').count(), 3)
+        self.assertEqual((course.processing_status, course.summary), ('completed', 'Résumé.'))
+        self.assertTrue(course.key_concepts)
+        self.assertEqual(Quiz.objects.get(pk=job.output_data['quiz_id']).questions.count(), 1)
+
+    def test_failed_step_leaves_a_partial_result(self):
+        job, course = self.run_pipeline({'success': False, 'error': 'quota'})
+
+        self.assertEqual(course.processing_status, 'partial')
+        self.assertEqual(job.children.get(job_type='quiz_generation').status, 'failed')
+        self.assertEqual(job.output_data['quiz'], {'success': False, 'error': 'quota'})
+        self.assertNotIn('quiz_id', job.output_data)
+
+
+class SessionStoreTests(TestCase):
+    store = SessionStore
+
+    def setUp(self):
+        cache.clear()
+
+    def create_session(self, **data):
+        session = self.store()
+        session.update(data)
+        session.create()
+        return session.session_key
+
+    def count_writes(self, session):
+        with CaptureQueriesContext(connection) as context:
+            session.save()
+        return sum(query['sql'].startswith('UPDATE') for query in context.captured_queries)
+
+    @override_settings(SESSION_SAVE_INTERVAL=60)
+    def test_unchanged_session_is_not_rewritten_within_interval(self):
+        key = self.create_session(panier='quiz')
+        session = self.store(key)
+        session['panier'] = 'cours'
+        session.save()
+
+        session = self.store(key)
+        self.assertEqual(session['panier'], 'cours')
+        self.assertEqual(self.count_writes(session), 0)
+
+        session['panier'] = 'quiz'
+        self.assertEqual(self.count_writes(session), 1)
+
+    @override_settings(SESSION_SAVE_INTERVAL=0)
+    def test_unchanged_session_is_rewritten_after_interval(self):
+        key = self.create_session(panier='quiz')
+        session = self.store(key)
+        session.load()
+        self.assertEqual(self.count_writes(session), 1)
+
+    def test_corrupted_session_is_deleted_and_replaced(self):
+        key = self.create_session(panier='quiz')
+        Session.objects.filter(session_key=key).update(session_data='pas-une-session')
+        cache.clear()
+
+        session = self.store(key)
+        self.assertEqual(session.load(), {})
+        self.assertFalse(Session.objects.filter(session_key=key).exists())
+        self.assertIsNone(session.session_key)
+
+        session['panier'] = 'cours'
+        session.save()
+        self.assertNotEqual(session.session_key, key)
+        self.assertEqual(self.store(session.session_key)['panier'], 'cours')
+
+
+class DatabaseSessionStoreTests(SessionStoreTests):
+    """Moteur choisi sans cache partagé (cache mémoire par processus)"""
+    store = DBSessionStore
+
+    def test_default_engine_skips_session_writes_between_requests(self):
+        self.assertEqual(settings.SESSION_ENGINE, 'core.sessions.db')
+        self.client.force_login(User.objects.create_user('etudiant', password='pw'))
+        self.client.get(reverse('dashboard'), secure=True)
+
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(self.client.get(reverse('dashboard'), secure=True).status_code, 200)
+        self.assertFalse([query for query in context.captured_queries
+                          if query['sql'].startswith('UPDATE') and 'django_session' in query['sql']])
+
+
+class QuizPayloadCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create_user('auteur', password='pw')
+        course = Course.objects.create(title='Cours', user=user)
+        self.quiz = Quiz.objects.create(course=course, title='Quiz')
+        self.question = Question.objects.create(
+            quiz=self.quiz, question_type='multiple_choice', question_text='2 + 2 ?',
+            options=['3', '4', '5'], correct_answer='4',
+        )
+
+    def correct_index(self):
+        return get_quiz_payload(Quiz.objects.get(pk=self.quiz.pk))['questions'][0]['correct_index']
+
+    def test_question_edit_changes_the_cache_key(self):
+        self.assertEqual(self.correct_index(), 1)
+        with self.assertNumQueries(1):  # Quiz seul: payload lu dans le cache
+            self.correct_index()
+
+        # Rien n'est supprimé du cache (les caches des autres processus ne le seraient
+        # pas): c'est la clé qui change
+        self.question.correct_answer = '5'
+        self.question.save()
+
+        self.assertEqual(self.correct_index(), 2)
+
+    def test_shuffle_setting_is_part_of_the_key(self):
+        self.assertTrue(get_quiz_payload(self.quiz)['shuffle_questions'])
+        self.quiz.shuffle_questions = False
+        self.quiz.save(update_fields=['shuffle_questions'])
+        self.assertFalse(get_quiz_payload(self.quiz)['shuffle_questions'])
+
+
+class QuizFixtureMixin:
+    """Quiz public de trois questions (deux QCM, un Vrai/Faux)"""
+
+    def create_quiz(self):
+        user = User.objects.create_user('auteur', password='pw')
+        course = Course.objects.create(title='Cours', user=user, status='published', is_public=True)
+        quiz = Quiz.objects.create(course=course, title='Quiz')
+        Question.objects.bulk_create([
+            Question(quiz=quiz, order=1, question_type='multiple_choice', question_text='2 + 2 ?',
+                     options=['3', '4', '5', '6'], correct_answer='4'),
+            Question(quiz=quiz, order=2, question_type='multiple_choice', question_text='Capitale ?',
+                     options=['Lyon', 'Paris', 'Nice'], correct_answer='Paris'),
+            Question(quiz=quiz, order=3, question_type='true_false', question_text='Le ciel est bleu.',
+                     options=['Vrai', 'Faux'], correct_answer='Vrai'),
+        ])
+        return quiz
+
+
+class SeededShuffleTests(QuizFixtureMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.quiz = self.create_quiz()
+
+    def test_same_seed_gives_same_game(self):
+        first = build_quiz_data(self.quiz, seed=42)['questions']
+        self.assertEqual(build_quiz_data(self.quiz, seed=42)['questions'], first)
+        for item in first:
+            self.assertEqual(item['options'][item['correct_answer_index']], item['question']['options'][item['question']['correct_index']])
+
+    def test_submitted_seed_grades_the_displayed_game(self):
+        played = build_quiz_data(self.quiz, seed=7)['questions']
+        data = {'shuffle_seed': '7'}
+        for item in played:
+            data[f"question_{item['question']['id']}"] = str(item['correct_answer_index'])
+
+        response = self.client.post(reverse('game_quiz', args=[self.quiz.id]), data, secure=True)
+        attempt = QuizAttempt.objects.get(quiz=self.quiz)
+        self.assertRedirects(response, reverse('quiz_results', args=[attempt.id]), fetch_redirect_response=False)
+
+        self.assertEqual((attempt.shuffle_seed, attempt.score), (7, 3))
+        # Résultats relus tels qu'enregistrés, dans l'ordre affiché
+        rows = attempt_results(attempt)
+        self.assertEqual([row['question']['id'] for row in rows], [item['question']['id'] for item in played])
+        self.assertEqual([row['user_answer'] for row in rows], [row['correct_answer'] for row in rows])
+
+        # Page de résultats: score enregistré, sans relire la correction par question
+        with mock.patch('core.views.attempt_results') as results:
+            response = self.client.get(reverse('quiz_results', args=[attempt.id]), secure=True)
+        self.assertEqual(response.status_code, 200)
+        results.assert_not_called()
+
+    def test_free_text_answers_are_evaluated_from_both_game_views(self):
+        question = Question.objects.create(quiz=self.quiz, order=4, question_type='fill_blank',
+                                           question_text='Le ___ de Pythagore.', correct_answer='théorème')
+        for view in ('game_quiz', 'debug_game_quiz'):
+            with self.subTest(view=view), mock.patch('core.views.enqueue_answer_evaluation') as enqueue:
+                data = {'shuffle_seed': '7', f'answer_{question.id}': 'theoreme'}
+                self.client.post(reverse(view, args=[self.quiz.id]), data, secure=True)
+                attempt = QuizAttempt.objects.filter(quiz=self.quiz).latest('completed_at')
+                enqueue.assert_called_once_with(attempt)
+                self.assertEqual(attempt.answers, {str(question.id): 'theoreme'})
+
+
+class GradingEngineTests(QuizFixtureMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.quiz = self.create_quiz()
+        self.data = build_quiz_data(self.quiz, seed=3)
+        self.played = {item['question']['question_text']: item for item in self.data['questions']}
+
+    def answer(self, text, option):
+        item = self.played[text]
+        return item['question']['id'], str(item['options'].index(option))
+
+    def test_grade_reads_each_answer_by_question_id(self):
+        answers = dict([self.answer('2 + 2 ?', '4'), self.answer('Capitale ?', 'Lyon')])
+        answers[self.played['Le ciel est bleu.']['question']['id']] = '9'  # index hors limites
+
+        records = {r['question_id']: r for r in GradingEngine(self.data['payload']).grade(self.data['questions'], answers)}
+        ids = {text: item['question']['id'] for text, item in self.played.items()}
+        self.assertTrue(records[ids['2 + 2 ?']]['is_correct'])
+        self.assertFalse(records[ids['Capitale ?']]['is_correct'])
+        self.assertIsNone(records[ids['Le ciel est bleu.']]['selected_index'])
+        self.assertFalse(records[ids['Le ciel est bleu.']]['is_correct'])
+
+    def test_regrade_after_question_edit(self):
+        from core.views import correct_quiz_answers
+
+        answers = dict([self.answer('2 + 2 ?', '4'), self.answer('Capitale ?', 'Lyon')])
+        results = correct_quiz_answers(self.data, answers)
+        attempt = QuizAttempt.objects.create(
+            quiz=self.quiz, answers=answers, shuffle_seed=3, question_results=results['question_results'],
+            score=results['score'], total_questions=3, is_completed=True,
+        )
+        self.assertEqual(attempt.score, 1)
+
+        question = Question.objects.get(quiz=self.quiz, question_text='Capitale ?')
+        question.correct_answer = 'Lyon'
+        question.save()
+        self.assertEqual(regrade_quiz_attempts(Quiz.objects.get(pk=self.quiz.pk)), 1)
+
+        attempt.refresh_from_db()
+        self.assertEqual(attempt.score, 2)
+        self.assertEqual(Quiz.objects.get(pk=self.quiz.pk).total_score, attempt.score_percentage)
+
+    def test_renaming_the_correct_option_keeps_attempts_correct(self):
+        from core.views import correct_quiz_answers
+
+        answers = dict([self.answer('2 + 2 ?', '4'), self.answer('Capitale ?', 'Paris')])
+        results = correct_quiz_answers(self.data, answers)
+        attempt = QuizAttempt.objects.create(
+            quiz=self.quiz, answers=answers, shuffle_seed=3, question_results=results['question_results'],
+            score=results['score'], total_questions=3, is_completed=True,
+        )
+        quiz_stats = Quiz.objects.values_list('total_score', 'passed_attempts').get(pk=self.quiz.pk)
+
+        question = Question.objects.get(quiz=self.quiz, question_text='Capitale ?')
+        question.options = ['Paris (France)' if option == 'Paris' else option for option in question.options]
+        question.correct_answer = 'Paris (France)'
+        question.save()
+        regrade_quiz_attempts(Quiz.objects.get(pk=self.quiz.pk))
+
+        attempt.refresh_from_db()
+        record = next(r for r in attempt.question_results if r['question_id'] == str(question.id))
+        self.assertEqual(attempt.score, 2)
+        self.assertTrue(record['is_correct'])
+        self.assertEqual(record['options'][record['selected_index']], 'Paris (France)')
+        self.assertEqual(Quiz.objects.values_list('total_score', 'passed_attempts').get(pk=self.quiz.pk), quiz_stats)
+
+
+class QuizStatisticsTests(TestCase):
+    FIELDS = ('total_attempts', 'total_score', 'passed_attempts', 'average_score', 'success_rate')
+
+    def setUp(self):
+        user = User.objects.create_user('auteur', password='pw')
+        self.quiz = Quiz.objects.create(course=Course.objects.create(title='Cours', user=user), title='Quiz')
+
+    def attempt(self, score, completed=True):
+        return QuizAttempt.objects.create(quiz=self.quiz, score=score, total_questions=4, is_completed=completed)
+
+    def stats(self):
+        return Quiz.objects.filter(pk=self.quiz.pk).values(*self.FIELDS).get()
+
+    def test_incremental_updates_match_full_recount(self):
+        self.attempt(4)
+        regraded = self.attempt(1)
+        deleted = self.attempt(3)
+        in_progress = self.attempt(0, completed=False)
+
+        regraded.score = 3
+        regraded.save()
+        deleted.delete()
+        in_progress.score = 2
+        in_progress.is_completed = True
+        in_progress.save()
+
+        incremental = self.stats()
+        self.assertEqual(incremental['total_attempts'], 3)
+        self.assertEqual(incremental['passed_attempts'], 2)
+        repair_quiz_statistics_async()
+        self.assertEqual(self.stats(), incremental)
+
+
+class AsyncMiddlewareChainTests(TestCase):
+    def test_asgi_chain_runs_without_thread_adaptation(self):
+        """Sous ASGI, aucun middleware ne fait passer les requêtes par un thread (hors debug toolbar)"""
+        middleware = [name for name in settings.MIDDLEWARE if not name.startswith('debug_toolbar')]
+        with override_settings(MIDDLEWARE=middleware, DEBUG=True), self.assertLogs('django.request', logging.DEBUG) as logs:
+            logging.getLogger('django.request').debug('chaîne chargée')  # assertLogs exige au moins une ligne
+            ASGIHandler()
+        self.assertEqual([line for line in logs.output if 'adapted' in line], [])
@@ -18,6 +18,7 @@ urlpatterns = [
     
     # Gestion des cours
     path('course/<uuid:course_id>/', views.course_detail, name='course_detail'),
+    path('course/<uuid:course_id>/status/', views.course_processing_status, name='course_processing_status'),
     path('course/<uuid:course_id>/delete/', views.delete_course, name='delete_course'),
     
     # Quiz gaming mode
@@ -31,8 +32,10 @@ urlpatterns = [
     path('ai/dashboard/', views_ai.ai_dashboard, name='ai_dashboard'),
     path('ai/settings/', views_ai.ai_settings, name='ai_settings'),
     path('ai/course/<uuid:course_id>/summary/', views_ai.phi3_summary_view, name='ai_summary'),
+    path('ai/course/<uuid:course_id>/summary/stream/', views_ai.phi3_summary_stream_view, name='ai_summary_stream'),
     path('ai/course/<uuid:course_id>/quiz/', views_ai.phi3_quiz_view, name='ai_quiz'),
     path('ai/course/<uuid:course_id>/chat/', views_ai.phi3_chat_view, name='ai_chat'),
+    path('ai/course/<uuid:course_id>/chat/stream/', views_ai.phi3_chat_stream_view, name='ai_chat_stream'),
     path('ai/course/<uuid:course_id>/resume-result/', views_ai.ai_summary_result, name='ai_summary_result'),
     
     # APIs IA rapides
@@ -8,89 +8,14 @@ from django.http import JsonResponse
 from django.utils import timezone
 from .models import Course, Quiz, QuizAttempt
 from .forms import CourseUploadForm, CustomUserCreationForm
+from .tasks import enqueue_answer_evaluation, enqueue_text_extraction
+from .documents import attach_document, claim_extraction
+from .grading import GradingEngine
+from .quiz_payload import attempt_results, build_quiz_data
+from ai_engine.models import AIProcessingJob
+import logging
 
-try:
-    import PyPDF2
-except ImportError:
-    PyPDF2 = None
-
-try:
-    from docx import Document
-except ImportError:
-    Document = None
-
-
-def extract_text_from_file(uploaded_file):
-    """
-    Extrait le texte d'un fichier uploadé selon son type MIME
-    Supporte: TXT, PDF, DOCX
-    """
-    content_type = uploaded_file.content_type
-    text = ''
-    
-    try:
-        if content_type == 'text/plain':
-            # Fichier TXT
-            uploaded_file.seek(0)  # Remettre le curseur au début
-            text = uploaded_file.read().decode('utf-8', errors='ignore')
-            
-        elif content_type == 'application/pdf':
-            # Fichier PDF
-            if not PyPDF2:
-                raise Exception('PyPDF2 n\'est pas installé. Installez-le avec: pip install PyPDF2')
-            
-            uploaded_file.seek(0)
-            
-            try:
-                reader = PyPDF2.PdfReader(uploaded_file)
-                pages_text = []
-                
-                for page_num in range(len(reader.pages)):
-                    try:
-                        page = reader.pages[page_num]
-                        page_text = page.extract_text()
-                        if page_text and page_text.strip():
-                            pages_text.append(page_text.strip())
-                    except Exception as page_error:
-                        print(f"⚠️ Erreur page {page_num + 1}: {str(page_error)}")
-                        continue
-                
-                text = '\n\n'.join(pages_text)
-                
-                if not text.strip():
-                    raise Exception('Aucun texte lisible trouvé dans le PDF. Le fichier peut être corrompu, protégé par mot de passe, ou contenir uniquement des images.')
-                    
-            except PyPDF2.errors.PdfReadError as pdf_error:
-                raise Exception(f'Erreur de lecture PDF: {str(pdf_error)}. Le fichier peut être corrompu ou protégé.')
-            except Exception as pdf_error:
-                if 'EOF marker not found' in str(pdf_error):
-                    raise Exception('Le fichier PDF est corrompu ou incomplet. Veuillez vérifier que le fichier a été correctement téléchargé.')
-                else:
-                    raise Exception(f'Erreur lors de l\'extraction PDF: {str(pdf_error)}')
-            
-        elif content_type in ['application/vnd.openxmlformats-officedocument.wordprocessingml.document', 
-                             'application/msword']:
-            # Fichier DOCX ou DOC
-            if not Document:
-                raise Exception('python-docx n\'est pas installé. Installez-le avec: pip install python-docx')
-            
-            uploaded_file.seek(0)
-            doc = Document(uploaded_file)
-            paragraphs = []
-            
-            for paragraph in doc.paragraphs:
-                if paragraph.text.strip():
-                    paragraphs.append(paragraph.text.strip())
-            
-            text = '\n\n'.join(paragraphs)
-            
-        else:
-            raise Exception(f'Format de fichier non supporté: {content_type}')
-            
-    except Exception as e:
-        raise Exception(f'Erreur lors de l\'extraction du texte: {str(e)}')
-    
-    return text.strip()
+logger = logging.getLogger(__name__)
 
 
 def home(request):
@@ -186,31 +111,48 @@ def create_course(request):
         if form.is_valid():
             course: Course = form.save(commit=False)
             course.user = request.user
-            
-            try:
-                # Extraire le texte du fichier uploadé
-                uploaded_file = request.FILES['file']
-                extracted_text = extract_text_from_file(uploaded_file)
-                course.extracted_text = extracted_text
-                course.save()
-                
-                if course.extracted_text.strip():
-                    messages.success(request, f'Cours créé avec succès ! {len(extracted_text)} caractères extraits.')
-                    return redirect('course_detail', course_id=course.id)
-                else:
-                    messages.warning(request, 'Cours créé mais aucun texte n\'a pu être extrait.')
-                    return redirect('course_detail', course_id=course.id)
-                
-            except Exception as e:
-                messages.error(request, f'Erreur lors de l\'extraction du texte: {str(e)}')
-                return render(request, 'create_course.html', {'form': form})
+
+            # Fichier déjà uploadé par un autre cours: stockage et texte partagés
+            uploaded_file = request.FILES['file']
+            already_extracted = attach_document(course, uploaded_file)
+
+            # L'extraction du texte (PDF volumineux...) se fait en tâche de fond
+            course.processing_status = 'pending' if already_extracted else 'extracting'
+            course.save()
+
+            if already_extracted:
+                messages.success(request, 'Cours créé ! Ce document a déjà été analysé, son texte est disponible.')
+                return redirect('course_detail', course_id=course.id)
+
+            if not claim_extraction(course):
+                # Même fichier en cours d'extraction pour un autre cours: pas de seconde extraction
+                messages.success(request, "Cours créé ! Ce document est déjà en cours d'analyse, son texte sera bientôt disponible.")
+                return redirect('course_detail', course_id=course.id)
+
+            job = AIProcessingJob.objects.create(
+                job_type='text_extraction',
+                course=course,
+                user=request.user,
+                status='pending',
+                input_data={
+                    'file_name': uploaded_file.name,
+                    'content_type': uploaded_file.content_type,
+                    'size': uploaded_file.size,
+                }
+            )
+            if not enqueue_text_extraction(course, job):
+                messages.warning(request, "Cours créé ! L'extraction du texte est différée, elle sera relancée automatiquement.")
+                return redirect('course_detail', course_id=course.id)
+
+            messages.success(request, 'Cours créé ! Extraction du texte en cours...')
+            return redirect('course_detail', course_id=course.id)
     else:
         form = CourseUploadForm()
     return render(request, 'create_course.html', {'form': form})
 
 
 def course_detail(request, course_id: str):
-    course = get_object_or_404(Course, id=course_id)
+    course = get_object_or_404(Course.objects.with_content(), id=course_id)
 
     # Vérifier les permissions d'accès
     if not course.is_public:
@@ -232,6 +174,29 @@ def course_detail(request, course_id: str):
     })
 
 
+def course_processing_status(request, course_id):
+    """État de l'extraction du texte d'un cours (interrogé par course_detail)"""
+    course = get_object_or_404(
+        Course.objects.only('id', 'user', 'is_public', 'processing_status', 'document'), id=course_id
+    )
+    if not course.is_public and (not request.user.is_authenticated or course.user_id != request.user.id):
+        from django.http import Http404
+        raise Http404("Cours non trouvé ou accès non autorisé")
+
+    jobs = AIProcessingJob.objects.filter(job_type='text_extraction').only('status', 'progress', 'error_message', 'output_data')
+    job = jobs.filter(course_id=course.id).first()
+    if job is None and course.document_id:
+        # Extraction lancée par un autre cours du même document
+        job = jobs.filter(course__document_id=course.document_id).order_by('-created_at').first()
+    return JsonResponse({
+        'processing_status': course.processing_status,
+        'job_status': job.status if job else None,
+        'progress': job.progress if job else 0,
+        'error': job.error_message if job else '',
+        'char_count': job.output_data.get('char_count') if job else None,
+    })
+
+
 def quiz_detail(request, quiz_id: str):
     quiz = get_object_or_404(Quiz, id=quiz_id)
 
@@ -244,66 +209,24 @@ def quiz_detail(request, quiz_id: str):
     return render(request, 'quiz_detail.html', {'quiz': quiz, 'questions': questions})
 
 
-def create_quiz_data(quiz):
+def create_quiz_data(quiz, seed=None):
     """
     Fonction qui sépare les questions des réponses et prépare les données du quiz
     Avec mélange des options pour rendre le jeu moins prévisible
+
+    Les questions sont compilées une fois par version du quiz et mises en
+    cache (core/quiz_payload.py); le mélange est dérivé de ``seed``, qui
+    redonne la même partie.
     """
-    import random
-    questions = list(quiz.questions.all())
-    # Mélanger les questions pour plus de variété
-    random.shuffle(questions)
+    return build_quiz_data(quiz, seed)
 
-    quiz_data = {
-        'quiz': quiz,
-        'questions': [],
-        'correct_answers': {},  # Réponses correctes comme indices (0, 1, 2, 3)
-        'total_questions': len(questions)
-    }
 
-    for question in questions:
-        question_data = {
-            'question': question,
-            'options': question.options if question.options else [],
-            'correct_answer_index': 0
-        }
-
-        if question.question_type == 'multiple_choice' and question.options:
-            # Mélanger les options pour rendre le jeu moins prévisible
-            options_copy = question.options.copy()
-            random.shuffle(options_copy)
-            question_data['options'] = options_copy
-            
-            # Trouver l'index de la bonne réponse dans les options mélangées
-            try:
-                correct_answer_index = options_copy.index(question.correct_answer)
-                question_data['correct_answer_index'] = correct_answer_index
-                # Stocker l'index de la réponse correcte
-                quiz_data['correct_answers'][str(question.id)] = correct_answer_index
-            except ValueError:
-                # Si la réponse correcte n'est pas trouvée dans les options
-                print(f"DEBUG: Correct answer '{question.correct_answer}' not found in options: {options_copy}")
-                # Utiliser la première option comme fallback
-                question_data['correct_answer_index'] = 0
-                quiz_data['correct_answers'][str(question.id)] = 0
-        else:
-            # Pour les questions vrai/faux - mélanger l'ordre
-            tf_options = ['Vrai', 'Faux']
-            random.shuffle(tf_options)
-            question_data['options'] = tf_options
-            
-            # Déterminer l'index correct après mélange
-            if question.correct_answer.lower() in ['vrai', 'true', 'a']:
-                correct_answer_index = tf_options.index('Vrai')
-            else:
-                correct_answer_index = tf_options.index('Faux')
-            
-            question_data['correct_answer_index'] = correct_answer_index
-            quiz_data['correct_answers'][str(question.id)] = correct_answer_index
-
-        quiz_data['questions'].append(question_data)
-
-    return quiz_data
+def _shuffle_seed(request):
+    """Graine du mélange affiché au joueur (champ caché du formulaire de jeu)"""
+    try:
+        return int(request.POST.get('shuffle_seed', ''))
+    except ValueError:
+        return None
 
 
 def render_quiz_game(request, quiz_data):
@@ -312,7 +235,8 @@ def render_quiz_game(request, quiz_data):
     """
     return render(request, 'game_quiz.html', {
         'quiz': quiz_data['quiz'],
-        'questions_data': quiz_data['questions']
+        'questions_data': quiz_data['questions'],
+        'shuffle_seed': quiz_data['seed']
     })
 
 
@@ -322,7 +246,8 @@ def render_quiz_game_simple(request, quiz_data):
     """
     return render(request, 'game_quiz_simple.html', {
         'quiz': quiz_data['quiz'],
-        'questions_data': quiz_data['questions']
+        'questions_data': quiz_data['questions'],
+        'shuffle_seed': quiz_data['seed']
     })
 
 
@@ -332,60 +257,70 @@ def render_quiz_game_debug(request, quiz_data):
     """
     return render(request, 'game_quiz_debug.html', {
         'quiz': quiz_data['quiz'],
-        'questions_data': quiz_data['questions']
+        'questions_data': quiz_data['questions'],
+        'shuffle_seed': quiz_data['seed']
     })
 
 
 def correct_quiz_answers(quiz_data, user_answers):
     """
     Fonction qui corrige les réponses et calcule le score
-    """
-    correct_answers = quiz_data['correct_answers']
-    score = 0
-    results = {}
-
-    for question_id, user_answer in user_answers.items():
-        if question_id in correct_answers:
-            correct_answer = correct_answers[question_id]
-
-            # Trouver la question correspondante
-            question_data = None
-            for q in quiz_data['questions']:
-                if str(q['question'].id) == question_id:
-                    question_data = q
-                    break
-
-            if question_data:
-                is_correct = False
-
-                if question_data['question'].question_type == 'multiple_choice':
-                    # L'utilisateur envoie l'index (0, 1, 2, 3), on compare directement les indices
-                    try:
-                        selected_index = int(user_answer)
-                        is_correct = selected_index == correct_answer
-                    except (ValueError, IndexError):
-                        is_correct = False
-                else:
-                    # Pour les questions vrai/faux, comparer directement en string (robuste)
-                    is_correct = str(user_answer).strip().lower() == str(correct_answer).strip().lower()
-
-                results[question_id] = {
-                    'user_answer': user_answer,
-                    'correct_answer': correct_answer,
-                    'is_correct': is_correct
-                }
 
-                if is_correct:
-                    score += 1
+    ``question_results`` est la correction par question à stocker sur la
+    tentative (voir core/grading.py), obtenue en un seul passage.
+    """
+    question_results = GradingEngine(quiz_data['payload']).grade(quiz_data['questions'], user_answers)
+    score = sum(1 for record in question_results if record['is_correct'])
 
     return {
         'score': score,
         'total_questions': quiz_data['total_questions'],
         'percentage': round((score / quiz_data['total_questions'] * 100), 2) if quiz_data['total_questions'] > 0 else 0.00,
-        'results': results
+        'results': {record['question_id']: record for record in question_results if record['answer'] != ''},
+        'question_results': question_results
     }
 
 
+def _submit_quiz_game(request, quiz, quiz_data):
+    """Corrige une partie soumise (game_quiz, debug_game_quiz) et enregistre la tentative"""
+    # Traiter les réponses
+    answers = {}
+    for i, question_data in enumerate(quiz_data['questions']):
+        question = question_data['question']
+        answer = request.POST.get(f'question_{question["id"]}') or request.POST.get(f'answer_{question["id"]}')
+
+        if answer:
+            answers[question['id']] = answer
+
+    results = correct_quiz_answers(quiz_data, answers)
+
+    # Créer une tentative avec un temps estimé
+    estimated_time = len(quiz_data['questions']) * 30  # 30 secondes par question
+    time_taken = timezone.timedelta(seconds=estimated_time)
+
+    # Créer une tentative
+    attempt = QuizAttempt.objects.create(
+        quiz=quiz,
+        user=request.user if request.user.is_authenticated else None,
+        user_name=request.POST.get('user_name', request.user.username if request.user.is_authenticated else 'Anonyme'),
+        answers=answers,
+        shuffle_seed=quiz_data['seed'],
+        payload_version=quiz_data['version'],
+        question_results=results['question_results'],
+        score=results['score'],
+        total_questions=quiz_data['total_questions'],
+        time_taken=time_taken,
+        completed_at=timezone.now(),
+        is_completed=True
+    )
+
+    # Réponses libres: évaluées par similarité en une seule tâche
+    if any(q['question']['question_type'] == 'fill_blank' and q['question']['id'] in answers for q in quiz_data['questions']):
+        enqueue_answer_evaluation(attempt)
+
+    return attempt
+
+
 def game_quiz(request, quiz_id: str):
     quiz = get_object_or_404(Quiz, id=quiz_id)
 
@@ -394,37 +329,11 @@ def game_quiz(request, quiz_id: str):
         from django.http import Http404
         raise Http404("Quiz non trouvé ou accès non autorisé")
 
-    quiz_data = create_quiz_data(quiz)
+    # En POST, la graine reçue redonne le mélange affiché au joueur
+    quiz_data = create_quiz_data(quiz, _shuffle_seed(request) if request.method == 'POST' else None)
 
     if request.method == 'POST':
-        # Traiter les réponses
-        answers = {}
-        for i, question_data in enumerate(quiz_data['questions']):
-            question = question_data['question']
-            answer = request.POST.get(f'question_{question.id}') or request.POST.get(f'answer_{question.id}')
-
-            if answer:
-                answers[str(question.id)] = answer
-
-        results = correct_quiz_answers(quiz_data, answers)
-
-        # Créer une tentative avec un temps estimé
-        estimated_time = len(quiz_data['questions']) * 30  # 30 secondes par question
-        time_taken = timezone.timedelta(seconds=estimated_time)
-
-        # Créer une tentative
-        attempt = QuizAttempt.objects.create(
-            quiz=quiz,
-            user=request.user if request.user.is_authenticated else None,
-            user_name=request.POST.get('user_name', request.user.username if request.user.is_authenticated else 'Anonyme'),
-            answers=answers,
-            score=results['score'],
-            total_questions=quiz_data['total_questions'],
-            time_taken=time_taken,
-            completed_at=timezone.now(),
-            is_completed=True
-        )
-
+        attempt = _submit_quiz_game(request, quiz, quiz_data)
         return redirect('quiz_results', attempt_id=attempt.id)
 
     return render_quiz_game(request, quiz_data)
@@ -439,63 +348,29 @@ def debug_game_quiz(request, quiz_id: str):
         from django.http import Http404
         raise Http404("Quiz non trouvé ou accès non autorisé")
 
-    quiz_data = create_quiz_data(quiz)
+    # En POST, la graine reçue redonne le mélange affiché au joueur
+    quiz_data = create_quiz_data(quiz, _shuffle_seed(request) if request.method == 'POST' else None)
 
     if request.method == 'POST':
-        # Traiter les réponses (même logique que game_quiz)
-        answers = {}
-        for i, question_data in enumerate(quiz_data['questions']):
-            question = question_data['question']
-            answer = request.POST.get(f'question_{question.id}') or request.POST.get(f'answer_{question.id}')
-
-            if answer:
-                answers[str(question.id)] = answer
-
-        results = correct_quiz_answers(quiz_data, answers)
-
-        # Créer une tentative avec un temps estimé
-        estimated_time = len(quiz_data['questions']) * 30  # 30 secondes par question
-        time_taken = timezone.timedelta(seconds=estimated_time)
-
-        # Créer une tentative
-        attempt = QuizAttempt.objects.create(
-            quiz=quiz,
-            user=request.user if request.user.is_authenticated else None,
-            user_name=request.POST.get('user_name', request.user.username if request.user.is_authenticated else 'Anonyme'),
-            answers=answers,
-            score=results['score'],
-            total_questions=quiz_data['total_questions'],
-            time_taken=time_taken,
-            completed_at=timezone.now(),
-            is_completed=True
-        )
-
+        attempt = _submit_quiz_game(request, quiz, quiz_data)
         return redirect('quiz_results', attempt_id=attempt.id)
 
     return render_quiz_game_debug(request, quiz_data)
 
 
 def quiz_results(request, attempt_id: str):
-    attempt = get_object_or_404(QuizAttempt, id=attempt_id)
+    attempt = get_object_or_404(QuizAttempt.objects.select_related('quiz__course'), id=attempt_id)
     quiz = attempt.quiz
-    quiz_data = create_quiz_data(quiz)
-
-    # Récupérer les réponses de l'utilisateur depuis le champ JSON
-    user_answers = attempt.answers or {}
 
-    results = correct_quiz_answers(quiz_data, user_answers)
-
-    # Calculer les statistiques (cohérent avec quiz_results)
-    correct_count = sum(1 for result in results['results'].values() if result['is_correct'])
-    incorrect_count = sum(1 for result in results['results'].values() if not result['is_correct'])
-    total_questions = quiz_data['total_questions']
-    percentage = results['percentage']
+    # Score enregistré avec la tentative; le détail par question est sur quiz_correction
+    correct_count = attempt.score
+    total_questions = attempt.total_questions
+    incorrect_count = total_questions - correct_count
 
     context = {
         'attempt': attempt,
         'quiz': quiz,
-        'question_data': quiz_data['questions'],
-        'percentage': percentage,  # Pourcentage du résultat pour l'affichage
+        'percentage': attempt.score_percentage,  # Pourcentage du résultat pour l'affichage
         'total_questions': total_questions,
         'correct_count': correct_count,
         'incorrect_count': incorrect_count
@@ -525,66 +400,13 @@ def quiz_correction(request, attempt_id):
             from django.http import Http404
             raise Http404("Cette tentative nécessite une connexion")
     quiz = attempt.quiz
-    quiz_data = create_quiz_data(quiz)
-    
-    # Récupérer les réponses de l'utilisateur depuis le champ JSON
-    user_answers = attempt.answers or {}
-    
-    # Préparer les données pour chaque question
-    question_data = []
-    for question_dict in quiz_data['questions']:
-        question = question_dict['question']  # L'objet Question réel
-        # Utiliser la même clé que dans take_quiz (str(question.id))
-        user_answer = user_answers.get(str(question.id), '')
-        is_correct = False
-        
-        # Vérifier si la réponse est correcte (MÊME LOGIQUE QUE take_quiz et quiz_results)
-        if question.question_type == 'true_false':
-            # Pour Vrai/Faux, comparer directement
-            is_correct = user_answer.lower() == question.correct_answer.lower()
-        elif question.question_type == 'multiple_choice':
-            # Pour QCM mélangé, vérifier l'index après mélange
-            try:
-                selected_index = int(user_answer)
-                if 0 <= selected_index < len(question_dict['options']):
-                    selected_option = question_dict['options'][selected_index]
-                    is_correct = selected_option == quiz_data['correct_answers'][str(question.id)]
-                else:
-                    is_correct = False
-            except (ValueError, IndexError):
-                is_correct = False
-        else:
-            # Fallback : comparaison directe
-            is_correct = user_answer == question.correct_answer
-        
-        # Déterminer la réponse affichée de l'utilisateur (MÊME LOGIQUE QUE quiz_results)
-        display_answer = user_answer
-        if question.question_type == 'true_false':
-            # Pour Vrai/Faux, convertir en français
-            display_answer = "Vrai" if user_answer.lower() == "true" else "Faux"
-        elif question.question_type == 'multiple_choice' and question_dict['options']:
-            # Pour QCM, afficher l'option sélectionnée
-            try:
-                selected_index = int(user_answer)
-                if 0 <= selected_index < len(question_dict['options']):
-                    display_answer = question_dict['options'][selected_index]
-                else:
-                    display_answer = "Réponse invalide"
-            except (ValueError, IndexError):
-                display_answer = "Réponse invalide"
-        
-        question_data.append({
-            'question': question,
-            'user_answer': display_answer,
-            'correct_answer': question.correct_answer,
-            'is_correct': is_correct,
-            'options': question_dict['options'] if question.question_type == 'multiple_choice' else None
-        })
-    # Calculer les statistiques (cohérent avec quiz_results)
-    correct_count = sum(1 for q in question_data if q['is_correct'])
-    incorrect_count = sum(1 for q in question_data if not q['is_correct'])
-    total_questions = len(quiz_data['questions'])
-    percentage = (correct_count / total_questions * 100) if total_questions > 0 else 0
+
+    # Correction enregistrée avec la tentative (et révisée par l'évaluation des réponses libres)
+    question_data = attempt_results(attempt)
+    correct_count = attempt.score
+    total_questions = attempt.total_questions
+    incorrect_count = total_questions - correct_count
+    percentage = attempt.score_percentage
     
     context = {
         'attempt': attempt,
@@ -4,174 +4,26 @@ Vues pour les fonctionnalités IA avec Phi-3 pour SmartEtude
 
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse, HttpResponseNotAllowed
 from django.conf import settings
 from django.contrib import messages
 from django.core.cache import cache
+import hashlib
 import json
-import re
-from .models import Course, Quiz, Question
-from .decorators import subscription_required
-from .phi3_ai import phi3_ai
+import logging
+from .models import Course, Quiz
+from .decorators import subscription_required, async_login_required, async_subscription_required
+from .phi3_ai import phi3_ai, async_phi3_ai
+from .retrieval import retrieve_context
+from .documents import shared_summary, store_shared_summary
+from .quiz_parsing import QuizParseError, parse_ai_quiz_text, parse_quiz  # parse_ai_quiz_text: import historique
+from .quiz_service import materialize_quiz
+from asgiref.sync import sync_to_async
 
 import markdown
 from django.utils.safestring import mark_safe
 
-
-import re
-
-def parse_ai_quiz_text(quiz_text):
-    """
-    Fonction de parsing complètement réécrite pour gérer le format généré par l'IA
-    """
-    questions = []
-    
-    print(f"DEBUG: Parsing quiz text of length: {len(quiz_text)}")
-    print(f"DEBUG: Quiz text preview: {quiz_text[:500]}...")
-
-    # Diviser le texte en lignes pour un parsing plus simple
-    lines = quiz_text.split('\n')
-    current_question = None
-    current_options = []
-    in_options = False
-    
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
-            
-        # Détecter le début d'une nouvelle question
-        question_match = re.match(r'^(\d+)\.\s*(.+)$', line)
-        if question_match:
-            # Sauvegarder la question précédente si elle existe
-            if current_question:
-                questions.append(current_question)
-            
-            # Commencer une nouvelle question
-            question_num = question_match.group(1)
-            question_text = question_match.group(2).strip()
-            
-            # Détecter le type de question
-            question_type = "multiple_choice"
-            
-            print(f"DEBUG: Analyzing question {question_num}: '{question_text[:100]}...'")
-            
-            # Détection FORCÉE des questions Vrai/Faux
-            tf_indicators = [
-                'vrai ou faux', 'true or false', 'est-ce vrai', 'est-ce faux',
-                'cette affirmation est', 'cette déclaration est', 'ceci est vrai',
-                'ceci est faux', 'correct ou incorrect', 'right or wrong',
-                'principalement adopté', 'principalement accéléré', 'uniquement',
-                'seulement', 'exclusivement', 'a été principalement', 'est principalement',
-                'a été adopté', 'a été accéléré', 'ne présente que', 'n\'a que',
-                'principalement', 'uniquement', 'seulement', 'exclusivement'
-            ]
-            
-            # Vérifier chaque indicateur
-            for indicator in tf_indicators:
-                if indicator in question_text.lower():
-                    question_type = "true_false"
-                    print(f"DEBUG: Question {question_num} detected as True/False (found '{indicator}')")
-                    break
-            
-            # Détection basée sur la structure de la phrase
-            if question_type == "multiple_choice":
-                # Phrases qui commencent par "Le/La/Les" + verbe + "principalement"
-                if (question_text.lower().startswith(('le ', 'la ', 'les ')) and 
-                    'principalement' in question_text.lower()):
-                    question_type = "true_false"
-                    print(f"DEBUG: Question {question_num} detected as True/False (structure match)")
-                # Phrases affirmatives courtes
-                elif len(question_text) < 100 and not '?' in question_text:
-                    question_type = "true_false"
-                    print(f"DEBUG: Question {question_num} detected as True/False (short affirmative)")
-            
-            current_question = {
-                'question': f"{question_num}. {question_text}",
-                'options': [],
-                'correct_answer': '',
-                'type': question_type
-            }
-            current_options = []
-            in_options = False
-            continue
-        
-        # Détecter les options A, B, C, D (seulement pour les QCM)
-        option_match = re.match(r'^([A-D])[\.\)]\s*(.+)$', line)
-        if option_match and current_question and current_question['type'] != 'true_false':
-            letter = option_match.group(1)
-            text = option_match.group(2).strip()
-            current_options.append(text)
-            in_options = True
-            print(f"DEBUG: Found option {letter}: {text}")
-            continue
-        
-        # Détecter les options Vrai/Faux
-        if line.lower() in ['vrai', 'faux', 'true', 'false'] and current_question and current_question['type'] == 'true_false':
-            current_options.append(line)
-            in_options = True
-            print(f"DEBUG: Found TF option: {line}")
-            continue
-        
-        # Détecter la réponse correcte
-        answer_match = re.match(r'(?:Réponse correcte|Réponse|Correct|Answer):\s*(.+)$', line, re.IGNORECASE)
-        if answer_match and current_question:
-            answer = answer_match.group(1).strip()
-            
-            if current_question['type'] == 'true_false':
-                # Pour Vrai/Faux
-                if answer.lower() in ['vrai', 'true']:
-                    current_question['correct_answer'] = 0
-                else:
-                    current_question['correct_answer'] = 1
-                print(f"DEBUG: Found TF answer: {answer}")
-            else:
-                # Pour QCM
-                if answer.upper() in ['A', 'B', 'C', 'D']:
-                    current_question['correct_answer'] = ord(answer.upper()) - ord('A')
-                    print(f"DEBUG: Found QCM answer: {answer}")
-                else:
-                    # Fallback si la réponse n'est pas trouvée
-                    current_question['correct_answer'] = 0
-                    print(f"DEBUG: QCM answer not found, defaulting to 0")
-            
-            # Finaliser la question
-            if current_question['type'] == 'true_false':
-                current_question['options'] = ['Vrai', 'Faux']
-                # Pour Vrai/Faux, ne pas stocker les options A, B, C, D
-                current_question['options'] = ['Vrai', 'Faux']
-            else:
-                current_question['options'] = current_options if current_options else ['Option A', 'Option B', 'Option C', 'Option D']
-            
-            questions.append(current_question)
-            current_question = None
-            current_options = []
-            in_options = False
-    
-    # Ajouter la dernière question si elle existe
-    if current_question:
-        if current_question['type'] == 'true_false':
-            current_question['options'] = ['Vrai', 'Faux']
-        else:
-            current_question['options'] = current_options if current_options else ['Option A', 'Option B', 'Option C', 'Option D']
-        questions.append(current_question)
-    
-    print(f"DEBUG: Successfully parsed {len(questions)} questions")
-    
-    # Fallback si aucune question n'a été trouvée
-    if not questions:
-        print("DEBUG: Using fallback - no questions found")
-        fallback_type = "true_false" if any(word in quiz_text.lower() for word in ['vrai', 'faux', 'true', 'false']) else "multiple_choice"
-        fallback_options = ['Vrai', 'Faux'] if fallback_type == "true_false" else ['Option A', 'Option B', 'Option C', 'Option D']
-        
-        questions.append({
-            'question': quiz_text[:500],
-            'options': fallback_options,
-            'correct_answer': 0,
-            'type': fallback_type
-        })
-    
-    return questions
+logger = logging.getLogger(__name__)
 
 
 @login_required
@@ -206,15 +58,33 @@ def ai_settings(request):
     })
 
 
-@login_required
-def phi3_summary_view(request, course_id):
-    """Vue pour générer un résumé avec Phi-3"""
-    course = get_object_or_404(Course, id=course_id)
+async def _aget_course_or_404(request, course_id):
+    """Récupère un cours en asynchrone et vérifie les permissions d'accès"""
+    from django.http import Http404
+    try:
+        # Texte et champs volumineux chargés d'avance: lus ensuite hors contexte synchrone
+        course = await Course.objects.with_content().aget(id=course_id)
+    except Course.DoesNotExist:
+        raise Http404("Cours non trouvé ou accès non autorisé")
 
-    # Vérifier les permissions d'accès
-    if not course.is_public and (not request.user.is_authenticated or course.user != request.user):
-        from django.http import Http404
+    # request.user a déjà été résolu par le décorateur async_login_required
+    if not course.is_public and (not request.user.is_authenticated or course.user_id != request.user.id):
         raise Http404("Cours non trouvé ou accès non autorisé")
+    return course
+
+
+def _quiz_questions(result):
+    """Questions d'un résultat de generate_quiz (les résultats mis en cache avant l'ajout du parsing n'en ont pas)"""
+    questions = result.get('questions') or parse_quiz(result.get('quiz_text', ''))
+    if not questions:
+        raise QuizParseError("Aucune question exploitable dans la réponse de l'IA")
+    return questions
+
+
+@async_login_required
+async def phi3_summary_view(request, course_id):
+    """Vue asynchrone pour générer un résumé avec Phi-3 (ne bloque pas de worker)"""
+    course = await _aget_course_or_404(request, course_id)
 
     if request.method == 'POST':
         try:
@@ -222,28 +92,36 @@ def phi3_summary_view(request, course_id):
             
             level = data.get('level', 'intermediate')
             language = data.get('language', 'french')
+            # Régénération explicite: nouveau résumé, caches ignorés puis remplacés
+            regenerate = bool(data.get('regenerate'))
             
             # Vérifier le cache
             cache_key = f"phi3_summary_{course_id}_{level}_{language}"
-            cached_result = cache.get(cache_key)
-            
+            cached_result = None if regenerate else await cache.aget(cache_key)
+            shared = None if regenerate else shared_summary(course, level, language)
+
             if cached_result:
                 result = cached_result
+            elif shared:
+                # Résumé déjà généré pour le même document par un autre cours
+                result = async_phi3_ai._summary_result(shared, level, language)
             else:
                 # Générer avec Phi-3
-                result = phi3_ai.generate_summary(
+                result = await async_phi3_ai.generate_summary(
                     course.extracted_text,
                     level=level,
-                    language=language
+                    language=language,
+                    regenerate=regenerate
                 )
                 
                 # Mettre en cache pour 2 heures
                 if result.get('success'):
-                    cache.set(cache_key, result, 7200)
+                    await cache.aset(cache_key, result, 7200)
+                    await sync_to_async(store_shared_summary)(course, level, language, result['summary'])
             
             if result.get('success'):
                 course.ai_summary = result['summary']
-                course.save()
+                await course.asave(update_fields=['ai_summary'])
                 return JsonResponse({
                     'success': True,
                     'summary': result['summary'],
@@ -259,7 +137,7 @@ def phi3_summary_view(request, course_id):
                     'error': result.get('error', 'IA indisponible'),
                     'source': 'local_fallback'
                 }
-                course.save()
+                await course.asave(update_fields=['ai_summary'])
                 return JsonResponse({
                     'success': True,
                     'summary': fallback,
@@ -272,22 +150,17 @@ def phi3_summary_view(request, course_id):
                 'error': f'Erreur: {str(e)}'
             })
     
-    return render(request, 'phi3_summary.html', {
+    return await sync_to_async(render)(request, 'phi3_summary.html', {
         'course': course,
         'model_info': phi3_ai.get_model_info()
     })
 
 
-@login_required
-@subscription_required
-def phi3_quiz_view(request, course_id):
-    """Vue pour générer un quiz avec Phi-3"""
-    course = get_object_or_404(Course, id=course_id)
-
-    # Vérifier les permissions d'accès
-    if not course.is_public and (not request.user.is_authenticated or course.user != request.user):
-        from django.http import Http404
-        raise Http404("Cours non trouvé ou accès non autorisé")
+@async_login_required
+@async_subscription_required
+async def phi3_quiz_view(request, course_id):
+    """Vue asynchrone pour générer un quiz avec Phi-3"""
+    course = await _aget_course_or_404(request, course_id)
 
     if request.method == 'POST':
         try:
@@ -296,66 +169,35 @@ def phi3_quiz_view(request, course_id):
             num_questions = int(data.get('num_questions', 5))
             difficulty = data.get('difficulty', 'medium')
             language = data.get('language', 'french')
+            # Régénération explicite: nouvelles questions, caches ignorés puis remplacés
+            regenerate = bool(data.get('regenerate'))
             
             # Vérifier le cache
             cache_key = f"phi3_quiz_{course_id}_{num_questions}_{difficulty}_{language}"
-            cached_result = cache.get(cache_key)
+            cached_result = None if regenerate else await cache.aget(cache_key)
             
             if cached_result:
                 result = cached_result
             else:
                 # Générer avec Phi-3
-                result = phi3_ai.generate_quiz(
+                result = await async_phi3_ai.generate_quiz(
                     course.extracted_text,
                     num_questions=num_questions,
                     difficulty=difficulty,
-                    language=language
+                    language=language,
+                    regenerate=regenerate
                 )
                 
                 # Mettre en cache pour 2 heures
                 if result.get('success'):
-                    cache.set(cache_key, result, 7200)
+                    await cache.aset(cache_key, result, 7200)
             
             if result.get('success'):
-                print(f"DEBUG: Quiz generation successful, result keys: {result.keys()}")
-                print(f"DEBUG: Quiz text length: {len(result.get('quiz_text', ''))}")
-                print(f"DEBUG: Quiz text preview: {result.get('quiz_text', '')[:100]}...")
-
-                quiz = Quiz.objects.create(
-                    title=f"Quiz IA - {course.title}",
-                    description=f"Quiz généré par IA ({difficulty}) pour le cours {course.title}",
-                    course=course,
-                    difficulty=difficulty
-                )
+                logger.debug(f"Quiz généré pour le cours {course_id}: {len(result.get('quiz_text', ''))} caractères")
 
                 # Créer les questions
                 try:
-                    questions = parse_ai_quiz_text(result.get('quiz_text', ''))
-                    print(f"DEBUG: Parsed {len(questions)} questions from quiz text")
-
-                    for i, q_data in enumerate(questions):
-                        print(f"DEBUG: Creating question {i+1}: {q_data.get('question', '')[:50]}...")
-                        
-                        # Nettoyer encore plus le texte de la question
-                        clean_question = q_data.get('question', '')
-                        # Enlever les numéros de question du début
-                        clean_question = re.sub(r'^\d+\.\s*', '', clean_question)
-                        # Enlever toute réponse ou explication qui pourrait rester
-                        clean_question = re.sub(
-                            r'\*\*.*?\*\*|Réponse correcte.*?$|Explication.*?$',
-                            '',
-                            clean_question,
-                            flags=re.IGNORECASE | re.DOTALL
-                        ).strip()
-                        
-                        Question.objects.create(
-                            quiz=quiz,
-                            question_text=clean_question[:500],
-                            question_type=q_data.get('type', 'multiple_choice'),
-                            correct_answer=q_data.get('correct_answer', ''),
-                            options=q_data.get('options', []),
-                            order=i + 1
-                        )
+                    quiz = await sync_to_async(materialize_quiz)(course, _quiz_questions(result), difficulty)
 
                     return JsonResponse({
                         'success': True,
@@ -364,13 +206,13 @@ def phi3_quiz_view(request, course_id):
                         'model': result.get('model', getattr(settings, 'AI_MODEL', 'gpt-4o-mini'))
                     })
                 except Exception as e:
-                    print(f"DEBUG: Error creating questions: {str(e)}")
+                    logger.error(f"Erreur lors de la création des questions du cours {course_id}: {e}")
                     return JsonResponse({
                         'success': False,
                         'error': f'Erreur lors de la création des questions: {str(e)}'
                     })
             else:
-                print(f"DEBUG: Quiz generation failed: {result.get('error', 'Unknown error')}")
+                logger.warning(f"Échec de la génération du quiz du cours {course_id}: {result.get('error', 'Erreur inconnue')}")
                 return JsonResponse({
                     'success': False,
                     'error': result.get('error', 'Erreur inconnue')
@@ -382,22 +224,17 @@ def phi3_quiz_view(request, course_id):
                 'error': f'Erreur: {str(e)}'
             })
     
-    return render(request, 'phi3_quiz.html', {
+    return await sync_to_async(render)(request, 'phi3_quiz.html', {
         'course': course,
         'model_info': phi3_ai.get_model_info()
     })
 
 
-@login_required
-@subscription_required
-def phi3_chat_view(request, course_id):
-    """Vue pour chat avec Phi-3"""
-    course = get_object_or_404(Course, id=course_id)
-
-    # Vérifier les permissions d'accès
-    if not course.is_public and (not request.user.is_authenticated or course.user != request.user):
-        from django.http import Http404
-        raise Http404("Cours non trouvé ou accès non autorisé")
+@async_login_required
+@async_subscription_required
+async def phi3_chat_view(request, course_id):
+    """Vue asynchrone pour chat avec Phi-3"""
+    course = await _aget_course_or_404(request, course_id)
 
     if request.method == 'POST':
         try:
@@ -411,12 +248,20 @@ def phi3_chat_view(request, course_id):
                     'error': 'Question requise'
                 })
             
-            # Générer avec Phi-3
-            result = phi3_ai.chat_with_course(
-                course.extracted_text,
-                question=question,
-                language=language
-            )
+            # Réponse déjà produite (éventuellement par la vue en streaming)
+            cache_key = _chat_cache_key(course_id, question, language)
+            result = await cache.aget(cache_key)
+
+            if not result:
+                # Générer avec Phi-3
+                context = await sync_to_async(retrieve_context)(course, question)
+                result = await async_phi3_ai.chat_with_course(
+                    context,
+                    question=question,
+                    language=language
+                )
+                if result.get('success'):
+                    await cache.aset(cache_key, result, 7200)
             
             if result.get('success'):
                 return JsonResponse({
@@ -436,12 +281,126 @@ def phi3_chat_view(request, course_id):
                 'error': f'Erreur: {str(e)}'
             })
     
-    return render(request, 'phi3_chat.html', {
+    return await sync_to_async(render)(request, 'phi3_chat.html', {
         'course': course,
         'model_info': phi3_ai.get_model_info()
     })
 
 
+def _chat_cache_key(course_id, question, language):
+    """Clé de cache d'une réponse du chat (question normalisée)"""
+    digest = hashlib.sha256(question.strip().lower().encode('utf-8')).hexdigest()[:32]
+    return f"phi3_chat_{course_id}_{language}_{digest}"
+
+
+def _sse_event(data, event=None):
+    """Formate un événement server-sent events"""
+    payload = f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+    return f"event: {event}\n{payload}" if event else payload
+
+
+def _sse_response(event_stream):
+    response = StreamingHttpResponse(event_stream, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Empêcher nginx/Render de bufferiser le flux
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@async_login_required
+async def phi3_summary_stream_view(request, course_id):
+    """Résumé en streaming (SSE): le texte s'affiche dès le premier token.
+
+    Le résumé complet est mis en cache sous la même clé que phi3_summary_view
+    et enregistré sur le cours à la fin du flux.
+    """
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+    course = await _aget_course_or_404(request, course_id)
+
+    data = json.loads(request.body or b'{}') if request.content_type == 'application/json' else request.POST
+    level = data.get('level', 'intermediate')
+    language = data.get('language', 'french')
+    # Régénération explicite: nouveau résumé, caches ignorés puis remplacés
+    regenerate = bool(data.get('regenerate'))
+    cache_key = f"phi3_summary_{course_id}_{level}_{language}"
+    model = getattr(settings, 'AI_MODEL', 'gpt-4o-mini')
+
+    async def event_stream():
+        cached_result = None if regenerate else await cache.aget(cache_key)
+        shared = None if regenerate else shared_summary(course, level, language)
+        if shared and not cached_result:
+            cached_result = async_phi3_ai._summary_result(shared, level, language)
+        if cached_result:
+            yield _sse_event({'delta': cached_result['summary']})
+            yield _sse_event({'model': cached_result.get('model', model), 'cached': True}, event='done')
+            return
+
+        parts = []
+        try:
+            async for delta in async_phi3_ai.stream_summary(course.extracted_text or '', level=level, language=language,
+                                                            regenerate=regenerate):
+                parts.append(delta)
+                yield _sse_event({'delta': delta})
+        except Exception as e:
+            yield _sse_event({'error': f'Erreur: {str(e)}'}, event='error')
+            return
+
+        summary = ''.join(parts).strip()
+        if summary:
+            await cache.aset(cache_key, async_phi3_ai._summary_result(summary, level, language), 7200)
+            await sync_to_async(store_shared_summary)(course, level, language, summary)
+            course.ai_summary = summary
+            await course.asave(update_fields=['ai_summary'])
+        yield _sse_event({'model': model}, event='done')
+
+    return _sse_response(event_stream())
+
+
+@async_login_required
+@async_subscription_required
+async def phi3_chat_stream_view(request, course_id):
+    """Chat en streaming (SSE) avec mise en cache de la réponse complète"""
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+    course = await _aget_course_or_404(request, course_id)
+
+    data = json.loads(request.body or b'{}')
+    question = data.get('question', '')
+    language = data.get('language', 'french')
+    if not question:
+        return JsonResponse({
+            'success': False,
+            'error': 'Question requise'
+        })
+    cache_key = _chat_cache_key(course_id, question, language)
+    model = getattr(settings, 'AI_MODEL', 'gpt-4o-mini')
+
+    async def event_stream():
+        cached_result = await cache.aget(cache_key)
+        if cached_result:
+            yield _sse_event({'delta': cached_result['answer']})
+            yield _sse_event({'model': cached_result.get('model', model), 'cached': True}, event='done')
+            return
+
+        parts = []
+        try:
+            context = await sync_to_async(retrieve_context)(course, question)
+            async for delta in async_phi3_ai.stream_chat_with_course(context, question=question, language=language):
+                parts.append(delta)
+                yield _sse_event({'delta': delta})
+        except Exception as e:
+            yield _sse_event({'error': f'Erreur: {str(e)}'}, event='error')
+            return
+
+        answer = ''.join(parts).strip()
+        if answer:
+            await cache.aset(cache_key, async_phi3_ai._chat_result(answer, language), 7200)
+        yield _sse_event({'model': model}, event='done')
+
+    return _sse_response(event_stream())
+
+
 @login_required
 @subscription_required
 def ai_quick_summary(request, course_id):
@@ -498,38 +457,9 @@ def ai_quick_quiz(request, course_id):
         )
         
         if result.get('success'):
-            # Créer le quiz dans la base de données
-            quiz = Quiz.objects.create(
-                title=f"Quiz IA - {course.title}",
-                description=f"Quiz généré par IA (medium) pour le cours {course.title}",
-                course=course,
-                difficulty='medium'
-            )
-
-            # Créer les questions
+            # Créer le quiz et les questions dans la base de données
             try:
-                questions = parse_ai_quiz_text(result.get('quiz_text', ''))
-                for i, q_data in enumerate(questions):
-                    # Nettoyer encore plus le texte de la question
-                    clean_question = q_data.get('question', '')
-                    # Enlever les numéros de question du début
-                    clean_question = re.sub(r'^\d+\.\s*', '', clean_question)
-                    # Enlever toute réponse ou explication qui pourrait rester
-                    clean_question = re.sub(
-                        r'\*\*.*?\*\*|Réponse correcte.*?$|Explication.*?$',
-                        '',
-                        clean_question,
-                        flags=re.IGNORECASE | re.DOTALL
-                    ).strip()
-                    
-                    Question.objects.create(
-                        quiz=quiz,
-                        question_text=clean_question[:500],
-                        question_type=q_data.get('type', 'multiple_choice'),
-                        correct_answer=q_data.get('correct_answer', ''),
-                        options=q_data.get('options', []),
-                        order=i + 1
-                    )
+                quiz = materialize_quiz(course, _quiz_questions(result), 'medium')
 
                 return JsonResponse({
                     'success': True,
@@ -537,7 +467,7 @@ def ai_quick_quiz(request, course_id):
                     'redirect_url': f'/quiz/{quiz.id}/game/'
                 })
             except Exception as e:
-                print(f"DEBUG: Error creating questions: {str(e)}")
+                logger.error(f"Erreur lors de la création des questions du cours {course_id}: {e}")
                 return JsonResponse({
                     'success': False,
                     'error': f'Erreur lors de la création des questions: {str(e)}'
@@ -708,12 +638,12 @@ def test_quiz_parsing(request):
             return redirect('test_quiz_parsing')
 
         try:
-            questions = parse_ai_quiz_text(quiz_text)
+            questions = parse_quiz(quiz_text)
 
             if questions:
                 messages.success(request, f'Succès ! {len(questions)} questions trouvées :')
                 for i, q in enumerate(questions, 1):
-                    messages.info(request, f'Q{i}: {q.get("question", "")[:50]}...')
+                    messages.info(request, f'Q{i} ({q["question_type"]}): {q["question_text"][:50]}...')
                     if q.get('options'):
                         messages.info(request, f'  Options: {", ".join(q["options"])}')
                     messages.info(request, f'  Réponse: {q.get("correct_answer", "N/A")}')
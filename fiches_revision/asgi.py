@@ -3,6 +3,10 @@ ASGI config for fiches_revision project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+En production, l'application est servie par gunicorn avec des workers uvicorn
+(voir start.sh) pour que les vues IA asynchrones (core.views_ai) partagent une
+seule boucle d'événements par processus.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -100,9 +100,8 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'core.middleware.AsyncWhiteNoiseMiddleware',  # WhiteNoise sans thread pour les requêtes non statiques (ASGI)
     'django.contrib.sessions.middleware.SessionMiddleware',
-    'core.middleware.CleanCorruptedSessionsMiddleware',  # Nettoyer les sessions corrompues APRÈS SessionMiddleware
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -124,7 +123,7 @@ if DEBUG:
     except:
         pass
     
-    # Ajouter le middleware de la debug toolbar
+    # Ajouter le middleware de la debug toolbar (synchrone: en DEBUG, chaque requête passe par un thread)
     MIDDLEWARE.insert(0, 'debug_toolbar.middleware.DebugToolbarMiddleware')
     # Activer le serveur SSL de développement uniquement en DEBUG
     INSTALLED_APPS.append('sslserver')
@@ -157,6 +156,8 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'fiches_revision.wsgi.application'
+# Les vues IA sont asynchrones: servir l'application via ASGI (uvicorn) en production
+ASGI_APPLICATION = 'fiches_revision.asgi.application'
 
 # =============================================================================
 # BASE DE DONNÉES ET CACHE
@@ -173,13 +174,23 @@ DATABASES = {
     }
 }
 
-# Configuration du cache Redis
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
+# Configuration du cache Redis: cache partagé par tous les processus (workers web et Celery)
+# si REDIS_CACHE_URL est défini, sinon cache mémoire propre à chaque processus
+REDIS_CACHE_URL = config('REDIS_CACHE_URL', default='')
+if REDIS_CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_CACHE_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'unique-snowflake',
+        }
     }
-}
 
 # =============================================================================
 # VALIDATION DES MOTS DE PASSE
@@ -312,6 +323,25 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
 
+# Tâches périodiques (celery beat)
+CELERY_BEAT_SCHEDULE = {
+    # Recalcul complet des statistiques des quiz, tenues à jour à chaque tentative
+    'repair-quiz-statistics': {
+        'task': 'core.tasks.repair_quiz_statistics_async',
+        'schedule': config('QUIZ_STATS_REPAIR_INTERVAL', default=24 * 3600, cast=int),  # secondes
+    },
+    # Réécriture de l'index inversé de recherche avec les cours modifiés (SEARCH_BACKEND='inverted')
+    'compact-search-index': {
+        'task': 'core.tasks.compact_search_index_async',
+        'schedule': config('SEARCH_INVERTED_COMPACT_INTERVAL', default=3600, cast=int),  # secondes
+    },
+    # Extractions non mises en file (broker injoignable à l'upload)
+    'retry-pending-extractions': {
+        'task': 'core.tasks.retry_pending_extractions_async',
+        'schedule': config('EXTRACTION_RETRY_INTERVAL', default=300, cast=int),  # secondes
+    },
+}
+
 # =============================================================================
 # CONFIGURATION IA (OpenAI)
 # =============================================================================
@@ -320,6 +350,48 @@ OPENAI_API_KEY = config('OPENAI_API_KEY', default='')
 OPENAI_BASE_URL = config('OPENAI_BASE_URL', default='https://api.openai.com')
 AI_MODEL = config('AI_MODEL', default='gpt-4o-mini')
 AI_MAX_TOKENS = config('AI_MAX_TOKENS', default=800, cast=int)
+AI_REQUEST_TIMEOUT = config('AI_REQUEST_TIMEOUT', default=60, cast=int)
+# Quiz en JSON structuré (response_format json_schema); False pour les API qui ne le supportent pas
+AI_QUIZ_STRUCTURED_OUTPUT = config('AI_QUIZ_STRUCTURED_OUTPUT', default=True, cast=bool)
+
+# Pool de connexions HTTP partagé (OpenAI, Lygos) - voir core/http_pool.py
+HTTP_POOL_CONNECTIONS = config('HTTP_POOL_CONNECTIONS', default=10, cast=int)  # Hôtes distincts
+HTTP_POOL_MAXSIZE = config('HTTP_POOL_MAXSIZE', default=20, cast=int)  # Connexions keep-alive par hôte
+HTTP_POOL_BLOCK = config('HTTP_POOL_BLOCK', default=False, cast=bool)
+# Appels LLM simultanés par processus pour le client asynchrone (vues ASGI)
+AI_ASYNC_MAX_CONNECTIONS = config('AI_ASYNC_MAX_CONNECTIONS', default=200, cast=int)
+
+# Cache des réponses LLM adressé par le contenu (core/llm_cache.py)
+AI_CACHE_ENABLED = config('AI_CACHE_ENABLED', default=True, cast=bool)
+AI_CACHE_TTL = config('AI_CACHE_TTL', default=30 * 24 * 3600, cast=int)  # secondes
+AI_CACHE_MAX_ENTRIES = config('AI_CACHE_MAX_ENTRIES', default=10000, cast=int)
+AI_CACHE_EVICTION_INTERVAL = config('AI_CACHE_EVICTION_INTERVAL', default=100, cast=int)  # écritures entre deux évictions
+AI_CACHE_TOUCH_INTERVAL = config('AI_CACHE_TOUCH_INTERVAL', default=300, cast=int)  # secondes entre deux rafraîchissements LRU d'un hit L1
+
+# Résumés map-reduce des cours longs (core/chunking.py)
+AI_SINGLE_PASS_TOKENS = config('AI_SINGLE_PASS_TOKENS', default=4000, cast=int)  # Au-delà, le texte est découpé
+AI_CHUNK_TOKENS = config('AI_CHUNK_TOKENS', default=2500, cast=int)  # Taille d'une section
+AI_MAP_CONCURRENCY = config('AI_MAP_CONCURRENCY', default=4, cast=int)  # Sections résumées en parallèle
+
+# Chat: seules les sections les plus pertinentes du cours sont envoyées (core/retrieval.py)
+AI_RETRIEVAL_CHUNK_TOKENS = config('AI_RETRIEVAL_CHUNK_TOKENS', default=300, cast=int)  # Taille d'une section indexée
+AI_RETRIEVAL_TOP_K = config('AI_RETRIEVAL_TOP_K', default=5, cast=int)
+AI_RETRIEVAL_MAX_CHARS = config('AI_RETRIEVAL_MAX_CHARS', default=4000, cast=int)  # Contexte maximal par question
+
+# Correction locale des réponses libres (core/similarity.py)
+AI_ANSWER_SIMILARITY_THRESHOLD = config('AI_ANSWER_SIMILARITY_THRESHOLD', default=0.8, cast=float)  # Similarité minimale d'une bonne réponse
+
+# Données de jeu des quiz compilées et mises en cache (core/quiz_payload.py)
+QUIZ_PAYLOAD_CACHE_TTL = config('QUIZ_PAYLOAD_CACHE_TTL', default=24 * 3600, cast=int)  # secondes
+
+# Recherche plein texte des cours (core/search): GIN sous PostgreSQL, FTS5 sous SQLite
+SEARCH_BODY_MAX_CHARS = config('SEARCH_BODY_MAX_CHARS', default=100_000, cast=int)  # Texte extrait indexé par cours
+SEARCH_POSTGRES_CONFIG = config('SEARCH_POSTGRES_CONFIG', default='french')  # Configuration to_tsvector (à la migration)
+# 'database' (index de la base ci-dessus) ou 'inverted' (index inversé en mémoire, core/search/inverted.py)
+SEARCH_BACKEND = config('SEARCH_BACKEND', default='database')
+# Fichier de l'index inversé et son journal (<chemin>.journal), propres à l'instance: partagés par les
+# processus de la machine, à reconstruire sur chaque machine (rebuild_search_index) hors volume partagé
+SEARCH_INVERTED_PATH = config('SEARCH_INVERTED_PATH', default=str(BASE_DIR / 'search_index' / 'courses.idx'))
 
 # =============================================================================
 # CONFIGURATION DES UPLOADS
@@ -328,6 +400,18 @@ AI_MAX_TOKENS = config('AI_MAX_TOKENS', default=800, cast=int)
 FILE_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
 
+# Extraction PDF parallèle (core/extraction.py)
+PDF_EXTRACTION_WORKERS = config('PDF_EXTRACTION_WORKERS', default=0, cast=int)  # 0 = min(4, nombre de CPU)
+PDF_PARALLEL_MIN_PAGES = config('PDF_PARALLEL_MIN_PAGES', default=20, cast=int)  # En dessous: extraction séquentielle
+
+# Compression du texte extrait des cours (core/fields.py)
+COURSE_TEXT_CODEC = config('COURSE_TEXT_CODEC', default='zlib')  # 'zlib' ou 'zstd' (paquet zstandard requis)
+COURSE_TEXT_COMPRESSION_LEVEL = config('COURSE_TEXT_COMPRESSION_LEVEL', default=6, cast=int)
+
+# Prétraitement des textes (core/preprocessing.py)
+PREPROCESSING_WINDOW_CHARS = config('PREPROCESSING_WINDOW_CHARS', default=256 * 1024, cast=int)  # Taille d'une fenêtre traitée
+NLTK_AUTO_DOWNLOAD = config('NLTK_AUTO_DOWNLOAD', default=True, cast=bool)  # Télécharger une fois les ressources NLTK manquantes
+
 # =============================================================================
 # PARAMÈTRES AUTH/SESSION
 # =============================================================================
@@ -339,10 +423,21 @@ LOGIN_REDIRECT_URL = 'dashboard'
 LOGOUT_REDIRECT_URL = 'home'
 
 # Paramètres de session
-SESSION_ENGINE = 'django.contrib.sessions.backends.db'  # Utiliser la base de données pour les sessions
+# Cache + base, sessions corrompues supprimées à la lecture (core/sessions), seulement avec un
+# cache partagé: avec un cache par processus, une session supprimée (déconnexion,
+# enforce_single_session) resterait valide dans les autres workers. Sinon, sessions en base
+# seulement (core/sessions/db.py), avec les mêmes écritures regroupées.
+SESSION_CACHE_ALIAS = config('SESSION_CACHE_ALIAS', default='default')
+SESSION_CACHE_SHARED = CACHES[SESSION_CACHE_ALIAS]['BACKEND'] not in (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+SESSION_ENGINE = 'core.sessions' if SESSION_CACHE_SHARED else 'core.sessions.db'
 SESSION_COOKIE_AGE = 5 * 60 * 60  # 5 heures
 SESSION_EXPIRE_AT_BROWSER_CLOSE = False
 SESSION_SAVE_EVERY_REQUEST = True
+# Une session non modifiée n'est réécrite (expiration glissante) qu'une fois par intervalle
+SESSION_SAVE_INTERVAL = config('SESSION_SAVE_INTERVAL', default=60, cast=int)  # secondes
 SESSION_COOKIE_HTTPONLY = True
 SESSION_COOKIE_SECURE = not DEBUG
 SESSION_COOKIE_SAMESITE = 'Lax'  # Important pour la sécurité CSRF
@@ -351,17 +446,6 @@ SESSION_COOKIE_PATH = '/'
 # Utiliser PickleSerializer pour une meilleure compatibilité
 SESSION_SERIALIZER = 'django.contrib.sessions.serializers.JSONSerializer'
 
-# Configurer le cache pour les sessions (optionnel mais recommandé pour les performances)
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
-    }
-}
-
-# Utiliser le cache pour les sessions (optionnel)
-# SESSION_ENGINE = 'django.contrib.sessions.backends.cache'
-# SESSION_CACHE_ALIAS = 'default'
 
 # =============================================================================
 # CONFIGURATION DE SÉCURITÉ
@@ -40,9 +40,11 @@ python manage.py collectstatic --noinput || {
     echo "WARNING: collectstatic a échoué, mais on continue..."
 }
 
-# Démarrer Gunicorn
-echo "Démarrage de Gunicorn sur le port $PORT..."
-exec gunicorn fiches_revision.wsgi:application \
+# Démarrer Gunicorn avec des workers ASGI (uvicorn): les vues IA asynchrones
+# gardent des centaines d'appels LLM en vol sans bloquer les workers
+echo "Démarrage de Gunicorn (ASGI) sur le port $PORT..."
+exec gunicorn fiches_revision.asgi:application \
+    --worker-class uvicorn.workers.UvicornWorker \
     --bind 0.0.0.0:$PORT \
     --workers 2 \
     --timeout 120 \